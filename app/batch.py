@@ -0,0 +1,164 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+from pathlib import PurePosixPath
+from typing import Any, AsyncIterator
+
+from .executor import run_io
+from .pipeline import CompareOptions, compare_texts, extract_document, record_history
+from .uploads import SpooledUpload, spool_file
+from .utils import DocumentSource, extraction_cache_key, source_sha256
+
+logger = logging.getLogger(__name__)
+
+
+def batch_max_pairs() -> int:
+    return max(1, int(os.getenv("BATCH_MAX_PAIRS", "50")))
+
+
+def batch_concurrency() -> int:
+    return max(1, int(os.getenv("BATCH_CONCURRENCY", "4")))
+
+
+def batch_max_archive_bytes() -> int:
+    return int(os.getenv("BATCH_MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+
+
+def read_archive(data: DocumentSource) -> dict[str, SpooledUpload]:
+    """Unpack the documents in a zip archive to temporary files keyed by member path.
+
+    Directories, hidden files and macOS resource forks are skipped. Archives that would
+    unpack to more than `BATCH_MAX_ARCHIVE_BYTES` are rejected with ValueError. The
+    caller removes the files.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data) if isinstance(data, bytes) else data)
+    except zipfile.BadZipFile as exc:
+        raise ValueError("Archive is not a valid zip file") from exc
+    with archive:
+        members = [
+            info
+            for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and not PurePosixPath(info.filename).name.startswith(".")
+        ]
+        if sum(info.file_size for info in members) > batch_max_archive_bytes():
+            raise ValueError("Archive is too large to unpack")
+        documents: dict[str, SpooledUpload] = {}
+        try:
+            for info in members:
+                with archive.open(info) as reader:
+                    documents[info.filename] = spool_file(info.filename, reader)
+        except BaseException as exc:
+            for spooled in documents.values():
+                spooled.remove()
+            if isinstance(exc, zipfile.BadZipFile):
+                raise ValueError("Archive is not a valid zip file") from exc
+            raise
+        return documents
+
+
+def parse_pairs(
+    pairs: str | None, baseline: str | None, names: list[str]
+) -> list[tuple[str, str]]:
+    """Resolve the comparisons requested for a batch.
+
+    `pairs` is a JSON list of `[old, new]` document names; alternatively `baseline`
+    names one document to compare against every other document in upload order.
+    """
+    if pairs:
+        try:
+            parsed = json.loads(pairs)
+        except json.JSONDecodeError as exc:
+            raise ValueError("pairs must be a JSON list of [old, new] names") from exc
+        if not isinstance(parsed, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 and all(isinstance(n, str) for n in pair)
+            for pair in parsed
+        ):
+            raise ValueError("pairs must be a JSON list of [old, new] names")
+        resolved = [(old, new) for old, new in parsed]
+    elif baseline:
+        resolved = [(baseline, name) for name in names if name != baseline]
+    else:
+        raise ValueError("Provide either pairs or baseline")
+    unknown = sorted({name for pair in resolved for name in pair} - set(names))
+    if unknown:
+        raise ValueError(f"Unknown documents: {', '.join(unknown)}")
+    if not resolved:
+        raise ValueError("The batch contains no comparisons")
+    if len(resolved) > batch_max_pairs():
+        raise ValueError(f"A batch may contain at most {batch_max_pairs()} comparisons")
+    return resolved
+
+
+async def _timed_extraction(
+    name: str, data: DocumentSource, pdf_mode: str | None, digest: str
+) -> tuple[str, float]:
+    started = time.perf_counter()
+    text = await extract_document(name, data, pdf_mode, digest)
+    return text, time.perf_counter() - started
+
+
+async def run_batch(
+    documents: dict[str, DocumentSource],
+    pairs: list[tuple[str, str]],
+    options: CompareOptions,
+    digests: dict[str, str] | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Compare every pair and yield one result per pair as soon as it finishes.
+
+    Each distinct document is extracted once however many pairs use it, all extractions
+    start immediately, and at most `BATCH_CONCURRENCY` pairs are diffed and summarized at
+    a time. `digests` optionally gives documents' known SHA-256 digests; the others are
+    hashed here. Results carry the pair's `index`; failed pairs carry `status` and
+    `detail`. A pair's `elapsed_ms` covers its slower extraction plus its own diffing and
+    summarizing, not the time spent queueing behind other pairs.
+    """
+    names = list(dict.fromkeys(name for pair in pairs for name in pair))
+    digests = dict(digests or {})
+    missing = [name for name in names if name not in digests]
+    hashed = await asyncio.gather(*(run_io(source_sha256, documents[name]) for name in missing))
+    digests.update(zip(missing, hashed))
+    extractions: dict[str, asyncio.Task] = {}
+    by_name: dict[str, asyncio.Task] = {}
+    for name in names:
+        key = extraction_cache_key(name, digests[name], options.pdf_mode)
+        if key not in extractions:
+            extractions[key] = asyncio.create_task(
+                _timed_extraction(name, documents[name], options.pdf_mode, digests[name])
+            )
+        by_name[name] = extractions[key]
+    semaphore = asyncio.Semaphore(batch_concurrency())
+
+    async def compare_pair(index: int, name_old: str, name_new: str) -> dict[str, Any]:
+        pair = {"index": index, "file_old": name_old, "file_new": name_new}
+        try:
+            text_old, seconds_old = await by_name[name_old]
+            text_new, seconds_new = await by_name[name_new]
+            async with semaphore:
+                started = time.perf_counter() - max(seconds_old, seconds_new)
+                response = await compare_texts(text_old, text_new, options)
+        except ValueError as exc:
+            return {**pair, "status": 400, "detail": str(exc)}
+        except Exception as exc:
+            logger.warning("batch comparison %s -> %s failed: %s", name_old, name_new, exc)
+            return {**pair, "status": 500, "detail": f"{type(exc).__name__}: {exc}"}
+        response.history_id = await record_history(name_old, name_new, response, started)
+        return {**pair, **response.model_dump()}
+
+    tasks = [asyncio.create_task(compare_pair(i, *pair)) for i, pair in enumerate(pairs)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Stops outstanding work when the client disconnects, and retrieves extraction
+        # errors that no pair awaited.
+        pending = [*tasks, *extractions.values()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
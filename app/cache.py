@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded in-memory cache with least-recently-used eviction.
+
+    When `ttl` is given, entries older than `ttl` seconds are treated as missing.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float | None = None):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                return None
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """Text cache stored as one file per key so several worker processes can share it.
+
+    Writes go to a temporary file that is atomically renamed into place, so readers
+    never observe a partially written entry.
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def get(self, key: str) -> str | None:
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("failed to read cache entry %s: %s", key, exc)
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(value)
+            os.replace(tmp_name, path)
+        except OSError as exc:
+            logger.warning("failed to write cache entry %s: %s", key, exc)
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional on-disk tier; disk hits are promoted."""
+
+    def __init__(self, memory: LRUCache, disk: DiskCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> str | None:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is None:
+            return None
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self) -> None:
+        """Drop the in-memory tier; disk entries are left for other workers."""
+        self.memory.clear()
@@ -0,0 +1,80 @@
+import re
+import zlib
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_HUNK_HEADER_RE = re.compile(r"^@@(?: .*@@)?$")
+_HUNK_POSITION_RE = re.compile(r"^@@ -\S+ \+\S+ @@$")
+
+# Roughly one BPE token per word or punctuation mark, plus one for every 4 characters
+# a word runs past its first 4; close enough to budget prompts without a tokenizer.
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of how many model tokens `text` will use."""
+    count = 0
+    for token in _TOKEN_RE.findall(text):
+        count += 1 + max(0, len(token) - _CHARS_PER_TOKEN) // _CHARS_PER_TOKEN
+    return count
+
+
+def split_hunks(diff_text: str) -> list[str]:
+    """Split a diff into hunks at `@@` boundaries, dropping the `---`/`+++` file headers."""
+    hunks: list[list[str]] = []
+    for line in diff_text.splitlines():
+        if not hunks and (line.startswith("--- ") or line.startswith("+++ ")):
+            continue
+        if _HUNK_HEADER_RE.match(line) or not hunks:
+            hunks.append([])
+        hunks[-1].append(line)
+    return ["\n".join(hunk) for hunk in hunks]
+
+
+def _split_oversized(hunk: str, budget: int) -> list[str]:
+    pieces: list[str] = []
+    current: list[str] = []
+    used = 0
+    for line in hunk.splitlines():
+        cost = estimate_tokens(line) + 1
+        if current and used + cost > budget:
+            pieces.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def chunk_diff(diff_text: str, budget: int) -> list[str]:
+    """Pack whole hunks into chunks of at most `budget` estimated tokens.
+
+    Besides the budget, a chunk also ends after any hunk whose checksum hits a fixed
+    pattern. These content-defined boundaries keep the chunks after a small edit
+    identical to the previous run, so their cached summaries can be reused.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    used = 0
+    for hunk in split_hunks(diff_text):
+        pieces = _split_oversized(hunk, budget) if estimate_tokens(hunk) > budget else [hunk]
+        for piece in pieces:
+            cost = estimate_tokens(piece) + 1
+            if current and used + cost > budget:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += cost
+            if used >= budget // 4 and zlib.crc32(piece.encode("utf-8")) % 4 == 0:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def strip_hunk_positions(chunk: str) -> str:
+    """Drop line numbers from `@@` headers so unchanged hunks hash the same after edits above them."""
+    return "\n".join(
+        "@@" if _HUNK_POSITION_RE.match(line) else line for line in chunk.splitlines()
+    )
@@ -0,0 +1,145 @@
+import asyncio
+import inspect
+import logging
+import threading
+import weakref
+from typing import Any, Callable
+
+from .cache import sha256_hex
+
+logger = logging.getLogger(__name__)
+
+# Exception class names (anywhere in the MRO) after which a client is rebuilt.
+_BROKEN_CLIENT_ERRORS = (
+    "AuthenticationError",
+    "PermissionDeniedError",
+    "APIConnectionError",
+    "Unauthenticated",
+    "PermissionDenied",
+    "ConnectError",
+)
+
+# Closes of discarded async clients still running on the loop.
+_closing: set[asyncio.Future] = set()
+
+
+def is_broken_client_error(exc: BaseException | None) -> bool:
+    """Return True for auth and connection errors after which a client should be rebuilt."""
+    if exc is None:
+        return False
+    if isinstance(exc, ConnectionError):
+        return True
+    for attribute in ("status_code", "code"):
+        value = getattr(exc, attribute, None)
+        if value in (401, 403) or getattr(value, "value", None) in (401, 403):
+            return True
+    return any(cls.__name__ in _BROKEN_CLIENT_ERRORS for cls in type(exc).__mro__)
+
+
+class ClientRegistry:
+    """Long-lived SDK clients keyed by provider and API key.
+
+    Each client owns a keep-alive connection pool, so reusing it across requests avoids
+    a fresh TCP/TLS handshake per summary. Keys are stored hashed.
+    """
+
+    def __init__(self):
+        self._clients: dict[tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _slot(provider: str, key: str) -> tuple[str, str]:
+        return provider, sha256_hex(key.encode("utf-8"))
+
+    def get(self, provider: str, key: str, factory: Callable[[str], Any]) -> Any | None:
+        """Return the client for `(provider, key)`, building it with `factory` once."""
+        slot = self._slot(provider, key)
+        client = self._clients.get(slot)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(slot)
+            if client is None:
+                client = factory(key)
+                if client is not None:
+                    self._clients[slot] = client
+        return client
+
+    def discard(self, provider: str, key: str) -> None:
+        """Forget and close a client, e.g. after its key was revoked or its connection
+        broke; the next `get` rebuilds it."""
+        with self._lock:
+            client = self._clients.pop(self._slot(provider, key), None)
+        _close_quietly(client)
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            _close_quietly(client)
+
+    async def aclose(self) -> None:
+        """Close async clients, awaiting their coroutine `close` methods."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            close = getattr(client, "close", None) or getattr(
+                getattr(client, "transport", None), "close", None
+            )
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.debug("failed to close client: %s", exc)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+def _close_quietly(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if close is None:
+        transport = getattr(client, "transport", None)
+        close = getattr(transport, "close", None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if inspect.isawaitable(result):
+            # Async clients close on the event loop that owns them.
+            task = asyncio.ensure_future(result)
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+    except Exception as exc:  # pragma: no cover - defensive
+        logger.debug("failed to close client: %s", exc)
+
+
+_registry = ClientRegistry()
+
+
+def get_client_registry() -> ClientRegistry:
+    return _registry
+
+
+_async_registries: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientRegistry]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_lock = threading.Lock()
+
+
+def get_async_client_registry() -> ClientRegistry:
+    """Return the registry of async clients for the running event loop.
+
+    Async SDK clients hold loop-bound connection pools, so each loop gets its own set.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        registry = _async_registries.get(loop)
+        if registry is None:
+            registry = _async_registries[loop] = ClientRegistry()
+    return registry
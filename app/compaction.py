@@ -0,0 +1,137 @@
+import re
+from collections import Counter
+from typing import Any
+
+from .chunking import estimate_tokens, split_hunks
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(line: str) -> str:
+    return _WHITESPACE_RE.sub(" ", line).strip().casefold()
+
+
+def _fold_cosmetic_edits(removed: list[str], added: list[str]) -> tuple[list[str], list[str], int]:
+    """Drop removed/added pairs that only differ in whitespace or letter case."""
+    pending = Counter(_normalize(line) for line in added)
+    matched: Counter[str] = Counter()
+    kept_removed = []
+    for line in removed:
+        key = _normalize(line)
+        if pending[key] > matched[key]:
+            matched[key] += 1
+        else:
+            kept_removed.append(line)
+    folded = sum(matched.values())
+    kept_added = []
+    for line in added:
+        key = _normalize(line)
+        if matched[key]:
+            matched[key] -= 1
+        else:
+            kept_added.append(line)
+    return kept_removed, kept_added, folded
+
+
+def _compact_hunk(hunk: str) -> tuple[list[str], int]:
+    """Strip context lines and cosmetic edits from one hunk; return its lines and fold count."""
+    lines: list[str] = []
+    removed: list[str] = []
+    added: list[str] = []
+    folded = 0
+
+    def flush() -> None:
+        nonlocal folded
+        kept_removed, kept_added, count = _fold_cosmetic_edits(removed, added)
+        folded += count
+        lines.extend("-" + line for line in kept_removed)
+        lines.extend("+" + line for line in kept_added)
+        removed.clear()
+        added.clear()
+
+    for line in hunk.splitlines():
+        if line.startswith("@@"):
+            continue
+        if line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith("+"):
+            added.append(line[1:])
+        else:
+            flush()
+            if line.startswith(" ") or not line.strip():
+                continue
+            lines.append(line)
+    flush()
+    return lines, folded
+
+
+def _trim_lines(text: str, token_budget: int) -> str:
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if kept and used + cost > token_budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def compact_diff(diff_text: str, token_budget: int | None = None) -> tuple[str, dict[str, Any]]:
+    """Shrink a diff before it is embedded in a summarization prompt.
+
+    File headers, hunk positions and context lines are dropped, edits that only change
+    whitespace or letter case are folded away, identical hunks are listed once with a
+    repeat count, and the result is cut at `token_budget` estimated tokens. A first hunk
+    that alone exceeds the budget is cut line by line (`trimmed_lines`).
+    """
+    tokens_before = estimate_tokens(diff_text)
+    order: list[str] = []
+    repeats: Counter[str] = Counter()
+    folded = 0
+    for hunk in split_hunks(diff_text):
+        lines, count = _compact_hunk(hunk)
+        folded += count
+        if not lines:
+            continue
+        body = "\n".join(lines)
+        if not repeats[body]:
+            order.append(body)
+        repeats[body] += 1
+
+    parts: list[str] = []
+    used = 0
+    omitted = 0
+    trimmed = 0
+    for body in order:
+        header = "@@" if repeats[body] == 1 else f"@@ repeated {repeats[body]}x @@"
+        part = f"{header}\n{body}"
+        cost = estimate_tokens(part)
+        if token_budget is not None and used + cost > token_budget:
+            if not parts:
+                kept = _trim_lines(part, token_budget)
+                trimmed = part.count("\n") - kept.count("\n")
+                parts.append(kept)
+            omitted = len(order) - len(parts)
+            break
+        parts.append(part)
+        used += cost
+    if folded:
+        parts.append(f"({folded} whitespace or capitalization-only edits omitted)")
+    if trimmed:
+        parts.append(f"({trimmed} further changed lines omitted to fit the prompt budget)")
+    if omitted:
+        parts.append(f"({omitted} further changed sections omitted to fit the prompt budget)")
+
+    compacted = "\n".join(parts)
+    tokens_after = estimate_tokens(compacted)
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(0, tokens_before - tokens_after),
+        "folded_edits": folded,
+        "duplicate_hunks": sum(repeats.values()) - len(order),
+        "omitted_hunks": omitted,
+        "trimmed_lines": trimmed,
+    }
+    return compacted, stats
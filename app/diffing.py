@@ -0,0 +1,477 @@
+import difflib
+import os
+import re
+from bisect import bisect_left
+from collections import Counter, deque
+from math import isqrt
+from typing import Iterable, Iterator, Sequence
+
+# "patience" anchors on lines that are unique to both sides and falls back to Myers
+# between anchors; "myers" is a linear-space O(ND) diff with a cost cutoff; "difflib"
+# is the legacy SequenceMatcher implementation.
+DIFF_ALGORITHMS = ("patience", "myers", "difflib")
+
+# "line" is a classic unified diff; "word" and "sentence" first align whole blocks
+# (paragraphs, slide shapes, PDF lines) and then diff inside changed blocks only.
+DIFF_MODES = ("line", "word", "sentence")
+
+# Sentences end at . ! ? or ; but not at the decimal point of a number such as "2.5".
+_SENTENCE_BODY = r"(?:[^.!?;]|(?<=\d)\.(?=\d))"
+_TOKEN_PATTERNS = {
+    "word": re.compile(r"\s+|\w+|[^\w\s]"),
+    "sentence": re.compile(rf"\s+|[^\s.!?;](?:{_SENTENCE_BODY}*[^\s.!?;])?[.!?;]*|[.!?;]+"),
+}
+# Unchanged tokens kept on each side of an inline change.
+_INLINE_CONTEXT = {"word": 12, "sentence": 1}
+
+Opcode = tuple[str, int, int, int, int]
+
+
+def diff_algorithm(name: str | None = None) -> str:
+    """Resolve the diff algorithm from the argument or the `DIFF_ALGORITHM` variable."""
+    name = (name or os.getenv("DIFF_ALGORITHM", "patience")).lower().strip()
+    if name not in DIFF_ALGORITHMS:
+        raise ValueError(f"Unsupported diff algorithm: {name}")
+    return name
+
+
+def diff_mode(name: str | None = None) -> str:
+    """Resolve the diff granularity from the argument or the `DIFF_MODE` variable."""
+    name = (name or os.getenv("DIFF_MODE", "line")).lower().strip()
+    if name not in DIFF_MODES:
+        raise ValueError(f"Unsupported diff mode: {name}")
+    return name
+
+
+def intern_lines(*sequences: Iterable[str]) -> list[list[int]]:
+    """Map every distinct line to a small integer so comparisons are integer compares."""
+    table: dict[str, int] = {}
+    interned = []
+    for sequence in sequences:
+        interned.append([table.setdefault(line, len(table)) for line in sequence])
+    return interned
+
+
+def _trim(a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int, out: list):
+    """Record the common prefix and suffix of a region and return the remaining bounds."""
+    start = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    if alo > start:
+        out.append((start, blo - (alo - start), alo - start))
+    end = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+    if ahi < end:
+        out.append((ahi, bhi, end - ahi))
+    return alo, ahi, blo, bhi
+
+
+# Edit-distance budget of one middle-snake search before it settles for a split point
+# (git's "too expensive" heuristic); keeps pathological inputs near-linear.
+_MIN_MAX_COST = 256
+
+
+def _max_cost(n: int, m: int) -> int:
+    return max(_MIN_MAX_COST, isqrt(n + m))
+
+
+def _furthest_split(
+    forward: list[int], backward: list[int], offset: int, d: int, n: int, m: int
+) -> tuple[int, int] | None:
+    """Return the point (relative to the region) furthest along either search after `d` steps."""
+    best: tuple[int, int] | None = None
+    best_progress = 0
+    for k in range(-d, d + 1, 2):
+        x = forward[offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and best_progress < x + y < n + m:
+            best, best_progress = (x, y), x + y
+        x = backward[offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and best_progress < x + y < n + m:
+            best, best_progress = (n - x, m - y), x + y
+    return best
+
+
+def _middle_snake(
+    a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int
+) -> tuple[int, int, int, int]:
+    """Return the middle snake (x0, y0, x1, y1) of Myers' linear-space refinement.
+
+    When the search exceeds `_max_cost` edits it returns an empty snake at the furthest
+    point reached instead, trading minimality for bounded running time.
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    limit = (n + m + 1) // 2 + 1
+    offset = limit + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    max_cost = _max_cost(n, m)
+    for d in range(limit):
+        if d > max_cost:
+            split = _furthest_split(forward, backward, offset, d - 1, n, m)
+            if split is not None:
+                return alo + split[0], blo + split[1], alo + split[0], blo + split[1]
+            max_cost = limit
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            reverse_k = delta - k
+            if odd and -(d - 1) <= reverse_k <= d - 1:
+                if x + backward[offset + reverse_k] >= n:
+                    return alo + x0, blo + y0, alo + x, blo + y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            forward_k = delta - k
+            if not odd and -d <= forward_k <= d:
+                if x + forward[offset + forward_k] >= n:
+                    return ahi - x, bhi - y, ahi - x0, bhi - y0
+    raise AssertionError("middle snake not found")  # pragma: no cover - unreachable
+
+
+def _myers_matches(
+    a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int, out: list
+) -> None:
+    """Append the matching blocks of a[alo:ahi] and b[blo:bhi] to `out`.
+
+    Lines missing from the other side can only be deleted or inserted, so, like git and
+    difflib, they are dropped before the search and a full rewrite costs linear time.
+    """
+    alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi, out)
+    if alo == ahi or blo == bhi:
+        return
+    in_a = set(a[alo:ahi])
+    in_b = set(b[blo:bhi])
+    index_a = [i for i in range(alo, ahi) if a[i] in in_b]
+    index_b = [j for j in range(blo, bhi) if b[j] in in_a]
+    if not index_a:
+        return
+    if len(index_a) == ahi - alo and len(index_b) == bhi - blo:
+        _myers_search(a, alo, ahi, b, blo, bhi, out)
+        return
+    blocks: list[tuple[int, int, int]] = []
+    kept_a = [a[i] for i in index_a]
+    kept_b = [b[j] for j in index_b]
+    _myers_search(kept_a, 0, len(kept_a), kept_b, 0, len(kept_b), blocks)
+    # A block of kept lines may span discarded ones; split it back into contiguous runs.
+    for i, j, size in blocks:
+        start = 0
+        for step in range(1, size + 1):
+            if (
+                step == size
+                or index_a[i + step] != index_a[i + step - 1] + 1
+                or index_b[j + step] != index_b[j + step - 1] + 1
+            ):
+                out.append((index_a[i + start], index_b[j + start], step - start))
+                start = step
+
+
+def _myers_search(
+    a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int, out: list
+) -> None:
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi, out)
+        if alo == ahi or blo == bhi:
+            continue
+        x0, y0, x1, y1 = _middle_snake(a, alo, ahi, b, blo, bhi)
+        if x1 > x0:
+            out.append((x0, y0, x1 - x0))
+        stack.append((alo, x0, blo, y0))
+        stack.append((x1, ahi, y1, bhi))
+
+
+def _unique_anchors(
+    a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int
+) -> list[tuple[int, int]]:
+    """Return the longest increasing run of lines that occur exactly once on each side."""
+    counts_a = Counter(a[alo:ahi])
+    counts_b = Counter(b[blo:bhi])
+    position_b = {
+        value: index
+        for index, value in enumerate(b[blo:bhi], start=blo)
+        if counts_b[value] == 1 and counts_a[value] == 1
+    }
+    candidates = [(i, position_b[value]) for i, value in enumerate(a[alo:ahi], start=alo) if value in position_b]
+    # Patience sorting: tails[k] is the smallest b index ending an increasing run of length k+1.
+    tails: list[int] = []
+    tail_index: list[int] = []
+    previous: list[int] = []
+    for index, (_, j) in enumerate(candidates):
+        k = bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[k] = j
+            tail_index[k] = index
+        previous.append(tail_index[k - 1] if k else -1)
+    anchors = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        anchors.append(candidates[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _patience_matches(
+    a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int, out: list
+) -> None:
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi, out)
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            _myers_matches(a, alo, ahi, b, blo, bhi, out)
+            continue
+        prev_a, prev_b = alo, blo
+        for i, j in anchors:
+            stack.append((prev_a, i, prev_b, j))
+            out.append((i, j, 1))
+            prev_a, prev_b = i + 1, j + 1
+        stack.append((prev_a, ahi, prev_b, bhi))
+
+
+def _merge_blocks(blocks: list[tuple[int, int, int]], n: int, m: int) -> list[tuple[int, int, int]]:
+    """Sort and coalesce adjacent blocks, ending with the (n, m, 0) sentinel like difflib."""
+    merged: list[tuple[int, int, int]] = []
+    for i, j, size in sorted(blocks):
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    merged.append((n, m, 0))
+    return merged
+
+
+def split_common_prefix(
+    a: Iterable[str], b: Iterable[str], keep: int = 0
+) -> tuple[int, list[str], list[str]]:
+    """Consume the common prefix of two line streams as the lines arrive.
+
+    Only the last `keep` common lines are retained (as diff context). Returns the number
+    of prefix lines dropped and the remaining lines of each side, both starting with the
+    retained context. Patience and Myers diffs trim common prefixes themselves, so
+    diffing the remainders with the returned offset gives the same result as diffing
+    the whole sequences.
+    """
+    iter_a, iter_b = iter(a), iter(b)
+    context: deque[str] = deque(maxlen=keep)
+    consumed = 0
+    head_a: list[str] = []
+    head_b: list[str] = []
+    for line_a in iter_a:
+        line_b = next(iter_b, None)
+        if line_b is None:
+            head_a.append(line_a)
+            break
+        if line_a != line_b:
+            head_a.append(line_a)
+            head_b.append(line_b)
+            break
+        context.append(line_a)
+        consumed += 1
+    offset = consumed - len(context)
+    rest_a = [*context, *head_a, *iter_a]
+    rest_b = [*context, *head_b, *iter_b]
+    return offset, rest_a, rest_b
+
+
+def get_opcodes(a: Sequence[str], b: Sequence[str], algorithm: str | None = None) -> list[Opcode]:
+    """Return difflib-style opcodes turning `a` into `b` using the selected algorithm."""
+    algorithm = diff_algorithm(algorithm)
+    if algorithm == "difflib":
+        return difflib.SequenceMatcher(None, a, b).get_opcodes()
+    ids_a, ids_b = intern_lines(a, b)
+    blocks: list[tuple[int, int, int]] = []
+    if algorithm == "myers":
+        _myers_matches(ids_a, 0, len(ids_a), ids_b, 0, len(ids_b), blocks)
+    else:
+        _patience_matches(ids_a, 0, len(ids_a), ids_b, 0, len(ids_b), blocks)
+
+    opcodes: list[Opcode] = []
+    i = j = 0
+    for ai, bj, size in _merge_blocks(blocks, len(a), len(b)):
+        tag = ""
+        if i < ai and j < bj:
+            tag = "replace"
+        elif i < ai:
+            tag = "delete"
+        elif j < bj:
+            tag = "insert"
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(("equal", ai, i, bj, j))
+    return opcodes
+
+
+def group_opcodes(opcodes: list[Opcode], n: int = 3) -> Iterator[list[Opcode]]:
+    """Group opcodes into hunks with `n` lines of context, mirroring difflib."""
+    codes = list(opcodes) or [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+    nn = n + n
+    group: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def format_hunk(
+    group: list[Opcode], a: Sequence[str], b: Sequence[str], offset: int = 0
+) -> Iterator[str]:
+    """Yield the `@@` header and body lines of one unified-diff hunk.
+
+    `offset` is added to the line numbers in the header, for sequences that start after
+    a skipped common prefix.
+    """
+    first, last = group[0], group[-1]
+    old_range = _format_range(first[1] + offset, last[2] + offset)
+    new_range = _format_range(first[3] + offset, last[4] + offset)
+    yield f"@@ -{old_range} +{new_range} @@"
+    for tag, i1, i2, j1, j2 in group:
+        if tag == "equal":
+            for line in a[i1:i2]:
+                yield " " + line
+            continue
+        if tag in ("replace", "delete"):
+            for line in a[i1:i2]:
+                yield "-" + line
+        if tag in ("replace", "insert"):
+            for line in b[j1:j2]:
+                yield "+" + line
+
+
+def unified_diff(
+    a: Sequence[str],
+    b: Sequence[str],
+    fromfile: str = "old",
+    tofile: str = "new",
+    n: int = 3,
+    algorithm: str | None = None,
+    offset: int = 0,
+) -> Iterator[str]:
+    """Yield unified-diff lines in exactly the format of `difflib.unified_diff(lineterm="")`."""
+    started = False
+    for group in group_opcodes(get_opcodes(a, b, algorithm), n):
+        if not started:
+            started = True
+            yield f"--- {fromfile}"
+            yield f"+++ {tofile}"
+        yield from format_hunk(group, a, b, offset)
+
+
+def _render_inline(
+    old_tokens: Sequence[str],
+    new_tokens: Sequence[str],
+    algorithm: str | None,
+    context: int,
+) -> str:
+    """Render a changed block as `[-removed-]{+added+}` markup with trimmed context."""
+    opcodes = get_opcodes(old_tokens, new_tokens, algorithm)
+    parts = []
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            tokens = old_tokens[i1:i2]
+            head = tokens[:context] if index > 0 else []
+            tail = tokens[-context:] if index < len(opcodes) - 1 else []
+            if len(tokens) <= len(head) + len(tail) + 1:
+                parts.append("".join(tokens))
+            else:
+                parts.append("".join(head) + " … " + "".join(tail))
+            continue
+        if tag in ("replace", "delete"):
+            parts.append("[-" + "".join(old_tokens[i1:i2]) + "-]")
+        if tag in ("replace", "insert"):
+            parts.append("{+" + "".join(new_tokens[j1:j2]) + "+}")
+    return "".join(parts).strip()
+
+
+def block_diff(
+    a: Sequence[str],
+    b: Sequence[str],
+    granularity: str = "word",
+    fromfile: str = "old",
+    tofile: str = "new",
+    algorithm: str | None = None,
+    context: int | None = None,
+    offset: int = 0,
+) -> Iterator[str]:
+    """Yield a structure-aware diff: align blocks by content, then diff changed blocks inline.
+
+    Unchanged blocks are matched through the interning table and never tokenized.
+    Changed blocks that pair up one-to-one are emitted as a single `~` line with inline
+    word or sentence markup; the remainder of a changed run is emitted as `-`/`+` lines.
+    """
+    pattern = _TOKEN_PATTERNS[granularity]
+    context = _INLINE_CONTEXT[granularity] if context is None else context
+    started = False
+    for tag, i1, i2, j1, j2 in get_opcodes(a, b, algorithm):
+        if tag == "equal":
+            continue
+        if not started:
+            started = True
+            yield f"--- {fromfile}"
+            yield f"+++ {tofile}"
+        old_range = _format_range(i1 + offset, i2 + offset)
+        new_range = _format_range(j1 + offset, j2 + offset)
+        yield f"@@ -{old_range} +{new_range} @@"
+        paired = min(i2 - i1, j2 - j1)
+        for index in range(paired):
+            old_tokens = pattern.findall(a[i1 + index])
+            new_tokens = pattern.findall(b[j1 + index])
+            yield "~" + _render_inline(old_tokens, new_tokens, algorithm, context)
+        for line in a[i1 + paired : i2]:
+            yield "-" + line
+        for line in b[j1 + paired : j2]:
+            yield "+" + line
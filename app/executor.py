@@ -0,0 +1,91 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("process", "thread", "inline")
+
+_cpu_executor: Executor | None = None
+_io_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def executor_backend() -> str:
+    """Return the configured backend for CPU-bound work (`process`, `thread` or `inline`)."""
+    backend = os.getenv("EXECUTOR_BACKEND", "process").lower().strip()
+    if backend not in BACKENDS:
+        logger.warning("unknown EXECUTOR_BACKEND %r, falling back to process", backend)
+        return "process"
+    return backend
+
+
+def _worker_count(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            logger.warning("ignoring invalid %s=%r", name, value)
+    return default
+
+
+def get_cpu_executor() -> Executor | None:
+    """Return the shared executor for extraction and diffing, or None when inline."""
+    global _cpu_executor
+    backend = executor_backend()
+    if backend == "inline":
+        return None
+    with _lock:
+        if _cpu_executor is None:
+            workers = _worker_count("CPU_WORKERS", os.cpu_count() or 1)
+            if backend == "process":
+                # spawn keeps workers independent of the event loop threads in the parent.
+                _cpu_executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                _cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+        return _cpu_executor
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for blocking SDK and network calls."""
+    global _io_executor
+    with _lock:
+        if _io_executor is None:
+            workers = _worker_count("IO_WORKERS", 32)
+            _io_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="io")
+        return _io_executor
+
+
+async def run_cpu(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a picklable CPU-bound callable on the configured backend."""
+    executor = get_cpu_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking callable on the I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """Shut down the shared pools; they are recreated lazily on next use."""
+    global _cpu_executor, _io_executor
+    with _lock:
+        cpu, io_pool = _cpu_executor, _io_executor
+        _cpu_executor = _io_executor = None
+    if cpu is not None:
+        cpu.shutdown(wait=False, cancel_futures=True)
+    if io_pool is not None:
+        io_pool.shutdown(wait=False, cancel_futures=True)
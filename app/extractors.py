@@ -0,0 +1,274 @@
+import codecs
+import functools
+import io
+import logging
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Third-party packages register extractors under this entry point group. Each entry
+# point resolves to an `Extractor` or a zero-argument callable returning one.
+ENTRY_POINT_GROUP = "pharm_drive.extractors"
+
+# "layout" runs pdfplumber's layout analysis; "fast" reads the raw text layer via pdfium.
+PDF_MODES = ("layout", "fast")
+
+# Documents are passed to extractors either as bytes or as a path to a file on disk;
+# paths let pdfplumber, pypdfium2, python-docx and python-pptx read only what they need.
+DocumentSource = bytes | os.PathLike
+
+# Bytes read from the start of a document for content sniffing.
+SNIFF_BYTES = 1024
+
+
+def pdf_extraction_mode(mode: str | None = None) -> str:
+    """Resolve the PDF extraction mode from the argument or `PDF_EXTRACTION_MODE`."""
+    mode = (mode or os.getenv("PDF_EXTRACTION_MODE", "layout")).lower().strip()
+    if mode not in PDF_MODES:
+        raise ValueError(f"Unsupported PDF extraction mode: {mode}")
+    return mode
+
+
+def _open_source(source: DocumentSource) -> io.BytesIO | os.PathLike:
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def read_head(source: DocumentSource, size: int = SNIFF_BYTES) -> bytes:
+    if isinstance(source, bytes):
+        return source[:size]
+    with open(source, "rb") as handle:
+        return handle.read(size)
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """A document format: how to recognise it and how to stream its text.
+
+    `extract(data, mode)` yields text pieces whose concatenation is the document text;
+    `mode` is the PDF extraction mode and may be ignored. `sniff(head, data)` gets the
+    first `SNIFF_BYTES` bytes and returns True when the content is in this format.
+
+    The API resolves extractors in its own process and hands them to the CPU workers,
+    so with the `process` executor backend both callables must be picklable: functions
+    defined at module level (or `functools.partial` objects of them), not lambdas.
+    """
+
+    name: str
+    extensions: tuple[str, ...]
+    extract: Callable[[DocumentSource, str | None], Iterable[str]]
+    sniff: Callable[[bytes, DocumentSource], bool] | None = None
+
+
+def pdf_page_count(data: DocumentSource) -> int:
+    """Return the number of pages in a PDF without extracting any text."""
+    try:
+        import pypdfium2
+    except ModuleNotFoundError:
+        import pdfplumber
+
+        with pdfplumber.open(_open_source(data)) as pdf:
+            return len(pdf.pages)
+    document = pypdfium2.PdfDocument(data)
+    try:
+        return len(document)
+    finally:
+        document.close()
+
+
+def _iter_pdf_pages_fast(data: DocumentSource, start: int, stop: int | None) -> Iterator[str]:
+    import pypdfium2
+
+    document = pypdfium2.PdfDocument(data)
+    try:
+        stop = len(document) if stop is None else min(stop, len(document))
+        for index in range(start, stop):
+            page = document[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+            textpage.close()
+            page.close()
+            yield text
+    finally:
+        document.close()
+
+
+def iter_pdf_pages(
+    data: DocumentSource, start: int = 0, stop: int | None = None, mode: str | None = None
+) -> Iterator[str]:
+    """Yield the text of pages `start` to `stop` (exclusive) of a PDF, one page at a time."""
+    mode = pdf_extraction_mode(mode)
+    if mode == "fast":
+        try:
+            import pypdfium2  # noqa: F401
+        except ModuleNotFoundError:
+            logger.warning("pypdfium2 is not installed, using pdfplumber simple extraction")
+        else:
+            yield from _iter_pdf_pages_fast(data, start, stop)
+            return
+    import pdfplumber
+
+    with pdfplumber.open(_open_source(data)) as pdf:
+        for page in pdf.pages[start:stop]:
+            text = page.extract_text_simple() if mode == "fast" else page.extract_text()
+            # Drop the page's parsed layout so memory stays flat across long documents.
+            page.close()
+            yield text or ""
+
+
+def extract_pdf_pages(
+    data: DocumentSource, start: int = 0, stop: int | None = None, mode: str | None = None
+) -> list[str]:
+    """Extract the text of pages `start` to `stop` (exclusive) of a PDF, in page order."""
+    return list(iter_pdf_pages(data, start, stop, mode))
+
+
+def _joined(parts: Iterable[str]) -> Iterator[str]:
+    """Yield `parts` separated by newlines, like a lazy `"\\n".join(parts)`."""
+    for index, part in enumerate(parts):
+        if index:
+            yield "\n"
+        yield part
+
+
+def _decoded_chunks(data: DocumentSource, size: int = 1024 * 1024) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    if isinstance(data, bytes):
+        yield decoder.decode(data, final=True)
+        return
+    with open(data, "rb") as handle:
+        while chunk := handle.read(size):
+            yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _extract_txt(data: DocumentSource, mode: str | None) -> Iterator[str]:
+    return _decoded_chunks(data)
+
+
+def _extract_pdf(data: DocumentSource, mode: str | None) -> Iterator[str]:
+    return _joined(iter_pdf_pages(data, mode=mode))
+
+
+def _extract_docx(data: DocumentSource, mode: str | None) -> Iterator[str]:
+    import docx
+
+    document = docx.Document(_open_source(data))
+    return _joined(p.text for p in document.paragraphs)
+
+
+def _extract_pptx(data: DocumentSource, mode: str | None) -> Iterator[str]:
+    from pptx import Presentation
+
+    prs = Presentation(_open_source(data))
+    return _joined(
+        shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text")
+    )
+
+
+def _sniff_pdf(head: bytes, data: DocumentSource) -> bool:
+    # The PDF header may follow a few bytes of junk, which readers tolerate.
+    return b"%PDF-" in head
+
+
+def _sniff_zip_member(member: str, head: bytes, data: DocumentSource) -> bool:
+    if not head.startswith(b"PK\x03\x04"):
+        return False
+    try:
+        with zipfile.ZipFile(_open_source(data)) as package:
+            return member in package.NameToInfo
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def _zip_member_sniffer(member: str) -> Callable[[bytes, DocumentSource], bool]:
+    """Recognise Office Open XML packages by a part only that format contains."""
+    # A partial rather than a closure keeps the extractor picklable for worker processes.
+    return functools.partial(_sniff_zip_member, member)
+
+
+BUILTIN_EXTRACTORS = (
+    Extractor("txt", (".txt",), _extract_txt),
+    Extractor("pdf", (".pdf",), _extract_pdf, _sniff_pdf),
+    Extractor("docx", (".docx",), _extract_docx, _zip_member_sniffer("word/document.xml")),
+    Extractor("pptx", (".pptx",), _extract_pptx, _zip_member_sniffer("ppt/presentation.xml")),
+)
+
+_registry: dict[str, Extractor] = {}
+_plugins_loaded = False
+_registry_lock = threading.RLock()
+
+
+def register_extractor(extractor: Extractor) -> None:
+    """Add an extractor, replacing any registered under the same name."""
+    with _registry_lock:
+        _registry[extractor.name] = extractor
+
+
+def _load_plugins() -> None:
+    """Register built-ins and entry point plugins once; broken plugins are skipped."""
+    global _plugins_loaded
+    with _registry_lock:
+        if _plugins_loaded:
+            return
+        _plugins_loaded = True
+        for extractor in BUILTIN_EXTRACTORS:
+            _registry.setdefault(extractor.name, extractor)
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                loaded = entry_point.load()
+                extractor = loaded if isinstance(loaded, Extractor) else loaded()
+                if not isinstance(extractor, Extractor):
+                    raise TypeError(f"expected an Extractor, got {type(extractor).__name__}")
+            except Exception as exc:
+                logger.warning("skipping extractor plugin %s: %s", entry_point.name, exc)
+                continue
+            _registry[extractor.name] = extractor
+
+
+def registered_extractors() -> list[Extractor]:
+    _load_plugins()
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def find_extractor(filename: str, data: DocumentSource) -> Extractor:
+    """Pick the extractor for a document by content, falling back to its extension.
+
+    An extractor matching the extension whose sniffer recognises the content wins,
+    then any extractor whose sniffer does. Only then is an extractor matching the
+    extension without a sniffer used, so a PDF named `.txt` is still read as a PDF.
+    Raises ValueError when no extractor fits.
+    """
+    ext = Path(filename).suffix.lower()
+    head = read_head(data)
+    extractors = registered_extractors()
+    by_extension = [extractor for extractor in extractors if ext in extractor.extensions]
+    for extractor in [*by_extension, *extractors]:
+        if extractor.sniff is not None and extractor.sniff(head, data):
+            return extractor
+    for extractor in by_extension:
+        if extractor.sniff is None:
+            return extractor
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+def iter_text_chunks(
+    filename: str,
+    data: DocumentSource,
+    pdf_mode: str | None = None,
+    extractor: Extractor | None = None,
+) -> Iterator[str]:
+    """Yield a document's text piece by piece: per page, slide shape or paragraph.
+
+    `"".join(...)` of the pieces equals `extract_text`. Pass `extractor` when it was
+    already resolved, e.g. by the parent of a worker process that never saw it registered.
+    """
+    if extractor is None:
+        extractor = find_extractor(filename, data)
+    return iter(extractor.extract(data, pdf_mode))
@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .storage import BlobStore, data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    file_old TEXT NOT NULL,
+    file_new TEXT NOT NULL,
+    method TEXT NOT NULL,
+    provider TEXT,
+    risk_level TEXT,
+    triage_route TEXT,
+    tokens_used INTEGER,
+    truncated INTEGER NOT NULL DEFAULT 0,
+    elapsed_ms REAL,
+    added_lines INTEGER NOT NULL DEFAULT 0,
+    removed_lines INTEGER NOT NULL DEFAULT 0,
+    diff_blob TEXT NOT NULL,
+    summary_blob TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comparisons_created ON comparisons (created_at);
+CREATE INDEX IF NOT EXISTS comparisons_risk ON comparisons (risk_level, created_at);
+CREATE INDEX IF NOT EXISTS comparisons_diff_blob ON comparisons (diff_blob);
+CREATE INDEX IF NOT EXISTS comparisons_summary_blob ON comparisons (summary_blob);
+"""
+
+_ROW_COLUMNS = (
+    "id",
+    "created_at",
+    "file_old",
+    "file_new",
+    "method",
+    "provider",
+    "risk_level",
+    "triage_route",
+    "tokens_used",
+    "truncated",
+    "elapsed_ms",
+    "added_lines",
+    "removed_lines",
+)
+
+
+def _count_changes(diff_text: str) -> tuple[int, int]:
+    added = removed = 0
+    for line in diff_text.splitlines():
+        if line.startswith("+") and not line.startswith("+++ "):
+            added += 1
+        elif line.startswith("-") and not line.startswith("--- "):
+            removed += 1
+        elif line.startswith("~"):
+            added += 1
+            removed += 1
+    return added, removed
+
+
+class HistoryStore:
+    """Comparison history kept as compact SQLite rows.
+
+    Diffs and summaries are stored out of line in a `BlobStore`, so listing and
+    filtering never load them. Only the newest `max_rows` rows are kept; blobs no longer
+    referenced by any row are deleted when older rows are pruned.
+    """
+
+    def __init__(self, path: str | os.PathLike, blobs: BlobStore, max_rows: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.blobs = blobs
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record(
+        self,
+        file_old: str,
+        file_new: str,
+        diff: str,
+        summary: str,
+        method: str,
+        provider: str | None = None,
+        risk_level: str | None = None,
+        triage_route: str | None = None,
+        tokens_used: int | None = None,
+        truncated: bool = False,
+        elapsed_ms: float | None = None,
+    ) -> int:
+        """Store one comparison and return its id."""
+        added, removed = _count_changes(diff)
+        # Blob writes and pruning happen under SQLite's write lock, so a prune in this or
+        # another worker process never deletes a blob that a concurrent record has reused.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            diff_blob = self.blobs.put_text(diff)
+            summary_blob = self.blobs.put_text(summary)
+            cursor = self._conn.execute(
+                "INSERT INTO comparisons (created_at, file_old, file_new, method, provider,"
+                " risk_level, triage_route, tokens_used, truncated, elapsed_ms, added_lines,"
+                " removed_lines, diff_blob, summary_blob)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    file_old,
+                    file_new,
+                    method,
+                    provider,
+                    risk_level,
+                    triage_route,
+                    tokens_used,
+                    int(truncated),
+                    elapsed_ms,
+                    added,
+                    removed,
+                    diff_blob,
+                    summary_blob,
+                ),
+            )
+            entry_id = cursor.lastrowid
+            for digest in self._prune():
+                self.blobs.delete(digest)
+        return entry_id
+
+    def _prune(self) -> set[str]:
+        """Delete rows beyond `max_rows`; return blobs no remaining row references."""
+        stale = self._conn.execute(
+            "SELECT id, diff_blob, summary_blob FROM comparisons"
+            " ORDER BY id DESC LIMIT -1 OFFSET ?",
+            (self.max_rows,),
+        ).fetchall()
+        if not stale:
+            return set()
+        self._conn.executemany(
+            "DELETE FROM comparisons WHERE id = ?", [(row["id"],) for row in stale]
+        )
+        candidates = {digest for row in stale for digest in (row["diff_blob"], row["summary_blob"])}
+        return {
+            digest
+            for digest in candidates
+            if self._conn.execute(
+                "SELECT 1 FROM comparisons WHERE diff_blob = ? OR summary_blob = ? LIMIT 1",
+                (digest, digest),
+            ).fetchone()
+            is None
+        }
+
+    def page(
+        self,
+        limit: int = 20,
+        offset: int = 0,
+        risk_level: str | None = None,
+        method: str | None = None,
+        search: str | None = None,
+        since: float | None = None,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Return one page of rows, newest first, and the total number of matching rows."""
+        clauses, params = [], []
+        if risk_level:
+            clauses.append("risk_level = ?")
+            params.append(risk_level)
+        if method:
+            clauses.append("method = ?")
+            params.append(method)
+        if search:
+            clauses.append("(file_old LIKE ? ESCAPE '\\' OR file_new LIKE ? ESCAPE '\\')")
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"%{escaped}%"
+            params.extend([pattern, pattern])
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM comparisons{where}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_ROW_COLUMNS)} FROM comparisons{where}"
+                " ORDER BY id DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [_row_dict(row) for row in rows], total
+
+    def get(self, entry_id: int) -> dict[str, Any] | None:
+        """Return one row together with its diff and summary text."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_ROW_COLUMNS)}, diff_blob, summary_blob"
+                " FROM comparisons WHERE id = ?",
+                (entry_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = _row_dict(row)
+        entry["diff"] = self.blobs.get_text(row["diff_blob"]) or ""
+        entry["summary"] = self.blobs.get_text(row["summary_blob"]) or ""
+        return entry
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _row_dict(row: sqlite3.Row) -> dict[str, Any]:
+    entry = {column: row[column] for column in _ROW_COLUMNS}
+    entry["truncated"] = bool(entry["truncated"])
+    return entry
+
+
+_store: HistoryStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """Return the process-wide history store under `DATA_DIR`, capped at `HISTORY_MAX_ROWS`."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            root = data_dir()
+            _store = HistoryStore(
+                root / "history.sqlite3",
+                BlobStore(root / "history-blobs"),
+                max_rows=int(os.getenv("HISTORY_MAX_ROWS", "10000")),
+            )
+        return _store
+
+
+def history_enabled() -> bool:
+    return os.getenv("HISTORY_ENABLED", "1").lower() not in ("0", "false", "no", "off")
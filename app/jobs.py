@@ -0,0 +1,536 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from .cache import sha256_hex
+from .executor import run_io
+from .pipeline import STAGES, CompareOptions, run_comparison
+from .storage import BlobStore, data_dir
+from .uploads import upload_tmp_dir
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    error TEXT,
+    file_old TEXT NOT NULL,
+    file_new TEXT NOT NULL,
+    old_blob TEXT NOT NULL,
+    new_blob TEXT NOT NULL,
+    options TEXT NOT NULL,
+    result_blob TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_until REAL,
+    lease_token TEXT,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+CREATE INDEX IF NOT EXISTS jobs_old_blob ON jobs (old_blob);
+CREATE INDEX IF NOT EXISTS jobs_new_blob ON jobs (new_blob);
+CREATE INDEX IF NOT EXISTS jobs_result_blob ON jobs (result_blob);
+"""
+
+_STATUS_COLUMNS = (
+    "id",
+    "status",
+    "stage",
+    "priority",
+    "attempts",
+    "max_attempts",
+    "error",
+    "file_old",
+    "file_new",
+    "created_at",
+    "started_at",
+    "finished_at",
+)
+
+
+class JobQueue:
+    """Durable comparison queue in SQLite, shared safely by several server processes.
+
+    Uploaded documents are stored in a `BlobStore`. A worker claims the highest-priority
+    ready job with a lease it must keep renewing; jobs whose lease lapses (for example
+    because the process died) are claimed again, or fail once their last attempt lapses.
+    Each claim hands out a new lease token, and only its holder may renew, finish or
+    release the job. Failed attempts are retried with exponential backoff until
+    `max_attempts` is reached. Finished jobs are deleted
+    `retention` seconds after they finish (never when None), together with the blobs
+    no remaining job references.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        blobs: BlobStore,
+        max_attempts: int = 3,
+        retry_backoff: float = 2.0,
+        retention: float | None = None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.blobs = blobs
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            # Queues created before lease tokens existed lack the column.
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_token" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+
+    def _put(self, data: bytes | os.PathLike) -> str:
+        return self.blobs.put(data) if isinstance(data, bytes) else self.blobs.put_file(data)
+
+    def submit(
+        self,
+        file_old: str,
+        data_old: bytes | os.PathLike,
+        file_new: str,
+        data_new: bytes | os.PathLike,
+        options: dict[str, Any],
+        priority: int = 0,
+        max_attempts: int | None = None,
+    ) -> str:
+        """Queue a comparison and return its job id; higher `priority` runs first.
+
+        The documents may be given as bytes or as paths to files, which are copied into
+        the blob store without being read into memory at once.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            # Storing the blobs under SQLite's write lock keeps a prune running in another
+            # process from deleting a blob this job is about to reference.
+            self._conn.execute("BEGIN IMMEDIATE")
+            old_blob = self._put(data_old)
+            new_blob = self._put(data_new)
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, priority, max_attempts, file_old, file_new,"
+                " old_blob, new_blob, options, created_at)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    priority,
+                    max_attempts or self.max_attempts,
+                    file_old,
+                    file_new,
+                    old_blob,
+                    new_blob,
+                    json.dumps(options),
+                    time.time(),
+                ),
+            )
+        return job_id
+
+    def claim(self, lease: float) -> dict[str, Any] | None:
+        """Atomically take the next ready job, or None when nothing is ready.
+
+        The returned job carries the `lease_token` the other worker calls require.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            # A job whose lease lapsed on its last attempt (its worker crashed or was
+            # killed) fails instead of being handed out again.
+            exhausted = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_until = NULL, lease_token = NULL,"
+                " finished_at = ?, error = 'The worker running the last attempt stopped'"
+                " WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts"
+                " RETURNING id",
+                (now, now),
+            ).fetchall()
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, stage = NULL,"
+                " lease_until = ?, lease_token = ?, started_at = COALESCE(started_at, ?)"
+                " WHERE id = (SELECT id FROM jobs"
+                "  WHERE (status = 'queued' AND not_before <= ?)"
+                "     OR (status = 'running' AND lease_until < ?)"
+                "  ORDER BY priority DESC, created_at LIMIT 1)"
+                " RETURNING *",
+                (now + lease, uuid.uuid4().hex, now, now, now),
+            ).fetchone()
+            if exhausted:
+                logger.warning(
+                    "jobs %s failed: lease lapsed on the last attempt",
+                    ", ".join(job["id"] for job in exhausted),
+                )
+                for digest in self._prune():
+                    self.blobs.delete(digest)
+        return dict(row) if row is not None else None
+
+    def heartbeat(self, job_id: str, token: str, lease: float) -> bool:
+        """Extend a running job's lease; return True when it was cancelled or the lease lost."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?"
+                " WHERE id = ? AND status = 'running' AND lease_token = ?"
+                " RETURNING cancel_requested",
+                (time.time() + lease, job_id, token),
+            ).fetchone()
+        return row is None or bool(row["cancel_requested"])
+
+    def set_stage(self, job_id: str, stage: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET stage = ? WHERE id = ?", (stage, job_id))
+
+    def complete(self, job_id: str, token: str, result: dict[str, Any]) -> bool:
+        """Store a job's result; return False when its lease has passed to another worker."""
+        return self._finish(job_id, token, "succeeded", result=json.dumps(result).encode("utf-8"))
+
+    def fail(self, job_id: str, token: str, error: str, retryable: bool = True) -> str | None:
+        """Record a failed attempt; requeue it with backoff while attempts remain.
+
+        Returns the job's new status, or None when its lease has passed to another worker.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs"
+                " WHERE id = ? AND status = 'running' AND lease_token = ?",
+                (job_id, token),
+            ).fetchone()
+            if row is None:
+                return None
+            if retryable and row["attempts"] < row["max_attempts"]:
+                delay = self.retry_backoff * 2 ** (row["attempts"] - 1)
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, lease_until = NULL,"
+                    " lease_token = NULL, not_before = ? WHERE id = ?",
+                    (error, time.time() + delay, job_id),
+                )
+                return "queued"
+        return "failed" if self._finish(job_id, token, "failed", error=error) else None
+
+    def release(self, job_id: str, token: str) -> None:
+        """Return a running job to the queue without counting the attempt, e.g. on shutdown."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0),"
+                " lease_until = NULL, lease_token = NULL"
+                " WHERE id = ? AND status = 'running' AND lease_token = ?",
+                (job_id, token),
+            )
+
+    def cancel(self, job_id: str) -> str | None:
+        """Cancel a queued job at once or flag a running one; return the resulting status."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "queued":
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?",
+                    (time.time(), job_id),
+                )
+                return "cancelled"
+            if row["status"] == "running":
+                self._conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,)
+                )
+            return row["status"]
+
+    def mark_cancelled(self, job_id: str, token: str) -> None:
+        self._finish(job_id, token, "cancelled")
+
+    def _finish(
+        self,
+        job_id: str,
+        token: str,
+        status: str,
+        error: str | None = None,
+        result: bytes | None = None,
+    ) -> bool:
+        result_blob = sha256_hex(result) if result is not None else None
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = COALESCE(?, error), result_blob = ?,"
+                " lease_until = NULL, lease_token = NULL, finished_at = ?"
+                " WHERE id = ? AND status = 'running' AND lease_token = ?",
+                (status, error, result_blob, time.time(), job_id, token),
+            ).rowcount
+            if not updated:
+                return False
+            if result is not None:
+                self.blobs.put(result)
+            for digest in self._prune():
+                self.blobs.delete(digest)
+        return True
+
+    def _prune(self) -> set[str]:
+        """Delete jobs finished more than `retention` seconds ago; return unreferenced blobs."""
+        if self.retention is None:
+            return set()
+        stale = self._conn.execute(
+            "SELECT id, old_blob, new_blob, result_blob FROM jobs WHERE finished_at < ?",
+            (time.time() - self.retention,),
+        ).fetchall()
+        if not stale:
+            return set()
+        self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in stale])
+        candidates = {
+            digest
+            for row in stale
+            for digest in (row["old_blob"], row["new_blob"], row["result_blob"])
+            if digest is not None
+        }
+        return {
+            digest
+            for digest in candidates
+            if self._conn.execute(
+                "SELECT 1 FROM jobs WHERE old_blob = ? OR new_blob = ? OR result_blob = ?"
+                " LIMIT 1",
+                (digest, digest, digest),
+            ).fetchone()
+            is None
+        }
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_STATUS_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def result(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result_blob FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row["result_blob"] is None:
+            return None
+        data = self.blobs.get(row["result_blob"])
+        return json.loads(data) if data is not None else None
+
+    def inputs(self, job: dict[str, Any]) -> tuple[Path, Path]:
+        """Copy a job's documents to temporary files, which the caller removes."""
+        paths: list[Path] = []
+        try:
+            for name, digest in (
+                (job["file_old"], job["old_blob"]),
+                (job["file_new"], job["new_blob"]),
+            ):
+                fd, tmp_name = tempfile.mkstemp(
+                    prefix="job-", suffix=Path(name).suffix, dir=upload_tmp_dir()
+                )
+                os.close(fd)
+                paths.append(Path(tmp_name))
+                if not self.blobs.get_file(digest, tmp_name):
+                    raise ValueError("Uploaded documents for this job are no longer available")
+        except BaseException:
+            for path in paths:
+                path.unlink(missing_ok=True)
+            raise
+        return paths[0], paths[1]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def stage_limits() -> dict[str, asyncio.Semaphore]:
+    """Per-stage concurrency caps from `JOB_<STAGE>_CONCURRENCY` environment variables.
+
+    Extraction and diffing default to the CPU count; the other stages are unlimited
+    unless configured.
+    """
+    defaults = {"extracting": os.cpu_count() or 1, "diffing": os.cpu_count() or 1}
+    limits = {}
+    for stage in STAGES:
+        value = os.getenv(f"JOB_{stage.upper()}_CONCURRENCY")
+        if value or stage in defaults:
+            limits[stage] = asyncio.Semaphore(max(1, int(value or defaults[stage])))
+    return limits
+
+
+class JobWorkers:
+    """Asyncio workers that drain a `JobQueue` inside the server's event loop.
+
+    API keys sent with jobs live in `api_keys` of the process that accepted them only;
+    a job claimed by another process runs with that server's own keys.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        lease: float = 60.0,
+    ):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.limits: dict[str, asyncio.Semaphore] = {}
+        self.api_keys: dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        self.limits = stage_limits()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a submission instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def cancel(self, job_id: str) -> None:
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await run_io(self.queue.claim, self.lease)
+            except sqlite3.Error as exc:
+                logger.warning("failed to claim a job: %s", exc)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _process(self, job: dict[str, Any]) -> None:
+        job_id, token = job["id"], job["lease_token"]
+        task = asyncio.create_task(self._run(job))
+        self._running[job_id] = task
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=self.lease / 3)
+                if task.done():
+                    break
+                if await run_io(self.queue.heartbeat, job_id, token, self.lease):
+                    task.cancel()
+            result = task.result()
+        except asyncio.CancelledError:
+            if not task.done():
+                # The worker itself is shutting down: hand the job back to the queue.
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await run_io(self.queue.release, job_id, token)
+                raise
+            await run_io(self.queue.mark_cancelled, job_id, token)
+        except ValueError as exc:
+            await run_io(self.queue.fail, job_id, token, str(exc), False)
+        except Exception as exc:
+            logger.warning("job %s attempt %d failed: %s", job_id, job["attempts"], exc)
+            status = await run_io(
+                self.queue.fail, job_id, token, f"{type(exc).__name__}: {exc}"
+            )
+            if status == "queued":
+                return
+        else:
+            if not await run_io(self.queue.complete, job_id, token, result):
+                logger.warning("job %s finished after its lease passed to another worker", job_id)
+        finally:
+            self._running.pop(job_id, None)
+        self.api_keys.pop(job_id, None)
+
+    async def _run(self, job: dict[str, Any]) -> dict[str, Any]:
+        path_old, path_new = await run_io(self.queue.inputs, job)
+        options = CompareOptions(
+            **json.loads(job["options"]), api_key=self.api_keys.get(job["id"])
+        )
+
+        async def on_stage(stage: str) -> None:
+            await run_io(self.queue.set_stage, job["id"], stage)
+
+        try:
+            response = await run_comparison(
+                job["file_old"],
+                path_old,
+                job["file_new"],
+                path_new,
+                options,
+                self.limits,
+                on_stage,
+            )
+        finally:
+            path_old.unlink(missing_ok=True)
+            path_new.unlink(missing_ok=True)
+        return response.model_dump()
+
+
+_queue: JobQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue under `DATA_DIR`."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            root = data_dir()
+            _queue = JobQueue(
+                root / "jobs.sqlite3",
+                BlobStore(root / "job-blobs"),
+                max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+                retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2")),
+                retention=job_retention_seconds(),
+            )
+        return _queue
+
+
+def job_retention_seconds() -> float | None:
+    """How long finished jobs are kept (`JOB_RETENTION_SECONDS`, 7 days; 0 keeps them)."""
+    retention = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    return retention if retention > 0 else None
+
+
+def create_job_workers() -> JobWorkers:
+    return JobWorkers(
+        get_job_queue(),
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        poll_interval=float(os.getenv("JOB_POLL_SECONDS", "1")),
+        lease=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+    )
+
+
+def jobs_enabled() -> bool:
+    return os.getenv("JOBS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
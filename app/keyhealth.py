@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from .cache import sha256_hex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KeyStats:
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    consecutive_failures: int = 0
+    latency: float | None = None
+    open_until: float = 0.0
+
+
+def is_rate_limit_error(exc: BaseException | None) -> bool:
+    """Return True for HTTP 429 / quota errors raised by the OpenAI or Gemini SDKs."""
+    if exc is None:
+        return False
+    for attribute in ("status_code", "code"):
+        value = getattr(exc, attribute, None)
+        if value == 429 or getattr(value, "value", None) == 429:
+            return True
+    return type(exc).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+class KeyHealthRegistry:
+    """Process-wide failure, latency and rate-limit tracking per summarizer key.
+
+    After `failure_threshold` consecutive failures a key's circuit opens for an
+    exponentially growing backoff and the key is skipped until it elapses; the next
+    call then acts as a trial. When every circuit is open, the key that recovers first
+    is still tried (half-open) so a single flaky key cannot disable summaries. Healthy
+    keys are ordered by their latency moving average, with not-yet-measured keys first
+    in their configured order.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 1,
+        base_backoff: float = 5.0,
+        max_backoff: float = 600.0,
+        smoothing: float = 0.3,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.smoothing = smoothing
+        self._stats: dict[tuple[str, str], KeyStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _slot(provider: str, key: str) -> tuple[str, str]:
+        return provider, sha256_hex(key.encode("utf-8"))
+
+    def stats(self, provider: str, key: str) -> KeyStats:
+        with self._lock:
+            return self._stats.setdefault(self._slot(provider, key), KeyStats())
+
+    def record_success(self, provider: str, key: str, latency: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(self._slot(provider, key), KeyStats())
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.open_until = 0.0
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.smoothing * (latency - stats.latency)
+
+    def record_failure(self, provider: str, key: str, rate_limited: bool = False) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(self._slot(provider, key), KeyStats())
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            if rate_limited:
+                stats.rate_limited += 1
+            excess = stats.consecutive_failures - self.failure_threshold
+            if excess >= 0:
+                backoff = min(self.max_backoff, self.base_backoff * 2**excess)
+                stats.open_until = time.monotonic() + backoff
+                logger.info(
+                    "opening circuit for %s key for %.0fs after %d failures",
+                    provider,
+                    backoff,
+                    stats.consecutive_failures,
+                )
+
+    def is_open(self, provider: str, key: str) -> bool:
+        with self._lock:
+            stats = self._stats.get(self._slot(provider, key))
+        return stats is not None and stats.open_until > time.monotonic()
+
+    def order(self, api_keys: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """Drop keys with an open circuit and sort the rest by observed latency.
+
+        If every circuit is open, return only the key whose backoff ends first.
+        """
+        now = time.monotonic()
+        ranked = []
+        reopening = []
+        with self._lock:
+            for position, (provider, key) in enumerate(api_keys):
+                stats = self._stats.get(self._slot(provider, key))
+                if stats is not None and stats.open_until > now:
+                    reopening.append((stats.open_until, position, (provider, key)))
+                    continue
+                latency = stats.latency if stats is not None else None
+                ranked.append((latency is not None, latency or 0.0, position, (provider, key)))
+        if not ranked and reopening:
+            provider, _ = trial = min(reopening)[-1]
+            logger.info(
+                "all summarizer keys are cooling down, trying the %s key due first", provider
+            )
+            return [trial]
+        ranked.sort()
+        return [entry for *_, entry in ranked]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+_registry: KeyHealthRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_key_health() -> KeyHealthRegistry:
+    """Return the process-wide key health registry, configured from the environment."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = KeyHealthRegistry(
+                failure_threshold=int(os.getenv("KEY_FAILURE_THRESHOLD", "1")),
+                base_backoff=float(os.getenv("KEY_BACKOFF_SECONDS", "5")),
+                max_backoff=float(os.getenv("KEY_BACKOFF_MAX_SECONDS", "600")),
+            )
+        return _registry
@@ -1,23 +1,130 @@
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from pydantic import BaseModel
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
 
-from .utils import diff_texts, extract_text, summarize_changes
+from fastapi import FastAPI, File, Form, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-app = FastAPI(title="Pharm-Drive API")
+from .batch import parse_pairs, read_archive, run_batch
+from .clients import get_async_client_registry, get_client_registry
+from .executor import run_cpu, run_io, shutdown_executors
+from .history import get_history_store
+from .jobs import FINISHED_STATES, create_job_workers, get_job_queue, jobs_enabled
+from .metrics import (
+    CONTENT_TYPE,
+    InFlightMiddleware,
+    diff_series,
+    metrics_enabled,
+    observe_summary,
+    render_metrics,
+    timed,
+)
+from .models import (
+    CompareResponse,
+    DocumentInfo,
+    HistoryDetail,
+    HistoryPage,
+    JobCounts,
+    JobStatus,
+    VersionInfo,
+)
+from .pipeline import (
+    DEFAULT_MISSION_CONTEXT,
+    TRIAGE_SKIP_METADATA,
+    TRIAGE_SKIP_SUMMARY,
+    CompareOptions,
+    analyze_diff,
+    build_response,
+    compare_texts,
+    extract_document,
+    model_tier,
+    record_history,
+    run_comparison,
+    streaming_diff_hunks,
+    use_streaming_diff,
+)
+from .uploads import SpooledUpload, UploadTooLargeError, get_inflight_bytes, spool_upload
+from .utils import diff_hunks, summarize_changes_stream
+from .versions import add_version, get_version_store, version_text
 
+logger = logging.getLogger(__name__)
 
-class CompareResponse(BaseModel):
-    diff: str
-    summary: str
-    method: str
-    tokens_used: int | None
-    truncated: bool
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    workers = create_job_workers() if jobs_enabled() else None
+    if workers is not None:
+        workers.start()
+    app.state.job_workers = workers
+    yield
+    if workers is not None:
+        await workers.stop()
+    shutdown_executors()
+    get_client_registry().close()
+    await get_async_client_registry().aclose()
+
+
+app = FastAPI(title="Pharm-Drive API", lifespan=lifespan)
+app.add_middleware(InFlightMiddleware)
+
+
+def _compare_options(
+    mission_context: str | None,
+    api_key: str | None,
+    pdf_mode: str | None,
+    diff_algorithm: str | None,
+    diff_mode: str | None,
+    use_cache: bool,
+) -> CompareOptions:
+    """Build and validate comparison options, turning invalid values into a 400."""
+    options = CompareOptions(
+        mission_context, api_key, pdf_mode, diff_algorithm, diff_mode, use_cache
+    )
+    try:
+        options.validate()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return options
+
+
+async def _spool(upload: UploadFile) -> SpooledUpload:
+    """Spool an upload to a temporary file, turning an oversized upload into a 413."""
+    try:
+        return await spool_upload(upload)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
 
-DEFAULT_MISSION_CONTEXT = (
-    "Summarize the document differences with the perspective of a medical science liaison "
-    "and tailor the explanation for marketing, medical affairs, legal, and sales teams."
-)
+
+def _remove_uploads(*uploads: SpooledUpload) -> None:
+    for upload in uploads:
+        upload.remove()
+
+
+async def _spool_pair(
+    file_old: UploadFile, file_new: UploadFile
+) -> tuple[SpooledUpload, SpooledUpload]:
+    """Spool both uploads to temporary files, turning oversized uploads into a 413."""
+    old = await _spool(file_old)
+    try:
+        new = await _spool(file_new)
+    except BaseException:
+        old.remove()
+        raise
+    return old, new
+
+
+@asynccontextmanager
+async def _processing(old: SpooledUpload, new: SpooledUpload):
+    """Count two spooled uploads against the in-flight limit and delete them afterwards."""
+    try:
+        async with get_inflight_bytes().reserve(old.size + new.size):
+            yield
+    finally:
+        old.remove()
+        new.remove()
 
 
 @app.post("/compare", response_model=CompareResponse)
@@ -26,26 +133,434 @@ async def compare(
     file_new: UploadFile = File(...),
     mission_context: str | None = Form(None),
     api_key: str | None = Form(None),
+    pdf_mode: str | None = Form(None),
+    diff_algorithm: str | None = Form(None),
+    diff_mode: str | None = Form(None),
+    use_cache: bool = Form(True),
 ) -> CompareResponse:
     """Compare two documents and return a diff and AI-generated summary."""
-    data_old = await file_old.read()
-    data_new = await file_new.read()
+    options = _compare_options(
+        mission_context, api_key, pdf_mode, diff_algorithm, diff_mode, use_cache
+    )
+    old, new = await _spool_pair(file_old, file_new)
     try:
-        text_old = extract_text(file_old.filename, data_old)
-        text_new = extract_text(file_new.filename, data_new)
+        async with _processing(old, new):
+            return await run_comparison(
+                old.filename,
+                old.path,
+                new.filename,
+                new.path,
+                options,
+                digests=(old.sha256, new.sha256),
+            )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    diff = diff_texts(text_old, text_new)
-    summary, metadata = summarize_changes(
-        diff,
-        mission_context=mission_context or DEFAULT_MISSION_CONTEXT,
-        api_keys_override=api_key,
+
+def _event(name: str, **fields) -> str:
+    return json.dumps({"event": name, **fields}) + "\n"
+
+
+async def _compare_events(old: SpooledUpload, new: SpooledUpload, options: CompareOptions):
+    """Yield the comparison's events; any failure ends the stream with an `error` event."""
+    async with _processing(old, new):
+        try:
+            async for event in _comparison_events(old, new, options):
+                yield event
+        except ValueError as exc:
+            yield _event("error", status=400, detail=str(exc))
+        except Exception as exc:
+            logger.warning(
+                "streamed comparison %s -> %s failed: %s", old.filename, new.filename, exc
+            )
+            yield _event("error", status=500, detail=f"{type(exc).__name__}: {exc}")
+
+
+async def _comparison_events(old: SpooledUpload, new: SpooledUpload, options: CompareOptions):
+    started = time.perf_counter()
+    yield _event("stage", stage="extracting")
+    # The hunks are computed in one piece on the CPU backend, then sent one event each.
+    if use_streaming_diff(old.path, new.path):
+        hunks = await streaming_diff_hunks(
+            old.filename, old.path, new.filename, new.path, options
+        )
+    else:
+        text_old, text_new = await asyncio.gather(
+            extract_document(old.filename, old.path, options.pdf_mode, old.sha256),
+            extract_document(new.filename, new.path, options.pdf_mode, new.sha256),
+        )
+        yield _event("stage", stage="diffing")
+        with timed(diff_series(text_old, text_new)):
+            hunks = await run_cpu(
+                diff_hunks, text_old, text_new, options.diff_algorithm, options.diff_mode
+            )
+    for hunk in hunks:
+        yield _event("diff", text=hunk)
+    diff = "\n".join(hunks)
+
+    yield _event("stage", stage="analyzing")
+    risk, triage = await analyze_diff(diff)
+    yield _event("risk", **risk)
+    if triage is not None:
+        yield _event("triage", **triage.as_dict())
+    if triage is not None and triage.route == "skip":
+        summary, metadata = TRIAGE_SKIP_SUMMARY, TRIAGE_SKIP_METADATA
+        yield _event("summary_token", text=summary)
+    else:
+        yield _event("stage", stage="summarizing")
+        summarize_started = time.perf_counter()
+        async for kind, payload in summarize_changes_stream(
+            diff,
+            mission_context=options.mission_context or DEFAULT_MISSION_CONTEXT,
+            api_keys_override=options.api_key,
+            use_cache=options.use_cache,
+            model_tier=model_tier(triage),
+        ):
+            if kind == "token":
+                yield _event("summary_token", text=payload)
+            elif kind == "reset":
+                yield _event("summary_reset")
+            else:
+                summary, metadata = payload
+        observe_summary(metadata, time.perf_counter() - summarize_started)
+    response = build_response(diff, summary, metadata, risk, triage)
+    response.history_id = await record_history(old.filename, new.filename, response, started)
+    yield _event("done", **response.model_dump(exclude={"diff"}))
+
+
+@app.post("/compare/stream")
+async def compare_stream(
+    file_old: UploadFile = File(...),
+    file_new: UploadFile = File(...),
+    mission_context: str | None = Form(None),
+    api_key: str | None = Form(None),
+    pdf_mode: str | None = Form(None),
+    diff_algorithm: str | None = Form(None),
+    diff_mode: str | None = Form(None),
+    use_cache: bool = Form(True),
+) -> StreamingResponse:
+    """Stream a comparison as NDJSON events.
+
+    Events arrive in order: `stage` markers, one `diff` event per hunk, `risk` and
+    `triage`, `summary_token` pieces of the summary (a `summary_reset` means the pieces
+    so far should be discarded), and a final `done` event carrying the remaining
+    `/compare` fields. Failures after the stream started are sent as an `error` event.
+    """
+    options = _compare_options(
+        mission_context, api_key, pdf_mode, diff_algorithm, diff_mode, use_cache
     )
-    return CompareResponse(
-        diff=diff,
-        summary=summary,
-        method=metadata["method"],
-        tokens_used=metadata["tokens_used"],
-        truncated=metadata["truncated"],
+    old, new = await _spool_pair(file_old, file_new)
+    # The generator also removes them, but it never runs if the client leaves first.
+    return StreamingResponse(
+        _compare_events(old, new, options),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(_remove_uploads, old, new),
     )
+
+
+async def _batch_documents(
+    files: list[UploadFile] | None, archive: UploadFile | None, spooled: list[SpooledUpload]
+) -> dict[str, SpooledUpload]:
+    """Spool the batch uploads, appending them to `spooled` for the caller to remove."""
+    documents: dict[str, SpooledUpload] = {}
+    if archive is not None:
+        upload = await _spool(archive)
+        spooled.append(upload)
+        try:
+            members = await run_io(read_archive, upload.path)
+        finally:
+            upload.remove()
+        spooled.extend(members.values())
+        documents.update(members)
+    for upload in files or []:
+        if upload.filename in documents:
+            raise ValueError(f"Duplicate document name: {upload.filename}")
+        spooled.append(await _spool(upload))
+        documents[upload.filename] = spooled[-1]
+    return documents
+
+
+async def _batch_events(
+    documents: dict[str, SpooledUpload], pairs: list[tuple[str, str]], options: CompareOptions
+):
+    failed = 0
+    paths = {name: document.path for name, document in documents.items()}
+    digests = {name: document.sha256 for name, document in documents.items()}
+    async for result in run_batch(paths, pairs, options, digests):
+        if "detail" in result:
+            failed += 1
+            yield _event("error", **result)
+        else:
+            yield _event("result", **result)
+    yield _event("done", pairs=len(pairs), failed=failed)
+
+
+@app.post("/compare/batch")
+async def compare_batch(
+    files: list[UploadFile] | None = File(None),
+    archive: UploadFile | None = File(None),
+    pairs: str | None = Form(None),
+    baseline: str | None = Form(None),
+    mission_context: str | None = Form(None),
+    api_key: str | None = Form(None),
+    pdf_mode: str | None = Form(None),
+    diff_algorithm: str | None = Form(None),
+    diff_mode: str | None = Form(None),
+    use_cache: bool = Form(True),
+) -> StreamingResponse:
+    """Compare many document pairs in one request, streaming NDJSON results.
+
+    Documents come as repeated `files` uploads and/or a zip `archive`, and are named by
+    file name or archive path. `pairs` is a JSON list of `[old, new]` names; `baseline`
+    instead compares one document against all others. Each finished pair is sent as a
+    `result` event (the `/compare` fields plus `index`, `file_old` and `file_new`) or an
+    `error` event, in completion order, followed by a final `done` event.
+    """
+    options = _compare_options(
+        mission_context, api_key, pdf_mode, diff_algorithm, diff_mode, use_cache
+    )
+    spooled: list[SpooledUpload] = []
+    try:
+        try:
+            documents = await _batch_documents(files, archive, spooled)
+            pair_list = parse_pairs(pairs, baseline, list(documents))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except BaseException:
+        _remove_uploads(*spooled)
+        raise
+    return StreamingResponse(
+        _batch_events(documents, pair_list, options),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(_remove_uploads, *spooled),
+    )
+
+
+@app.post("/documents/{document}/versions", response_model=VersionInfo, status_code=201)
+async def upload_version(
+    document: str,
+    response: Response,
+    file: UploadFile = File(...),
+    pdf_mode: str | None = Form(None),
+) -> VersionInfo:
+    """Store a new version of a document lineage and extract its text once.
+
+    Uploading content identical to the latest version returns that version with 200.
+    """
+    upload = await _spool(file)
+    try:
+        version, created = await add_version(
+            get_version_store(), document, upload.filename, upload.path, pdf_mode, upload.sha256
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        upload.remove()
+    if not created:
+        response.status_code = 200
+    return VersionInfo(**version)
+
+
+@app.get("/documents", response_model=list[DocumentInfo])
+async def documents() -> list[DocumentInfo]:
+    return [DocumentInfo(**row) for row in await run_io(get_version_store().documents)]
+
+
+@app.get("/documents/{document}/versions", response_model=list[VersionInfo])
+async def document_versions(document: str) -> list[VersionInfo]:
+    """List a lineage's versions, newest first."""
+    versions = await run_io(get_version_store().versions, document)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return [VersionInfo(**version) for version in versions]
+
+
+@app.get("/versions/{version_id}", response_model=VersionInfo)
+async def version_info(version_id: int) -> VersionInfo:
+    version = await run_io(get_version_store().get, version_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return VersionInfo(**version)
+
+
+async def _versions_to_compare(
+    old_version: int | None, new_version: int | None, document: str | None
+) -> tuple[dict, dict]:
+    store = get_version_store()
+    if old_version is not None and new_version is not None:
+        old, new = await asyncio.gather(
+            run_io(store.get, old_version), run_io(store.get, new_version)
+        )
+        if old is None or new is None:
+            raise HTTPException(status_code=404, detail="Version not found")
+        return old, new
+    if document:
+        latest = await run_io(store.versions, document, 2)
+        if len(latest) < 2:
+            raise HTTPException(
+                status_code=404, detail="Document needs at least two versions to compare"
+            )
+        return latest[1], latest[0]
+    raise HTTPException(
+        status_code=400, detail="Provide old_version and new_version, or document"
+    )
+
+
+@app.post("/compare/versions", response_model=CompareResponse)
+async def compare_versions(
+    old_version: int | None = Form(None),
+    new_version: int | None = Form(None),
+    document: str | None = Form(None),
+    mission_context: str | None = Form(None),
+    api_key: str | None = Form(None),
+    pdf_mode: str | None = Form(None),
+    diff_algorithm: str | None = Form(None),
+    diff_mode: str | None = Form(None),
+    use_cache: bool = Form(True),
+) -> CompareResponse:
+    """Compare two stored versions by id, or a lineage's latest version with the previous one.
+
+    Stored texts are reused, so nothing is uploaded or extracted again.
+    """
+    options = _compare_options(
+        mission_context, api_key, pdf_mode, diff_algorithm, diff_mode, use_cache
+    )
+    old, new = await _versions_to_compare(old_version, new_version, document)
+    started = time.perf_counter()
+    store = get_version_store()
+    try:
+        text_old, text_new = await asyncio.gather(
+            version_text(store, old, options.pdf_mode), version_text(store, new, options.pdf_mode)
+        )
+        response = await compare_texts(text_old, text_new, options)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response.history_id = await record_history(
+        f"{old['document']} v{old['version']}",
+        f"{new['document']} v{new['version']}",
+        response,
+        started,
+    )
+    return response
+
+
+@app.get("/history", response_model=HistoryPage)
+async def history(
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    risk_level: str | None = None,
+    method: str | None = None,
+    q: str | None = None,
+    since: float | None = None,
+) -> HistoryPage:
+    """Page through past comparisons, newest first, without their diffs or summaries.
+
+    `q` matches file names; `since` is a Unix timestamp.
+    """
+    items, total = await run_io(
+        get_history_store().page, limit, offset, risk_level, method, q, since
+    )
+    return HistoryPage(total=total, limit=limit, offset=offset, items=items)
+
+
+@app.get("/history/{entry_id}", response_model=HistoryDetail)
+async def history_entry(entry_id: int) -> HistoryDetail:
+    """Return one past comparison including its diff and summary."""
+    entry = await run_io(get_history_store().get, entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Comparison not found")
+    return HistoryDetail(**entry)
+
+
+async def _job_status(job_id: str) -> JobStatus:
+    job = await run_io(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(**job)
+
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    file_old: UploadFile = File(...),
+    file_new: UploadFile = File(...),
+    mission_context: str | None = Form(None),
+    api_key: str | None = Form(None),
+    pdf_mode: str | None = Form(None),
+    diff_algorithm: str | None = Form(None),
+    diff_mode: str | None = Form(None),
+    use_cache: bool = Form(True),
+    priority: int = Form(0),
+) -> JobStatus:
+    """Queue a comparison for the background workers and return its job status.
+
+    The API key is held in memory only; a job retried after a restart uses the
+    server's configured keys.
+    """
+    options = _compare_options(
+        mission_context, api_key, pdf_mode, diff_algorithm, diff_mode, use_cache
+    )
+    old, new = await _spool_pair(file_old, file_new)
+    try:
+        job_id = await run_io(
+            get_job_queue().submit,
+            old.filename,
+            old.path,
+            new.filename,
+            new.path,
+            options.as_dict(),
+            priority,
+        )
+    finally:
+        old.remove()
+        new.remove()
+    workers = getattr(app.state, "job_workers", None)
+    if workers is not None:
+        if api_key:
+            workers.api_keys[job_id] = api_key
+        workers.notify()
+    return await _job_status(job_id)
+
+
+@app.get("/jobs", response_model=JobCounts)
+async def job_counts() -> JobCounts:
+    """Return how many jobs are in each state."""
+    return JobCounts(counts=await run_io(get_job_queue().counts))
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str) -> JobStatus:
+    return await _job_status(job_id)
+
+
+@app.get("/jobs/{job_id}/result", response_model=CompareResponse)
+async def job_result(job_id: str) -> CompareResponse:
+    """Return a finished job's comparison; 409 while it is queued, running or failed."""
+    status = await _job_status(job_id)
+    if status.status != "succeeded":
+        detail = status.error if status.status in FINISHED_STATES else None
+        raise HTTPException(
+            status_code=409, detail=detail or f"Job is {status.status}, no result available"
+        )
+    result = await run_io(get_job_queue().result, job_id)
+    if result is None:
+        raise HTTPException(status_code=410, detail="Job result is no longer available")
+    return CompareResponse(**result)
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str) -> JobStatus:
+    """Cancel a queued job, or stop a running one at its next checkpoint."""
+    if await run_io(get_job_queue().cancel, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    workers = getattr(app.state, "job_workers", None)
+    if workers is not None:
+        workers.cancel(job_id)
+    return await _job_status(job_id)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Expose per-stage latencies and counters in the Prometheus text format."""
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,289 @@
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Metrics are plain in-process counters rendered in the Prometheus text format. They are
+# updated from the event loop thread: series are created up front for the label values
+# we know, a lock is only taken to add an unseen series, and an observation is a dict
+# lookup plus a couple of list slot increments. Work done in the executor pools is
+# timed by the awaiting coroutine, so process workers never touch these objects.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds of the `size_bucket` and `lines` label values; larger inputs get "+Inf".
+SIZE_BUCKETS = (
+    (100 * 1024, "100KiB"),
+    (1024**2, "1MiB"),
+    (10 * 1024**2, "10MiB"),
+    (100 * 1024**2, "100MiB"),
+)
+LINE_BUCKETS = ((1000, "1k"), (10_000, "10k"), (100_000, "100k"), (1_000_000, "1M"))
+
+# "streaming" times a streaming pass that extracts and diffs both documents at once.
+_FILE_TYPES = ("txt", "pdf", "docx", "pptx", "streaming")
+_PROVIDERS = ("openai", "gemini", "none")
+_OUTCOMES = ("ok", "cached", "fallback")
+_CACHES = ("extraction", "summary")
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+
+def bucket_label(value: float, buckets: tuple[tuple[int, str], ...]) -> str:
+    """Return the label of the smallest bucket holding `value`."""
+    for bound, label in buckets:
+        if value <= bound:
+            return label
+    return "+Inf"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not labelnames:
+            self.labels()
+
+    def _new_series(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """Return the series for `values`, creating it on first use."""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def preallocate(self, *label_values: tuple[str, ...]) -> None:
+        for values in label_values:
+            self.labels(*values)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, series in list(self._series.items()):
+            labels = _labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(series.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+
+class _HistogramSeries:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; counts are per bucket and summed when rendered.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, series in list(self._series.items()):
+            counts = list(series.counts)
+            total = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                total += count
+                labels = _labels(self.labelnames, values, le=_format_value(float(bound)))
+                yield f"{self.name}_bucket{labels} {total}"
+            labels = _labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(series.sum)}"
+            yield f"{self.name}_count{labels} {total}"
+
+
+UPLOAD_READ_SECONDS = Histogram(
+    "pharm_drive_upload_read_seconds", "Time spent reading one upload to a temporary file."
+)
+EXTRACT_SECONDS = Histogram(
+    "pharm_drive_extract_seconds",
+    "Time spent extracting a document's text on a cache miss.",
+    ("file_type", "size_bucket"),
+)
+DIFF_SECONDS = Histogram(
+    "pharm_drive_diff_seconds", "Time spent diffing two extracted texts.", ("lines",)
+)
+SUMMARIZE_SECONDS = Histogram(
+    "pharm_drive_summarize_seconds",
+    "Time spent summarizing a diff.",
+    ("provider", "outcome"),
+)
+TOKENS_USED = Counter(
+    "pharm_drive_summary_tokens_total",
+    "Tokens reported by summarization providers.",
+    ("provider",),
+)
+SUMMARY_FALLBACKS = Counter(
+    "pharm_drive_summary_fallbacks_total", "Summaries that fell back to the plain diff text."
+)
+SUMMARY_TRUNCATIONS = Counter(
+    "pharm_drive_summary_truncations_total", "Summaries built from a truncated diff."
+)
+CACHE_HITS = Counter("pharm_drive_cache_hits_total", "Cache hits by cache.", ("cache",))
+REQUESTS_IN_FLIGHT = Gauge(
+    "pharm_drive_requests_in_flight", "HTTP requests currently being handled."
+)
+
+METRICS = (
+    UPLOAD_READ_SECONDS,
+    EXTRACT_SECONDS,
+    DIFF_SECONDS,
+    SUMMARIZE_SECONDS,
+    TOKENS_USED,
+    SUMMARY_FALLBACKS,
+    SUMMARY_TRUNCATIONS,
+    CACHE_HITS,
+    REQUESTS_IN_FLIGHT,
+)
+
+_SIZE_LABELS = (*(label for _, label in SIZE_BUCKETS), "+Inf")
+_LINE_LABELS = (*(label for _, label in LINE_BUCKETS), "+Inf")
+EXTRACT_SECONDS.preallocate(*((kind, size) for kind in _FILE_TYPES for size in _SIZE_LABELS))
+DIFF_SECONDS.preallocate(*((label,) for label in _LINE_LABELS))
+SUMMARIZE_SECONDS.preallocate(*((p, outcome) for p in _PROVIDERS for outcome in _OUTCOMES))
+TOKENS_USED.preallocate(*((provider,) for provider in _PROVIDERS))
+CACHE_HITS.preallocate(*((cache,) for cache in _CACHES))
+
+
+def render_metrics() -> str:
+    return "".join(metric.render() for metric in METRICS)
+
+
+@contextmanager
+def timed(series: Any) -> Iterator[None]:
+    """Observe the duration of the block in a histogram series unless it raises."""
+    started = time.perf_counter()
+    yield
+    series.observe(time.perf_counter() - started)
+
+
+def observe_extraction(file_type: str, size: int, seconds: float) -> None:
+    EXTRACT_SECONDS.labels(file_type, bucket_label(size, SIZE_BUCKETS)).observe(seconds)
+
+
+def diff_series(text_old: str, text_new: str) -> Any:
+    """Return the `DIFF_SECONDS` series for the combined line count of two texts."""
+    lines = text_old.count("\n") + text_new.count("\n") + 2
+    return DIFF_SECONDS.labels(bucket_label(lines, LINE_BUCKETS))
+
+
+def observe_summary(metadata: dict[str, Any], seconds: float) -> None:
+    """Record a finished summarization from its metadata."""
+    method = metadata.get("method")
+    outcome = method if method in ("cached", "fallback") else "ok"
+    provider = metadata.get("provider") or "none"
+    SUMMARIZE_SECONDS.labels(provider, outcome).observe(seconds)
+    if metadata.get("tokens_used"):
+        TOKENS_USED.labels(provider).inc(metadata["tokens_used"])
+    if outcome == "fallback":
+        SUMMARY_FALLBACKS.inc()
+    elif outcome == "cached":
+        CACHE_HITS.labels("summary").inc()
+    if metadata.get("truncated"):
+        SUMMARY_TRUNCATIONS.inc()
+
+
+class InFlightMiddleware:
+    """ASGI middleware counting HTTP requests until their response, streamed or not, ends."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
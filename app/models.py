@@ -0,0 +1,100 @@
+from pydantic import BaseModel
+
+
+class TriageResult(BaseModel):
+    route: str
+    reason: str
+    changed_lines: int = 0
+    risk_terms: list[str] = []
+
+
+class HunkRisk(BaseModel):
+    index: int
+    header: str
+    level: str
+    tags: list[str]
+    matches: int
+
+
+class RiskResult(BaseModel):
+    level: str
+    counts: dict[str, int] = {}
+    hunks: list[HunkRisk] = []
+
+
+class CompareResponse(BaseModel):
+    diff: str
+    summary: str
+    method: str
+    tokens_used: int | None
+    truncated: bool
+    provider: str | None = None
+    chunks: int = 1
+    tokens_saved: int = 0
+    triage: TriageResult | None = None
+    risk: RiskResult | None = None
+    history_id: int | None = None
+
+
+class HistoryEntry(BaseModel):
+    id: int
+    created_at: float
+    file_old: str
+    file_new: str
+    method: str
+    provider: str | None = None
+    risk_level: str | None = None
+    triage_route: str | None = None
+    tokens_used: int | None = None
+    truncated: bool = False
+    elapsed_ms: float | None = None
+    added_lines: int = 0
+    removed_lines: int = 0
+
+
+class HistoryPage(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: list[HistoryEntry]
+
+
+class HistoryDetail(HistoryEntry):
+    diff: str
+    summary: str
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    stage: str | None = None
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 1
+    error: str | None = None
+    file_old: str
+    file_new: str
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+class JobCounts(BaseModel):
+    counts: dict[str, int]
+
+
+class VersionInfo(BaseModel):
+    id: int
+    document: str
+    version: int
+    filename: str
+    sha256: str
+    size: int
+    created_at: float
+
+
+class DocumentInfo(BaseModel):
+    document: str
+    versions: int
+    latest_version: int
+    updated_at: float
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable
+
+from .diffing import diff_algorithm as validate_diff_algorithm
+from .diffing import diff_mode as validate_diff_mode
+from .executor import executor_backend, run_cpu, run_io
+from .extractors import find_extractor
+from .history import get_history_store, history_enabled
+from .metrics import CACHE_HITS, diff_series, observe_extraction, observe_summary, timed
+from .models import CompareResponse, RiskResult, TriageResult
+from .risk import scan_diff_risk
+from .triage import TriageDecision, triage_diff, triage_enabled
+from .utils import (
+    DocumentSource,
+    diff_document_hunks,
+    diff_texts,
+    extract_pdf_pages,
+    extract_text,
+    extraction_cache_key,
+    get_extraction_cache,
+    pdf_extraction_mode,
+    pdf_page_count,
+    source_sha256,
+    summarize_changes_async,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MISSION_CONTEXT = (
+    "Summarize the document differences with the perspective of a medical science liaison "
+    "and tailor the explanation for marketing, medical affairs, legal, and sales teams."
+)
+
+TRIAGE_SKIP_SUMMARY = (
+    "Summary:\nNo substantive changes detected "
+    "(only formatting, dates, page numbers or job codes differ)."
+)
+TRIAGE_SKIP_METADATA = {"method": "triage", "tokens_used": None, "truncated": False}
+
+STAGES = ("extracting", "diffing", "analyzing", "summarizing")
+
+
+@dataclass
+class CompareOptions:
+    mission_context: str | None = None
+    api_key: str | None = None
+    pdf_mode: str | None = None
+    diff_algorithm: str | None = None
+    diff_mode: str | None = None
+    use_cache: bool = True
+
+    def validate(self) -> None:
+        """Raise ValueError for unknown PDF modes, diff algorithms or diff modes."""
+        pdf_extraction_mode(self.pdf_mode)
+        validate_diff_algorithm(self.diff_algorithm)
+        validate_diff_mode(self.diff_mode)
+
+    def as_dict(self, include_api_key: bool = False) -> dict[str, Any]:
+        options = asdict(self)
+        if not include_api_key:
+            options.pop("api_key")
+        return options
+
+
+def streaming_diff_min_bytes() -> int:
+    """Combined document size from which comparisons use a streaming diff (0 disables)."""
+    return int(os.getenv("STREAMING_DIFF_MIN_BYTES", str(64 * 1024 * 1024)))
+
+
+def _source_size(data: DocumentSource) -> int:
+    return len(data) if isinstance(data, bytes) else os.path.getsize(data)
+
+
+def use_streaming_diff(data_old: DocumentSource, data_new: DocumentSource) -> bool:
+    threshold = streaming_diff_min_bytes()
+    return bool(threshold) and _source_size(data_old) + _source_size(data_new) >= threshold
+
+
+async def streaming_diff_hunks(
+    name_old: str,
+    data_old: DocumentSource,
+    name_new: str,
+    data_new: DocumentSource,
+    options: CompareOptions,
+) -> list[str]:
+    """Extract and diff two large documents in one streaming pass, returning the hunks.
+
+    This bypasses the extraction cache so neither full text is ever built.
+    """
+    extractors = await asyncio.gather(
+        run_io(find_extractor, name_old, data_old),
+        run_io(find_extractor, name_new, data_new),
+    )
+    started = time.perf_counter()
+    hunks = await run_cpu(
+        diff_document_hunks,
+        name_old,
+        data_old,
+        name_new,
+        data_new,
+        options.pdf_mode,
+        options.diff_algorithm,
+        options.diff_mode,
+        tuple(extractors),
+    )
+    size = _source_size(data_old) + _source_size(data_new)
+    observe_extraction("streaming", size, time.perf_counter() - started)
+    return hunks
+
+
+def _pdf_shard_pages() -> int:
+    return max(1, int(os.getenv("PDF_SHARD_PAGES", "25")))
+
+
+async def _extract_pdf_sharded(data: DocumentSource, pdf_mode: str | None) -> str:
+    """Split a PDF into page ranges, extract them in parallel and rejoin them in order."""
+    shard_size = _pdf_shard_pages()
+    page_count = await run_cpu(pdf_page_count, data)
+    shards = await asyncio.gather(
+        *(
+            run_cpu(extract_pdf_pages, data, start, start + shard_size, pdf_mode)
+            for start in range(0, page_count, shard_size)
+        )
+    )
+    return "\n".join(text for shard in shards for text in shard)
+
+
+async def extract_document(
+    filename: str,
+    data: DocumentSource,
+    pdf_mode: str | None = None,
+    digest: str | None = None,
+) -> str:
+    """Extract text on the CPU backend, consulting the extraction cache first.
+
+    `data` may be the document's bytes or a path to it; pass `digest` when its SHA-256
+    is already known to skip hashing it again.
+    """
+    cache = get_extraction_cache()
+    if digest is None:
+        digest = await run_io(source_sha256, data)
+    key = extraction_cache_key(filename, digest, pdf_mode)
+    text = cache.get(key)
+    if text is not None:
+        CACHE_HITS.labels("extraction").inc()
+        return text
+    started = time.perf_counter()
+    extractor = await run_io(find_extractor, filename, data)
+    if extractor.name == "pdf" and executor_backend() != "inline":
+        text = await _extract_pdf_sharded(data, pdf_mode)
+    else:
+        text = await run_cpu(extract_text, filename, data, pdf_mode, extractor)
+    observe_extraction(extractor.name, _source_size(data), time.perf_counter() - started)
+    cache.set(key, text)
+    return text
+
+
+async def analyze_diff(diff: str) -> tuple[dict, TriageDecision | None]:
+    """Scan the diff for risk and, when enabled, triage it on the CPU backend."""
+    checks = [run_cpu(scan_diff_risk, diff)]
+    if triage_enabled():
+        checks.append(run_cpu(triage_diff, diff))
+    risk, *routed = await asyncio.gather(*checks)
+    return risk, routed[0] if routed else None
+
+
+def model_tier(triage: TriageDecision | None) -> str:
+    return "fast" if triage is not None and triage.route == "fast" else "full"
+
+
+def build_response(
+    diff: str, summary: str, metadata: dict, risk: dict, triage: TriageDecision | None
+) -> CompareResponse:
+    return CompareResponse(
+        diff=diff,
+        summary=summary,
+        method=metadata["method"],
+        tokens_used=metadata["tokens_used"],
+        truncated=metadata["truncated"],
+        provider=metadata.get("provider"),
+        chunks=metadata.get("chunks", 1),
+        tokens_saved=metadata.get("tokens_saved", 0),
+        triage=TriageResult(**triage.as_dict()) if triage is not None else None,
+        risk=RiskResult(**risk),
+    )
+
+
+async def record_history(
+    file_old: str, file_new: str, response: CompareResponse, started: float
+) -> int | None:
+    """Store the comparison in the history; failures are logged, never raised."""
+    if not history_enabled():
+        return None
+    try:
+        return await run_io(
+            get_history_store().record,
+            file_old,
+            file_new,
+            diff=response.diff,
+            summary=response.summary,
+            method=response.method,
+            provider=response.provider,
+            risk_level=response.risk.level if response.risk else None,
+            triage_route=response.triage.route if response.triage else None,
+            tokens_used=response.tokens_used,
+            truncated=response.truncated,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+    except Exception as exc:
+        logger.warning("failed to record comparison history: %s", exc)
+        return None
+
+
+StageCallback = Callable[[str], Awaitable[None]]
+
+
+@asynccontextmanager
+async def _stage(
+    name: str,
+    limits: dict[str, asyncio.Semaphore] | None,
+    on_stage: StageCallback | None,
+):
+    semaphore = limits.get(name) if limits else None
+    async with semaphore if semaphore is not None else nullcontext():
+        if on_stage is not None:
+            await on_stage(name)
+        yield
+
+
+async def compare_texts(
+    text_old: str,
+    text_new: str,
+    options: CompareOptions,
+    limits: dict[str, asyncio.Semaphore] | None = None,
+    on_stage: StageCallback | None = None,
+) -> CompareResponse:
+    """Diff, analyze and summarize two already extracted texts."""
+    async with _stage("diffing", limits, on_stage):
+        with timed(diff_series(text_old, text_new)):
+            diff = await run_cpu(
+                diff_texts, text_old, text_new, options.diff_algorithm, options.diff_mode
+            )
+    return await review_diff(diff, options, limits, on_stage)
+
+
+async def review_diff(
+    diff: str,
+    options: CompareOptions,
+    limits: dict[str, asyncio.Semaphore] | None = None,
+    on_stage: StageCallback | None = None,
+) -> CompareResponse:
+    """Scan, triage and summarize a finished diff."""
+    async with _stage("analyzing", limits, on_stage):
+        risk, triage = await analyze_diff(diff)
+    if triage is not None and triage.route == "skip":
+        summary, metadata = TRIAGE_SKIP_SUMMARY, TRIAGE_SKIP_METADATA
+    else:
+        async with _stage("summarizing", limits, on_stage):
+            started = time.perf_counter()
+            summary, metadata = await summarize_changes_async(
+                diff,
+                mission_context=options.mission_context or DEFAULT_MISSION_CONTEXT,
+                api_keys_override=options.api_key,
+                use_cache=options.use_cache,
+                model_tier=model_tier(triage),
+            )
+            observe_summary(metadata, time.perf_counter() - started)
+    return build_response(diff, summary, metadata, risk, triage)
+
+
+async def run_comparison(
+    name_old: str,
+    data_old: DocumentSource,
+    name_new: str,
+    data_new: DocumentSource,
+    options: CompareOptions,
+    limits: dict[str, asyncio.Semaphore] | None = None,
+    on_stage: StageCallback | None = None,
+    digests: tuple[str | None, str | None] = (None, None),
+) -> CompareResponse:
+    """Extract, diff, analyze and summarize two documents, then record the comparison.
+
+    `limits` optionally caps how many comparisons may be inside each of `STAGES` at
+    once; `on_stage` is awaited whenever a stage starts. Invalid inputs raise ValueError.
+    """
+    started = time.perf_counter()
+    if use_streaming_diff(data_old, data_new):
+        # Large documents are extracted and diffed in one streaming pass.
+        async with _stage("extracting", limits, on_stage):
+            hunks = await streaming_diff_hunks(name_old, data_old, name_new, data_new, options)
+        diff = "\n".join(hunks)
+        response = await review_diff(diff, options, limits, on_stage)
+    else:
+        async with _stage("extracting", limits, on_stage):
+            text_old, text_new = await asyncio.gather(
+                extract_document(name_old, data_old, options.pdf_mode, digests[0]),
+                extract_document(name_new, data_new, options.pdf_mode, digests[1]),
+            )
+        response = await compare_texts(text_old, text_new, options, limits, on_stage)
+    response.history_id = await record_history(name_old, name_new, response, started)
+    return response
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from .chunking import split_hunks
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = ("low", "medium", "high")
+
+# Each category lists synonyms matched as whole words (a trailing `*` also matches
+# longer words, e.g. `contraindicat*`) and optional regexes, all case-insensitive.
+DEFAULT_LEXICON: list[dict[str, Any]] = [
+    {
+        "category": "dosage",
+        "level": "high",
+        "terms": ["dosage", "dose*", "dosing", "titrat*", "maximum daily", "loading dose"],
+        "patterns": [r"\b\d+(?:[.,]\d+)?\s?(?:mg|mcg|µg|g|ml|units?|iu)(?:/(?:kg|day|m2|ml))?\b"],
+    },
+    {
+        "category": "contraindication",
+        "level": "high",
+        "terms": ["contraindicat*", "do not use", "must not be used"],
+    },
+    {
+        "category": "boxed warning",
+        "level": "high",
+        "terms": ["boxed warning", "black box"],
+    },
+    {
+        "category": "adverse events",
+        "level": "high",
+        "terms": [
+            "adverse event*",
+            "adverse reaction*",
+            "side effect*",
+            "serious",
+            "fatal*",
+            "death*",
+            "hepatotoxic*",
+            "anaphyla*",
+            "suicid*",
+        ],
+    },
+    {
+        "category": "warnings",
+        "level": "high",
+        "terms": ["warning*", "precaution*", "overdos*"],
+    },
+    {
+        "category": "interactions",
+        "level": "high",
+        "terms": ["interaction*", "cyp3a4", "cyp2d6", "inhibitor*", "coadministrat*"],
+    },
+    {
+        "category": "pregnancy",
+        "level": "high",
+        "terms": ["pregnan*", "lactat*", "breastfeed*", "fetal"],
+    },
+    {
+        "category": "indication",
+        "level": "medium",
+        "terms": ["indicat*", "approved for", "treatment of"],
+    },
+    {
+        "category": "efficacy",
+        "level": "medium",
+        "terms": ["efficacy", "effective*", "clinical stud*", "clinical trial*", "endpoint*"],
+    },
+    {
+        "category": "population",
+        "level": "medium",
+        "terms": ["pediatric*", "paediatric*", "geriatric*", "elderly", "renal", "hepatic"],
+    },
+    {
+        "category": "storage",
+        "level": "medium",
+        "terms": ["storage", "store*", "refrigerat*", "expir*", "shelf life"],
+    },
+    {
+        "category": "promotional claims",
+        "level": "medium",
+        "terms": ["superior*", "clinically proven", "guarantee*", "safest", "best-in-class"],
+    },
+]
+
+
+@dataclass(frozen=True)
+class RiskMatch:
+    category: str
+    level: str
+    text: str
+    start: int
+    end: int
+
+
+class AhoCorasick:
+    """Find every occurrence of many literal strings in one pass over the text."""
+
+    def __init__(self, words: list[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        self.words = words
+        for index, word in enumerate(words):
+            state = 0
+            for char in word:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[tuple[int, int, int]]:
+        """Yield `(start, end, word_index)` for each match, ordered by end position."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                yield position + 1 - len(self.words[index]), position + 1, index
+
+
+def _is_word_char(text: str, position: int) -> bool:
+    return 0 <= position < len(text) and (text[position].isalnum() or text[position] == "_")
+
+
+class RiskScanner:
+    """Tag diff lines with regulatory risk categories from a configurable lexicon.
+
+    Literal terms are matched together by an Aho-Corasick automaton and regexes by a
+    single combined pattern, so each changed line is scanned once regardless of the
+    lexicon size. Overlapping matches keep the leftmost, longest one.
+    """
+
+    def __init__(self, lexicon: list[dict[str, Any]] | None = None):
+        lexicon = DEFAULT_LEXICON if lexicon is None else lexicon
+        words: list[str] = []
+        self._terms: list[tuple[str, str, bool]] = []
+        alternatives: list[str] = []
+        self._pattern_categories: dict[str, tuple[str, str]] = {}
+        for entry in lexicon:
+            category = entry["category"]
+            level = entry.get("level", "high")
+            if level not in RISK_LEVELS:
+                raise ValueError(f"Unknown risk level {level!r} for {category!r}")
+            for term in entry.get("terms", []):
+                prefix = term.endswith("*")
+                word = term.rstrip("*").lower()
+                if word:
+                    words.append(word)
+                    self._terms.append((category, level, prefix))
+            for pattern in entry.get("patterns", []):
+                group = f"p{len(self._pattern_categories)}"
+                re.compile(pattern)
+                alternatives.append(f"(?P<{group}>{pattern})")
+                self._pattern_categories[group] = (category, level)
+        self._automaton = AhoCorasick(words) if words else None
+        self._patterns = (
+            re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        )
+
+    def scan_text(self, text: str) -> list[RiskMatch]:
+        lowered = text.lower()
+        found: list[RiskMatch] = []
+        if self._automaton is not None:
+            for start, end, index in self._automaton.finditer(lowered):
+                category, level, prefix = self._terms[index]
+                if _is_word_char(lowered, start - 1):
+                    continue
+                if prefix:
+                    while _is_word_char(lowered, end):
+                        end += 1
+                elif _is_word_char(lowered, end):
+                    continue
+                found.append(RiskMatch(category, level, lowered[start:end], start, end))
+        if self._patterns is not None:
+            for match in self._patterns.finditer(text):
+                category, level = self._pattern_categories[match.lastgroup]
+                found.append(
+                    RiskMatch(category, level, match.group(0).lower(), match.start(), match.end())
+                )
+        found.sort(key=lambda match: (match.start, -match.end))
+        kept: list[RiskMatch] = []
+        for match in found:
+            if not kept or match.start >= kept[-1].end:
+                kept.append(match)
+        return kept
+
+    def scan_diff(self, diff_text: str) -> dict[str, Any]:
+        """Scan the changed lines of each hunk and summarize the risk they carry.
+
+        Returns the overall `level`, match `counts` per category and one entry per hunk
+        with risk matches, giving its `index`, `header`, `level`, `tags` and `matches`.
+        """
+        counts: Counter[str] = Counter()
+        hunks = []
+        overall = "low"
+        for index, hunk in enumerate(split_hunks(diff_text)):
+            lines = hunk.splitlines()
+            header = lines[0] if lines and lines[0].startswith("@@") else ""
+            hunk_counts: Counter[str] = Counter()
+            level = "low"
+            for line in lines:
+                if not line or line[0] not in "+-~":
+                    continue
+                for match in self.scan_text(line[1:]):
+                    hunk_counts[match.category] += 1
+                    level = max(level, match.level, key=RISK_LEVELS.index)
+            if not hunk_counts:
+                continue
+            counts.update(hunk_counts)
+            overall = max(overall, level, key=RISK_LEVELS.index)
+            hunks.append(
+                {
+                    "index": index,
+                    "header": header,
+                    "level": level,
+                    "tags": sorted(hunk_counts),
+                    "matches": sum(hunk_counts.values()),
+                }
+            )
+        return {"level": overall, "counts": dict(counts), "hunks": hunks}
+
+
+_scanner: RiskScanner | None = None
+
+
+def get_risk_scanner() -> RiskScanner:
+    """Return the process-wide scanner, optionally loaded from a `RISK_LEXICON_FILE` JSON file.
+
+    The file holds a list of `{"category", "level", "terms", "patterns"}` entries and
+    replaces the built-in lexicon.
+    """
+    global _scanner
+    if _scanner is None:
+        lexicon = None
+        path = os.getenv("RISK_LEXICON_FILE")
+        if path:
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    lexicon = json.load(handle)
+            except (OSError, ValueError) as exc:
+                logger.warning("failed to load risk lexicon from %s: %s", path, exc)
+        _scanner = RiskScanner(lexicon)
+    return _scanner
+
+
+def scan_diff_risk(diff_text: str) -> dict[str, Any]:
+    """Module-level entry point so worker processes reuse their own compiled scanner."""
+    return get_risk_scanner().scan_diff(diff_text)
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+from .cache import sha256_hex
+
+logger = logging.getLogger(__name__)
+
+
+def data_dir() -> Path:
+    """Return the directory for persistent server state (`DATA_DIR`, default `./data`)."""
+    return Path(os.getenv("DATA_DIR", "data"))
+
+
+class BlobStore:
+    """Content-addressed blobs, zlib-compressed and stored one file per SHA-256 digest.
+
+    Identical payloads are written once. Writes use a temporary file that is renamed
+    into place, so concurrent writers and readers never see a partial blob.
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        digest = sha256_hex(data)
+        path = self._path(digest)
+        if path.exists():
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(zlib.compress(data, 6))
+            os.replace(tmp_name, path)
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def put_file(self, source: str | os.PathLike, chunk_size: int = 1024 * 1024) -> str:
+        """Store a file's contents like `put`, compressing it chunk by chunk."""
+        directory = self.directory / "incoming"
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj(6)
+        try:
+            with os.fdopen(fd, "wb") as handle, open(source, "rb") as reader:
+                while chunk := reader.read(chunk_size):
+                    digest.update(chunk)
+                    handle.write(compressor.compress(chunk))
+                handle.write(compressor.flush())
+            path = self._path(digest.hexdigest())
+            if path.exists():
+                Path(tmp_name).unlink()
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_name, path)
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return digest.hexdigest()
+
+    def get(self, digest: str) -> bytes | None:
+        try:
+            return zlib.decompress(self._path(digest).read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error) as exc:
+            logger.warning("failed to read blob %s: %s", digest, exc)
+            return None
+
+    def get_file(
+        self, digest: str, target: str | os.PathLike, chunk_size: int = 1024 * 1024
+    ) -> bool:
+        """Decompress a blob into `target` chunk by chunk; return False when it is missing."""
+        decompressor = zlib.decompressobj()
+        try:
+            with open(self._path(digest), "rb") as reader, open(target, "wb") as handle:
+                while chunk := reader.read(chunk_size):
+                    handle.write(decompressor.decompress(chunk, chunk_size))
+                    while decompressor.unconsumed_tail:
+                        tail = decompressor.unconsumed_tail
+                        handle.write(decompressor.decompress(tail, chunk_size))
+                handle.write(decompressor.flush())
+        except FileNotFoundError:
+            return False
+        except (OSError, zlib.error) as exc:
+            logger.warning("failed to read blob %s: %s", digest, exc)
+            return False
+        return True
+
+    def put_text(self, text: str) -> str:
+        return self.put(text.encode("utf-8"))
+
+    def get_text(self, digest: str) -> str | None:
+        data = self.get(digest)
+        return data.decode("utf-8") if data is not None else None
+
+    def delete(self, digest: str) -> None:
+        self._path(digest).unlink(missing_ok=True)
+
+    def __contains__(self, digest: str) -> bool:
+        return self._path(digest).exists()
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from .risk import RiskScanner, get_risk_scanner
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("skip", "fast", "full")
+
+# Whole month names or their abbreviations only, so "Decrease" or "Octreotide" followed
+# by a dose is never mistaken for a date.
+_MONTH = (
+    r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?"
+    r"|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\b\.?"
+)
+
+# (pattern, replacement) pairs applied to both sides before comparing changed lines;
+# edits that disappear after normalization never reach the summarizer. Numeric dates
+# need a four-digit year so ratios ("1/1000") and titration steps ("5-10-20") stay put,
+# and a revision number only counts when nothing but a delimiter follows it, so
+# "Revised 10 tablets per pack" keeps its dose.
+DEFAULT_NORMALIZATION_RULES: list[tuple[str, str]] = [
+    (rf"\b{_MONTH}\s+\d{{1,2}},?\s+\d{{4}}\b", "<date>"),
+    (rf"\b{_MONTH}\s+\d{{4}}\b", "<date>"),
+    (r"\b\d{4}-\d{2}-\d{2}\b", "<date>"),
+    (r"\b\d{1,2}([/.-])\d{1,2}\1(?:19|20)\d{2}\b", "<date>"),
+    (r"\b[A-Z]{2,}(?:-[A-Z0-9]+)*-\d{3,}[A-Z0-9-]*\b", "<code>"),
+    (r"(?i)\bpage\s+\d+(?:\s+of\s+\d+)?\b", "<page>"),
+    (r"(?i)\b(?:rev(?:ised|ision)?|version)\b[.:]?\s*v?\d+(?:\.\d+)*\s*(?=[,;)]|$)", "<rev>"),
+    (r"(?i)\bv\d+(?:\.\d+)+\b", "<rev>"),
+    (r"\s+", " "),
+]
+
+@dataclass
+class TriageDecision:
+    route: str
+    reason: str
+    changed_lines: int = 0
+    risk_terms: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "route": self.route,
+            "reason": self.reason,
+            "changed_lines": self.changed_lines,
+            "risk_terms": self.risk_terms,
+        }
+
+
+class Triage:
+    """Classify a diff into no-LLM, fast-model or full-model handling."""
+
+    def __init__(
+        self,
+        normalization_rules: list[tuple[str, str]] | None = None,
+        high_risk_terms: list[str] | None = None,
+        fast_max_changed_lines: int = 20,
+        scanner: RiskScanner | None = None,
+    ):
+        rules = DEFAULT_NORMALIZATION_RULES if normalization_rules is None else normalization_rules
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in rules]
+        if high_risk_terms is not None:
+            scanner = RiskScanner(
+                [{"category": "high risk", "terms": [term + "*" for term in high_risk_terms]}]
+            )
+        self.scanner = scanner if scanner is not None else get_risk_scanner()
+        self.fast_max_changed_lines = fast_max_changed_lines
+
+    def normalize(self, line: str) -> str:
+        for pattern, replacement in self.rules:
+            line = pattern.sub(replacement, line)
+        return line.strip().casefold()
+
+    @staticmethod
+    def _changed_lines(diff_text: str) -> list[str]:
+        return [
+            line[1:]
+            for line in diff_text.splitlines()
+            if line[:1] in ("+", "-", "~") and not line.startswith(("--- ", "+++ "))
+        ]
+
+    def _risk_terms(self, lines: list[str]) -> list[str]:
+        return sorted({match.text for line in lines for match in self.scanner.scan_text(line)})
+
+    def _substantive_lines(self, diff_text: str) -> list[str]:
+        # Removed and added lines only cancel out within a hunk, so a sentence moved to
+        # another section still counts as a change.
+        substantive: list[str] = []
+        removed: Counter[str] = Counter()
+        added: Counter[str] = Counter()
+        originals: dict[str, str] = {}
+
+        def end_hunk() -> None:
+            remaining = (removed - added) + (added - removed)
+            substantive.extend(originals[key] for key in remaining.elements())
+            removed.clear()
+            added.clear()
+            originals.clear()
+
+        for line in diff_text.splitlines():
+            if line.startswith("@@"):
+                end_hunk()
+                continue
+            if line.startswith(("--- ", "+++ ")) or not line:
+                continue
+            marker, body = line[0], line[1:]
+            if marker == "~":
+                # Inline word/sentence diffs: compare the two sides of the markup.
+                old = re.sub(r"\{\+.*?\+\}", "", body).replace("[-", "").replace("-]", "")
+                new = re.sub(r"\[-.*?-\]", "", body).replace("{+", "").replace("+}", "")
+                if self.normalize(old) != self.normalize(new):
+                    originals.setdefault("~" + body, body)
+                    added["~" + body] += 1
+                continue
+            if marker not in "+-":
+                continue
+            key = self.normalize(body)
+            if not key:
+                continue
+            originals.setdefault(key, body)
+            (added if marker == "+" else removed)[key] += 1
+        end_hunk()
+        return substantive
+
+    def classify(self, diff_text: str) -> TriageDecision:
+        lines = self._substantive_lines(diff_text)
+        if not lines:
+            # Normalization must never hide a safety-relevant edit, so the skip route also
+            # requires the original changed lines to be free of risk vocabulary.
+            changed = self._changed_lines(diff_text)
+            terms = self._risk_terms(changed)
+            if terms:
+                return TriageDecision("full", "regulatory vocabulary changed", len(changed), terms)
+            return TriageDecision("skip", "only formatting, date, page or job-code changes")
+        terms = self._risk_terms(lines)
+        if terms:
+            return TriageDecision("full", "regulatory vocabulary changed", len(lines), terms)
+        if len(lines) <= self.fast_max_changed_lines:
+            return TriageDecision("fast", "small low-risk change", len(lines))
+        return TriageDecision("full", "large change", len(lines))
+
+
+_triage: Triage | None = None
+
+
+def get_triage() -> Triage:
+    """Return the process-wide triage, optionally configured by a `TRIAGE_RULES_FILE` JSON file.
+
+    The file may set `normalization_rules` (a list of `[pattern, replacement]` pairs),
+    `high_risk_terms` (a list of terms matched as word prefixes, replacing the risk
+    lexicon for routing) and `fast_max_changed_lines`.
+    """
+    global _triage
+    if _triage is None:
+        config: dict[str, Any] = {}
+        path = os.getenv("TRIAGE_RULES_FILE")
+        if path:
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    config = json.load(handle)
+            except (OSError, ValueError) as exc:
+                logger.warning("failed to load triage rules from %s: %s", path, exc)
+        rules = config.get("normalization_rules")
+        _triage = Triage(
+            normalization_rules=[tuple(rule) for rule in rules] if rules is not None else None,
+            high_risk_terms=config.get("high_risk_terms"),
+            fast_max_changed_lines=int(config.get("fast_max_changed_lines", 20)),
+        )
+    return _triage
+
+
+def triage_enabled() -> bool:
+    return os.getenv("TRIAGE_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+
+def triage_diff(diff_text: str) -> TriageDecision:
+    """Module-level entry point so worker processes reuse their own compiled triage."""
+    return get_triage().classify(diff_text)
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from fastapi import UploadFile
+
+from .executor import run_io
+from .metrics import UPLOAD_READ_SECONDS
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds `UPLOAD_MAX_BYTES`."""
+
+
+def upload_max_bytes() -> int:
+    """Per-file upload limit from `UPLOAD_MAX_BYTES` (default 100 MB, 0 disables it)."""
+    return int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+
+
+def upload_max_inflight_bytes() -> int:
+    """Limit on the total size of documents being compared at once (default 512 MB)."""
+    return int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(512 * 1024 * 1024)))
+
+
+def upload_tmp_dir() -> str | None:
+    return os.getenv("UPLOAD_TMP_DIR") or None
+
+
+@dataclass
+class SpooledUpload:
+    filename: str
+    path: Path
+    sha256: str
+    size: int
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _write_chunk(handle: BinaryIO, digest: Any, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int | None = None) -> SpooledUpload:
+    """Copy an upload to a temporary file chunk by chunk, hashing it on the way.
+
+    The whole document is never held in memory. Uploads larger than `max_bytes`
+    (`UPLOAD_MAX_BYTES` by default) raise `UploadTooLargeError`. The caller removes the
+    file when done.
+    """
+    limit = upload_max_bytes() if max_bytes is None else max_bytes
+    filename = upload.filename or ""
+    fd, name = tempfile.mkstemp(
+        prefix="upload-", suffix=Path(filename).suffix, dir=upload_tmp_dir()
+    )
+    spooled = SpooledUpload(filename, Path(name), "", 0)
+    digest = hashlib.sha256()
+    started = time.perf_counter()
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                spooled.size += len(chunk)
+                if limit and spooled.size > limit:
+                    raise UploadTooLargeError(
+                        f"{filename} exceeds the upload limit of {limit} bytes"
+                    )
+                await run_io(_write_chunk, handle, digest, chunk)
+    except BaseException:
+        spooled.remove()
+        raise
+    spooled.sha256 = digest.hexdigest()
+    UPLOAD_READ_SECONDS.observe(time.perf_counter() - started)
+    return spooled
+
+
+def spool_file(filename: str, reader: BinaryIO) -> SpooledUpload:
+    """Copy an open binary file to a temporary file like `spool_upload`, synchronously."""
+    fd, name = tempfile.mkstemp(
+        prefix="upload-", suffix=Path(filename).suffix, dir=upload_tmp_dir()
+    )
+    spooled = SpooledUpload(filename, Path(name), "", 0)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while chunk := reader.read(UPLOAD_CHUNK_SIZE):
+                spooled.size += len(chunk)
+                _write_chunk(handle, digest, chunk)
+    except BaseException:
+        spooled.remove()
+        raise
+    spooled.sha256 = digest.hexdigest()
+    return spooled
+
+
+class InflightBytes:
+    """Caps the total size of the documents the server processes at once.
+
+    A reservation waits until enough earlier ones are released; a single request larger
+    than the cap is still admitted once nothing else is in flight.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, size: int):
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: not self.limit or self.used == 0 or self.used + size <= self.limit
+            )
+            self.used += size
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.used -= size
+                self._condition.notify_all()
+
+
+_inflight: InflightBytes | None = None
+
+
+def get_inflight_bytes() -> InflightBytes:
+    """Return the process-wide in-flight limiter sized by `UPLOAD_MAX_INFLIGHT_BYTES`."""
+    global _inflight
+    if _inflight is None:
+        _inflight = InflightBytes(upload_max_inflight_bytes())
+    return _inflight
@@ -1,44 +1,226 @@
-import io
+import asyncio
+import hashlib
+import inspect
 import logging
 import os
-import difflib
+import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Iterable, Iterator
 
-import docx
-import pdfplumber
-from pptx import Presentation
+from .cache import DiskCache, LRUCache, TieredCache, sha256_hex
+from .chunking import chunk_diff, estimate_tokens, strip_hunk_positions
+from .clients import get_async_client_registry, get_client_registry, is_broken_client_error
+from .compaction import compact_diff
+from .diffing import (
+    block_diff,
+    diff_algorithm,
+    diff_mode,
+    split_common_prefix,
+    unified_diff,
+)
+from .executor import run_io
+from .extractors import (  # noqa: F401 - re-exported for existing callers
+    PDF_MODES,
+    DocumentSource,
+    Extractor,
+    extract_pdf_pages,
+    iter_pdf_pages,
+    iter_text_chunks,
+    pdf_extraction_mode,
+    pdf_page_count,
+)
+from .keyhealth import get_key_health, is_rate_limit_error
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever extraction output changes so stale cache entries are ignored.
+EXTRACTOR_VERSION = "1"
 
-def extract_text(filename: str, data: bytes) -> str:
-    """Extract text from supported document types based on file extension."""
-    ext = Path(filename).suffix.lower()
-    if ext == ".txt":
-        return data.decode("utf-8")
-    if ext == ".docx":
-        document = docx.Document(io.BytesIO(data))
-        return "\n".join(p.text for p in document.paragraphs)
-    if ext == ".pdf":
-        with pdfplumber.open(io.BytesIO(data)) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
-    if ext == ".pptx":
-        prs = Presentation(io.BytesIO(data))
-        texts = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    texts.append(shape.text)
-        return "\n".join(texts)
-    raise ValueError(f"Unsupported file type: {ext}")
-
-def diff_texts(old: str, new: str) -> str:
-    """Return a unified diff between two strings."""
-    diff = difflib.unified_diff(
-        old.splitlines(), new.splitlines(), fromfile="old", tofile="new", lineterm=""
+_extraction_cache: TieredCache | None = None
+_summary_cache: LRUCache | None = None
+_parsed_env_keys: tuple[tuple[str, ...], list[tuple[str, str]]] | None = None
+
+
+def source_sha256(source: DocumentSource) -> str:
+    """Return the SHA-256 hex digest of a document, reading files in chunks."""
+    if isinstance(source, bytes):
+        return sha256_hex(source)
+    digest = hashlib.sha256()
+    with open(source, "rb") as handle:
+        while chunk := handle.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Yield the lines of `"".join(chunks)` exactly as `str.splitlines()` splits them."""
+    buffer = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (buffer + chunk).splitlines(keepends=True)
+        # The last line may still grow, or its "\r" may pair with a leading "\n".
+        buffer = lines.pop()
+        for line in lines:
+            yield line.splitlines()[0]
+    yield from buffer.splitlines()
+
+
+def iter_document_lines(
+    filename: str,
+    data: DocumentSource,
+    pdf_mode: str | None = None,
+    extractor: Extractor | None = None,
+) -> Iterator[str]:
+    """Yield the lines of a document's text while it is being extracted."""
+    return iter_lines(iter_text_chunks(filename, data, pdf_mode, extractor))
+
+
+def extract_text(
+    filename: str,
+    data: DocumentSource,
+    pdf_mode: str | None = None,
+    extractor: Extractor | None = None,
+) -> str:
+    """Extract text from a supported document, chosen by content and file extension.
+
+    `extractor` skips that choice when the caller already resolved it.
+    """
+    return "".join(iter_text_chunks(filename, data, pdf_mode, extractor))
+
+
+def extraction_cache_key(filename: str, digest: str, pdf_mode: str | None = None) -> str:
+    """Return the cache key for a document with the given SHA-256 content digest."""
+    ext = Path(filename).suffix.lower().lstrip(".") or "none"
+    if ext == "pdf":
+        ext = f"pdf-{pdf_extraction_mode(pdf_mode)}"
+    return f"{digest}-{ext}-v{EXTRACTOR_VERSION}"
+
+
+def get_extraction_cache() -> TieredCache:
+    """Return the process-wide extraction cache, building it from the environment."""
+    global _extraction_cache
+    if _extraction_cache is None:
+        size = int(os.getenv("EXTRACTION_CACHE_SIZE", "64"))
+        directory = os.getenv("EXTRACTION_CACHE_DIR")
+        disk = DiskCache(directory) if directory else None
+        _extraction_cache = TieredCache(LRUCache(size), disk)
+    return _extraction_cache
+
+
+def diff_line_streams(
+    old_lines: Iterable[str],
+    new_lines: Iterable[str],
+    algorithm: str | None = None,
+    mode: str | None = None,
+) -> Iterator[str]:
+    """Diff two streams of lines, consuming their common prefix as it arrives.
+
+    Lines are interned so repeated lines (headers, footers, boilerplate) share memory.
+    Only the lines after the first difference are held for the diff itself.
+    """
+    mode = diff_mode(mode)
+    algorithm = diff_algorithm(algorithm)
+    old_lines, new_lines = map(sys.intern, old_lines), map(sys.intern, new_lines)
+    if algorithm == "difflib":
+        # SequenceMatcher does not trim common prefixes, so skipping one could change its
+        # output.
+        offset, old, new = 0, list(old_lines), list(new_lines)
+    else:
+        offset, old, new = split_common_prefix(old_lines, new_lines, 3 if mode == "line" else 0)
+    if mode == "line":
+        return unified_diff(
+            old, new, fromfile="old", tofile="new", algorithm=algorithm, offset=offset
+        )
+    return block_diff(old, new, granularity=mode, algorithm=algorithm, offset=offset)
+
+
+def _diff_lines(
+    old: str, new: str, algorithm: str | None = None, mode: str | None = None
+) -> Iterable[str]:
+    return diff_line_streams(old.splitlines(), new.splitlines(), algorithm, mode)
+
+
+def diff_documents(
+    name_old: str,
+    data_old: DocumentSource,
+    name_new: str,
+    data_new: DocumentSource,
+    pdf_mode: str | None = None,
+    algorithm: str | None = None,
+    mode: str | None = None,
+    extractors: tuple[Extractor | None, Extractor | None] = (None, None),
+) -> str:
+    """Extract and diff two documents in one pass without building either full text.
+
+    Both documents are extracted lazily, page by page, while their common prefix is
+    compared, so diffing starts before extraction finishes. `extractors` optionally
+    gives the already resolved extractor of each document.
+    """
+    return "\n".join(
+        diff_line_streams(
+            iter_document_lines(name_old, data_old, pdf_mode, extractors[0]),
+            iter_document_lines(name_new, data_new, pdf_mode, extractors[1]),
+            algorithm,
+            mode,
+        )
     )
-    return "\n".join(diff)
+
+
+def diff_document_hunks(
+    name_old: str,
+    data_old: DocumentSource,
+    name_new: str,
+    data_new: DocumentSource,
+    pdf_mode: str | None = None,
+    algorithm: str | None = None,
+    mode: str | None = None,
+    extractors: tuple[Extractor | None, Extractor | None] = (None, None),
+) -> list[str]:
+    """Return the `diff_documents` output split into hunks like `diff_hunks`."""
+    return _split_hunks(
+        diff_line_streams(
+            iter_document_lines(name_old, data_old, pdf_mode, extractors[0]),
+            iter_document_lines(name_new, data_new, pdf_mode, extractors[1]),
+            algorithm,
+            mode,
+        )
+    )
+
+
+def diff_texts(
+    old: str, new: str, algorithm: str | None = None, mode: str | None = None
+) -> str:
+    """Return a unified diff, or a block-then-word/sentence diff, between two strings."""
+    return "\n".join(_diff_lines(old, new, algorithm, mode))
+
+
+def diff_hunks(
+    old: str, new: str, algorithm: str | None = None, mode: str | None = None
+) -> list[str]:
+    """Return the `diff_texts` output split before each `@@` header.
+
+    The file headers stay with the first hunk, so `"\\n".join(...)` gives the full diff.
+    """
+    return _split_hunks(_diff_lines(old, new, algorithm, mode))
+
+
+def _split_hunks(lines: Iterable[str]) -> list[str]:
+    hunks: list[str] = []
+    current: list[str] = []
+    in_hunk = False
+    for line in lines:
+        if line.startswith("@@"):
+            if in_hunk:
+                hunks.append("\n".join(current))
+                current = []
+            in_hunk = True
+        current.append(line)
+    if current:
+        hunks.append("\n".join(current))
+    return hunks
 
 def _parse_key_entry(entry: str) -> tuple[str, str]:
     entry = entry.strip()
@@ -51,6 +233,20 @@ def _parse_key_entry(entry: str) -> tuple[str, str]:
 
 
 def _gather_api_keys() -> list[tuple[str, str]]:
+    """Return the configured keys, re-parsing only when the environment changed."""
+    global _parsed_env_keys
+    snapshot = tuple(
+        os.getenv(name, "") for name in ("SUMMARIZER_API_KEYS", "OPENAI_API_KEY", "GEMINI_API_KEY")
+    )
+    cached = _parsed_env_keys
+    if cached is not None and cached[0] == snapshot:
+        return list(cached[1])
+    parsed = _parse_env_keys()
+    _parsed_env_keys = (snapshot, parsed)
+    return list(parsed)
+
+
+def _parse_env_keys() -> list[tuple[str, str]]:
     parsed: list[tuple[str, str]] = []
     env_keys = os.getenv("SUMMARIZER_API_KEYS", "")
     if env_keys:
@@ -67,12 +263,30 @@ def _gather_api_keys() -> list[tuple[str, str]]:
     return parsed
 
 
+def _provider_timeout(provider: str) -> float:
+    """Seconds to wait for one summarization call, from e.g. `OPENAI_TIMEOUT`."""
+    return float(os.getenv(f"{provider.upper()}_TIMEOUT", "30"))
+
+
 def _create_openai_client(api_key: str):
     """Return an OpenAI client instance or None if the SDK is unavailable."""
     try:
         from openai import OpenAI
 
-        return OpenAI(api_key=api_key)
+        return OpenAI(api_key=api_key, timeout=_provider_timeout("openai"))
+    except ModuleNotFoundError:
+        logger.warning("openai SDK is not installed, skipping OpenAI summarizer")
+    except Exception as exc:
+        logger.warning("failed to create OpenAI client: %s", exc)
+    return None
+
+
+def _create_async_openai_client(api_key: str):
+    """Return an AsyncOpenAI client instance or None if the SDK is unavailable."""
+    try:
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=api_key, timeout=_provider_timeout("openai"))
     except ModuleNotFoundError:
         logger.warning("openai SDK is not installed, skipping OpenAI summarizer")
     except Exception as exc:
@@ -80,6 +294,25 @@ def _create_openai_client(api_key: str):
     return None
 
 
+def _create_gemini_client(api_key: str, asynchronous: bool = False):
+    """Return a Gemini generative service client bound to one key, or None."""
+    try:
+        from google.ai import generativelanguage as glm
+    except ModuleNotFoundError:
+        logger.warning("google.generativeai SDK not installed, skipping Gemini summarizer")
+        return None
+    try:
+        cls = glm.GenerativeServiceAsyncClient if asynchronous else glm.GenerativeServiceClient
+        return cls(client_options={"api_key": api_key})
+    except Exception as exc:
+        logger.warning("failed to create Gemini client: %s", exc)
+    return None
+
+
+def _create_async_gemini_client(api_key: str):
+    return _create_gemini_client(api_key, asynchronous=True)
+
+
 def _fallback_summary(diff_text: str) -> str:
     return "Summary:\n" + diff_text[:500]
 
@@ -102,65 +335,168 @@ def _merge_api_keys(
     return _gather_api_keys()
 
 
-def _call_openai(prompt: str, key: str, client_factory=None) -> tuple[str | None, dict[str, Any]]:
-    client_factory = client_factory or _create_openai_client
-    client = client_factory(key)
+def _openai_model_name(tier: str = "full") -> str:
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    if tier == "fast":
+        return os.getenv("OPENAI_FAST_MODEL", model)
+    return model
+
+
+def _openai_request(prompt: str, tier: str = "full") -> dict[str, Any]:
+    return {
+        "model": _openai_model_name(tier),
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 200,
+    }
+
+
+def _parse_openai_response(response) -> tuple[str | None, dict[str, Any]]:
+    usage = getattr(response, "usage", None)
+    tokens = getattr(usage, "total_tokens", None) if usage else None
+    return response.choices[0].message.content.strip(), {"tokens_used": tokens}
+
+
+def _call_openai(
+    prompt: str, key: str, client_factory=None, tier: str = "full"
+) -> tuple[str | None, dict[str, Any]]:
+    if client_factory is None:
+        client = get_client_registry().get("openai", key, _create_openai_client)
+    else:
+        client = client_factory(key)
     if client is None:
         return None, {}
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200,
-        )
+        response = client.chat.completions.create(**_openai_request(prompt, tier))
     except Exception as exc:  # pragma: no cover - defensive
         logger.warning("OpenAI summarization failed: %s", exc)
+        return None, {"error": exc}
+    return _parse_openai_response(response)
+
+
+async def _call_openai_async(
+    prompt: str, key: str, client_factory=None, tier: str = "full"
+) -> tuple[str | None, dict[str, Any]]:
+    if client_factory is None:
+        client = get_async_client_registry().get("openai", key, _create_async_openai_client)
+    else:
+        client = client_factory(key)
+    if client is None:
         return None, {}
-    usage = getattr(response, "usage", None)
-    tokens = getattr(usage, "total_tokens", None) if usage else None
-    return response.choices[0].message.content.strip(), {"tokens_used": tokens}
+    create = client.chat.completions.create
+    try:
+        if inspect.iscoroutinefunction(create):
+            call = create(**_openai_request(prompt, tier))
+        else:
+            # Synchronous clients from a custom factory run on the I/O pool.
+            call = run_io(create, **_openai_request(prompt, tier))
+        response = await asyncio.wait_for(call, _provider_timeout("openai"))
+    except asyncio.TimeoutError as exc:
+        logger.warning("OpenAI summarization timed out")
+        return None, {"error": exc}
+    except Exception as exc:
+        logger.warning("OpenAI summarization failed: %s", exc)
+        return None, {"error": exc}
+    return _parse_openai_response(response)
+
 
+def _gemini_model_name(tier: str = "full") -> str:
+    model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+    if tier == "fast":
+        return os.getenv("GEMINI_FAST_MODEL", model)
+    return model
 
-def _gemini_model_name() -> str:
-    return os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
 
+def _gemini_text(response) -> str | None:
+    text = getattr(response, "text", None)
+    if not text and hasattr(response, "candidates"):
+        for candidate in response.candidates:
+            parts = getattr(candidate, "content", {}).parts if hasattr(candidate, "content") else []
+            if parts:
+                text = getattr(parts[0], "text", None)
+                if text:
+                    break
+    return text
 
-def _call_gemini(prompt: str, key: str) -> tuple[str | None, dict[str, Any]]:
+
+def _gemini_model(key: str, asynchronous: bool = False, tier: str = "full"):
     try:
         import google.generativeai as genai
     except ModuleNotFoundError:
         logger.warning("google.generativeai SDK not installed, skipping Gemini summarizer")
+        return None
+    if asynchronous:
+        client = get_async_client_registry().get("gemini", key, _create_async_gemini_client)
+    else:
+        client = get_client_registry().get("gemini", key, _create_gemini_client)
+    if client is None:
+        return None
+    model = genai.GenerativeModel(_gemini_model_name(tier))
+    # Use the per-key pooled client instead of the process-global genai.configure().
+    if asynchronous:
+        model._async_client = client
+    else:
+        model._client = client
+    return model
+
+
+def _call_gemini(prompt: str, key: str, tier: str = "full") -> tuple[str | None, dict[str, Any]]:
+    model = _gemini_model(key, tier=tier)
+    if model is None:
         return None, {}
     try:
-        genai.configure(api_key=key)
-        model = genai.GenerativeModel(_gemini_model_name())
-        response = model.generate_content(prompt)
-        text = getattr(response, "text", None)
-        if not text and hasattr(response, "candidates"):
-            for candidate in response.candidates:
-                parts = getattr(candidate, "content", {}).parts if hasattr(candidate, "content") else []
-                if parts:
-                    text = getattr(parts[0], "text", None)
-                    if text:
-                        break
-        return text, {}
+        return _gemini_text(model.generate_content(prompt)), {}
     except Exception as exc:
         logger.warning("Gemini summarization failed: %s", exc)
+        return None, {"error": exc}
+
+
+async def _call_gemini_async(
+    prompt: str, key: str, tier: str = "full"
+) -> tuple[str | None, dict[str, Any]]:
+    model = _gemini_model(key, asynchronous=True, tier=tier)
+    if model is None:
         return None, {}
+    try:
+        response = await asyncio.wait_for(
+            model.generate_content_async(prompt), _provider_timeout("gemini")
+        )
+    except asyncio.TimeoutError as exc:
+        logger.warning("Gemini summarization timed out")
+        return None, {"error": exc}
+    except Exception as exc:
+        logger.warning("Gemini summarization failed: %s", exc)
+        return None, {"error": exc}
+    return _gemini_text(response), {}
 
 
-def summarize_changes(
-    diff_text: str,
-    mission_context: str | None = None,
-    client_factory=None,
-    api_keys_override: None | str | list[str] = None,
-) -> tuple[str, dict[str, Any]]:
-    """Summarize diff text using OpenAI/Gemini if available, otherwise return fallback."""
-    api_keys = _merge_api_keys(api_keys_override)
-    prompt_lines = [
-        "You are a medical science liaison translating clinical and promotional updates "
-        "into clear, actionable insights for marketing, medical affairs, legal, and sales."
-    ]
+def _model_name(provider: str, tier: str = "full") -> str:
+    if provider == "gemini":
+        return _gemini_model_name(tier)
+    return _openai_model_name(tier)
+
+
+def get_summary_cache() -> LRUCache:
+    """Return the process-wide summary cache, building it from the environment."""
+    global _summary_cache
+    if _summary_cache is None:
+        size = int(os.getenv("SUMMARY_CACHE_SIZE", "256"))
+        ttl = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+        _summary_cache = LRUCache(size, ttl=ttl or None)
+    return _summary_cache
+
+
+def summary_cache_key(prompt: str, provider: str, model: str) -> str:
+    return sha256_hex(f"{provider}\n{model}\n{prompt}".encode("utf-8"))
+
+
+_PROMPT_ROLE = (
+    "You are a medical science liaison translating clinical and promotional updates "
+    "into clear, actionable insights for marketing, medical affairs, legal, and sales."
+)
+
+
+def _build_prompt(diff_text: str, mission_context: str | None) -> str:
+    prompt_lines = [_PROMPT_ROLE]
     if mission_context:
         prompt_lines.append(f"Mission context: {mission_context}")
     prompt_lines.append(
@@ -168,31 +504,527 @@ def summarize_changes(
     )
     prompt_lines.append("Changes:")
     prompt_lines.append(diff_text)
-    client_factory = client_factory or _create_openai_client
-    prompt = "\n\n".join(prompt_lines)
+    return "\n\n".join(prompt_lines)
+
+
+def _build_chunk_prompt(chunk: str, mission_context: str | None) -> str:
+    prompt_lines = [_PROMPT_ROLE]
+    if mission_context:
+        prompt_lines.append(f"Mission context: {mission_context}")
+    prompt_lines.append(
+        "The changes below are one part of a larger comparison. List the substantive changes "
+        "in a few short bullet points, keeping dosage, safety, indication and claim details exact."
+    )
+    prompt_lines.append("Changes:")
+    prompt_lines.append(chunk)
+    return "\n\n".join(prompt_lines)
 
-    metadata: dict[str, Any] = {
+
+def _build_reduce_prompt(partial_summaries: list[str], mission_context: str | None) -> str:
+    prompt_lines = [_PROMPT_ROLE]
+    if mission_context:
+        prompt_lines.append(f"Mission context: {mission_context}")
+    prompt_lines.append(
+        "A long comparison was summarized in parts. Combine the part summaries into one summary "
+        "in a neutral, friendly tone highlighting compliance impact, patient safety, and sales alignment."
+    )
+    for index, partial in enumerate(partial_summaries, start=1):
+        prompt_lines.append(f"Part {index}:\n{partial}")
+    return "\n\n".join(prompt_lines)
+
+
+def _chunk_token_budget() -> int:
+    return max(200, int(os.getenv("SUMMARIZER_CHUNK_TOKENS", "6000")))
+
+
+def _map_concurrency() -> int:
+    return max(1, int(os.getenv("SUMMARIZER_MAP_CONCURRENCY", "4")))
+
+
+def _record_key_health(
+    provider: str, key: str, summary: str | None, extra_metadata: dict[str, Any], started: float
+) -> None:
+    health = get_key_health()
+    if summary:
+        health.record_success(provider, key, time.perf_counter() - started)
+        return
+    error = extra_metadata.get("error")
+    health.record_failure(provider, key, rate_limited=is_rate_limit_error(error))
+    if is_broken_client_error(error):
+        _discard_client(provider, key)
+
+
+def _discard_client(provider: str, key: str) -> None:
+    """Drop a key's cached clients after an auth or connection error so they are rebuilt."""
+    get_client_registry().discard(provider, key)
+    try:
+        registry = get_async_client_registry()
+    except RuntimeError:  # no running event loop, so no async clients to drop here
+        return
+    registry.discard(provider, key)
+
+
+def _healthy_keys(api_keys: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    return get_key_health().order(api_keys)
+
+
+def _summary_metadata(diff_text: str) -> dict[str, Any]:
+    return {
         "method": "fallback",
+        "provider": None,
         "tokens_used": None,
         "truncated": len(diff_text) > 500,
+        "tokens_saved": 0,
     }
 
+
+def _compaction_enabled(compact: bool | None) -> bool:
+    if compact is not None:
+        return compact
+    return os.getenv("DIFF_COMPACTION", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _prompt_diff(
+    diff_text: str, compact: bool | None, metadata: dict[str, Any], map_reduce: bool = False
+) -> tuple[str, bool]:
+    """Return the diff text to embed in prompts and whether compaction cut any of it.
+
+    With `map_reduce`, diffs too large for one chunk are left whole so they can be
+    summarized chunk by chunk instead of being cut at `PROMPT_TOKEN_BUDGET`.
+    """
+    if not _compaction_enabled(compact):
+        return diff_text, False
+    budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "24000"))
+    compacted, stats = compact_diff(diff_text, None if map_reduce else budget)
+    if map_reduce and budget < stats["tokens_after"] <= _chunk_token_budget():
+        compacted, stats = compact_diff(diff_text, budget)
+    metadata["tokens_saved"] = stats["tokens_saved"]
+    return compacted, stats["omitted_hunks"] > 0 or stats["trimmed_lines"] > 0
+
+
+def _cached_summary(
+    prompt: str,
+    api_keys: list[tuple[str, str]],
+    cache: LRUCache | None,
+    metadata: dict[str, Any],
+    tier: str = "full",
+) -> str | None:
+    if cache is None:
+        return None
+    for provider in dict.fromkeys(provider for provider, _ in api_keys):
+        cached = cache.get(summary_cache_key(prompt, provider, _model_name(provider, tier)))
+        if cached:
+            metadata.update(method="cached", provider=provider, tokens_used=0, truncated=False)
+            return cached
+    return None
+
+
+def _accept_summary(
+    summary: str,
+    provider: str,
+    extra_metadata: dict[str, Any],
+    prompt: str,
+    cache: LRUCache | None,
+    metadata: dict[str, Any],
+    tier: str = "full",
+) -> tuple[str, dict[str, Any]]:
+    if cache is not None:
+        cache.set(summary_cache_key(prompt, provider, _model_name(provider, tier)), summary)
+    metadata["method"] = provider
+    metadata["provider"] = provider
+    metadata["tokens_used"] = extra_metadata.get("tokens_used")
+    metadata["truncated"] = False
+    return summary, metadata
+
+
+def summarize_changes(
+    diff_text: str,
+    mission_context: str | None = None,
+    client_factory=None,
+    api_keys_override: None | str | list[str] = None,
+    use_cache: bool = True,
+    compact: bool | None = None,
+    model_tier: str = "full",
+) -> tuple[str, dict[str, Any]]:
+    """Summarize diff text using OpenAI/Gemini if available, otherwise return fallback.
+
+    Successful summaries are cached per prompt, provider and model; a cache hit is
+    reported with method "cached". Pass `use_cache=False` to bypass the cache. The diff
+    is compacted before prompting unless `compact=False` or `DIFF_COMPACTION=0`.
+    `model_tier="fast"` selects `OPENAI_FAST_MODEL` / `GEMINI_FAST_MODEL`.
+    """
+    api_keys = _merge_api_keys(api_keys_override)
+    metadata = _summary_metadata(diff_text)
+
     if not api_keys:
         logger.info("no summarizer API keys configured, using fallback text")
         return _fallback_summary(diff_text), metadata
 
-    for provider, key in api_keys:
+    prompt_diff, omitted = _prompt_diff(diff_text, compact, metadata)
+    prompt = _build_prompt(prompt_diff, mission_context)
+    cache = get_summary_cache() if use_cache else None
+    cached = _cached_summary(prompt, api_keys, cache, metadata, model_tier)
+    if cached:
+        metadata["truncated"] = omitted
+        return cached, metadata
+
+    for provider, key in _healthy_keys(api_keys):
         summary = None
         extra_metadata: dict[str, Any] = {}
+        started = time.perf_counter()
         if provider == "openai":
-            summary, extra_metadata = _call_openai(prompt, key, client_factory)
+            summary, extra_metadata = _call_openai(prompt, key, client_factory, model_tier)
         elif provider == "gemini":
-            summary, extra_metadata = _call_gemini(prompt, key)
+            summary, extra_metadata = _call_gemini(prompt, key, model_tier)
+        _record_key_health(provider, key, summary, extra_metadata, started)
         if summary:
-            metadata["method"] = provider
-            metadata["tokens_used"] = extra_metadata.get("tokens_used")
-            metadata["truncated"] = False
+            summary, metadata = _accept_summary(
+                summary, provider, extra_metadata, prompt, cache, metadata, model_tier
+            )
+            metadata["truncated"] = omitted
             return summary, metadata
         logger.warning("summarization failed with provider %s", provider)
 
     return _fallback_summary(diff_text), metadata
+
+
+@dataclass
+class _ProviderPlan:
+    """How one async summarization talks to the providers."""
+
+    api_keys: list[tuple[str, str]]
+    client_factory: Any = None
+    cache: LRUCache | None = None
+    hedge_delay: float | None = None
+    race: int = 1
+    tier: str = "full"
+
+
+def _hedging_config(hedge_delay: float | None, race: int | None) -> tuple[float | None, int]:
+    if hedge_delay is None:
+        value = os.getenv("SUMMARIZER_HEDGE_DELAY")
+        hedge_delay = float(value) if value else None
+    if race is None:
+        race = int(os.getenv("SUMMARIZER_RACE", "1"))
+    return hedge_delay, max(1, race)
+
+
+async def _call_provider_async(
+    provider: str, key: str, prompt: str, client_factory=None, tier: str = "full"
+) -> tuple[str | None, dict[str, Any]]:
+    started = time.perf_counter()
+    if provider == "openai":
+        summary, extra_metadata = await _call_openai_async(prompt, key, client_factory, tier)
+    elif provider == "gemini":
+        summary, extra_metadata = await _call_gemini_async(prompt, key, tier)
+    else:
+        logger.warning("unknown summarizer provider %s", provider)
+        return None, {}
+    _record_key_health(provider, key, summary, extra_metadata, started)
+    return summary, extra_metadata
+
+
+async def _hedged_summary(
+    prompt: str, plan: _ProviderPlan
+) -> tuple[str | None, str | None, dict[str, Any], int]:
+    """Run provider calls with hedging and return (provider, summary, extra, attempts).
+
+    `race` calls start at once; while no usable summary has arrived, another call is
+    started every `hedge_delay` seconds and immediately after each failure. The first
+    usable summary wins and the remaining calls are cancelled. With `race=1` and no
+    delay this is the plain sequential fallback loop.
+    """
+    queue = _healthy_keys(plan.api_keys)
+    pending: dict[asyncio.Task, str] = {}
+    attempts = 0
+
+    def launch() -> None:
+        nonlocal attempts
+        provider, key = queue.pop(0)
+        task = asyncio.ensure_future(
+            _call_provider_async(provider, key, prompt, plan.client_factory, plan.tier)
+        )
+        pending[task] = provider
+        attempts += 1
+
+    for _ in range(min(plan.race, len(queue))):
+        launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=plan.hedge_delay if queue else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                launch()
+                continue
+            for task in done:
+                provider = pending.pop(task)
+                summary, extra_metadata = task.result()
+                if summary:
+                    return provider, summary, extra_metadata, attempts
+                logger.warning("summarization failed with provider %s", provider)
+                if queue:
+                    launch()
+        return None, None, {}, attempts
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _summarize_prompt_async(
+    prompt: str, plan: _ProviderPlan
+) -> tuple[str | None, dict[str, Any]]:
+    """Summarize one prompt through the cache and the hedged provider calls."""
+    result: dict[str, Any] = {"method": "fallback", "provider": None, "tokens_used": None}
+    cached = _cached_summary(prompt, plan.api_keys, plan.cache, result, plan.tier)
+    if cached:
+        return cached, result
+    provider, summary, extra_metadata, attempts = await _hedged_summary(prompt, plan)
+    result["attempts"] = attempts
+    if not summary:
+        return None, result
+    return _accept_summary(
+        summary, provider, extra_metadata, prompt, plan.cache, result, plan.tier
+    )
+
+
+async def _map_reduce_summary(
+    diff_text: str, mission_context: str | None, plan: _ProviderPlan, metadata: dict[str, Any]
+) -> tuple[str, dict[str, Any]]:
+    """Summarize hunk-aligned chunks concurrently, then combine them in a reduce pass."""
+    chunks = chunk_diff(diff_text, _chunk_token_budget())
+    semaphore = asyncio.Semaphore(_map_concurrency())
+
+    async def summarize_chunk(chunk: str) -> tuple[str | None, dict[str, Any]]:
+        prompt = _build_chunk_prompt(strip_hunk_positions(chunk), mission_context)
+        async with semaphore:
+            return await _summarize_prompt_async(prompt, plan)
+
+    results = await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+    metadata["chunks"] = len(chunks)
+    if not any(summary for summary, _ in results):
+        return _fallback_summary(diff_text), metadata
+
+    partials = []
+    tokens = [result.get("tokens_used") for _, result in results]
+    truncated = False
+    for chunk, (summary, _) in zip(chunks, results):
+        if summary:
+            partials.append(summary)
+        else:
+            partials.append(_fallback_summary(chunk))
+            truncated = truncated or len(chunk) > 500
+
+    summary, result = await _summarize_prompt_async(
+        _build_reduce_prompt(partials, mission_context), plan
+    )
+    if not summary:
+        # The parts are still useful on their own when only the reduce call failed.
+        summary = "\n\n".join(partials)
+        result = next(result for partial, result in results if partial)
+    tokens.append(result.get("tokens_used"))
+    reported = [count for count in tokens if count is not None]
+    metadata.update(
+        method=result["method"],
+        provider=result["provider"],
+        tokens_used=sum(reported) if reported else None,
+        truncated=truncated,
+    )
+    return summary, metadata
+
+
+async def summarize_changes_async(
+    diff_text: str,
+    mission_context: str | None = None,
+    client_factory=None,
+    api_keys_override: None | str | list[str] = None,
+    use_cache: bool = True,
+    hedge_delay: float | None = None,
+    race: int | None = None,
+    compact: bool | None = None,
+    model_tier: str = "full",
+) -> tuple[str, dict[str, Any]]:
+    """Asyncio variant of `summarize_changes` built on the providers' async clients.
+
+    Each provider call is bounded by its `<PROVIDER>_TIMEOUT`; cancelling the awaiting
+    task cancels the in-flight request. `hedge_delay` and `race` (defaulting to
+    `SUMMARIZER_HEDGE_DELAY` and `SUMMARIZER_RACE`) hedge slow providers; the winning
+    provider is reported as `provider` in the metadata. Diffs larger than
+    `SUMMARIZER_CHUNK_TOKENS` are summarized chunk by chunk and then combined.
+    """
+    api_keys = _merge_api_keys(api_keys_override)
+    metadata = _summary_metadata(diff_text)
+
+    if not api_keys:
+        logger.info("no summarizer API keys configured, using fallback text")
+        return _fallback_summary(diff_text), metadata
+
+    hedge_delay, race = _hedging_config(hedge_delay, race)
+    plan = _ProviderPlan(
+        api_keys=api_keys,
+        client_factory=client_factory,
+        cache=get_summary_cache() if use_cache else None,
+        hedge_delay=hedge_delay,
+        race=race,
+        tier=model_tier,
+    )
+    prompt_diff, omitted = _prompt_diff(diff_text, compact, metadata, map_reduce=True)
+    if estimate_tokens(prompt_diff) > _chunk_token_budget():
+        summary, metadata = await _map_reduce_summary(prompt_diff, mission_context, plan, metadata)
+        if metadata["method"] == "fallback":
+            return _fallback_summary(diff_text), metadata
+        metadata["truncated"] = metadata["truncated"] or omitted
+        return summary, metadata
+
+    prompt = _build_prompt(prompt_diff, mission_context)
+    summary, result = await _summarize_prompt_async(prompt, plan)
+    metadata.update(result)
+    if summary:
+        metadata["truncated"] = omitted
+        return summary, metadata
+    metadata["truncated"] = len(diff_text) > 500
+    return _fallback_summary(diff_text), metadata
+
+
+async def _with_idle_timeout(stream, timeout: float) -> AsyncIterator[Any]:
+    """Iterate an async stream, failing when no item arrives within `timeout` seconds."""
+    iterator = stream.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), timeout)
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+async def _stream_openai(
+    prompt: str, key: str, extra_metadata: dict[str, Any], client_factory=None, tier: str = "full"
+) -> AsyncIterator[str]:
+    if client_factory is None:
+        client = get_async_client_registry().get("openai", key, _create_async_openai_client)
+    else:
+        client = client_factory(key)
+    if client is None:
+        return
+    create = client.chat.completions.create
+    timeout = _provider_timeout("openai")
+    if not inspect.iscoroutinefunction(create):
+        # Synchronous clients from a custom factory answer in one piece.
+        response = await asyncio.wait_for(
+            run_io(create, **_openai_request(prompt, tier)), timeout
+        )
+        summary, metadata = _parse_openai_response(response)
+        extra_metadata.update(metadata)
+        if summary:
+            yield summary
+        return
+    request = dict(
+        _openai_request(prompt, tier), stream=True, stream_options={"include_usage": True}
+    )
+    stream = await asyncio.wait_for(create(**request), timeout)
+    async for chunk in _with_idle_timeout(stream, timeout):
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            extra_metadata["tokens_used"] = getattr(usage, "total_tokens", None)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _stream_gemini(prompt: str, key: str, tier: str = "full") -> AsyncIterator[str]:
+    model = _gemini_model(key, asynchronous=True, tier=tier)
+    if model is None:
+        return
+    timeout = _provider_timeout("gemini")
+    stream = await asyncio.wait_for(model.generate_content_async(prompt, stream=True), timeout)
+    async for chunk in _with_idle_timeout(stream, timeout):
+        text = _gemini_text(chunk)
+        if text:
+            yield text
+
+
+async def summarize_changes_stream(
+    diff_text: str,
+    mission_context: str | None = None,
+    client_factory=None,
+    api_keys_override: None | str | list[str] = None,
+    use_cache: bool = True,
+    compact: bool | None = None,
+    model_tier: str = "full",
+) -> AsyncIterator[tuple[str, Any]]:
+    """Stream a summary as `("token", text)` events, then `("done", (summary, metadata))`.
+
+    Keys are tried in health order without hedging. When a provider fails after part of
+    its answer was streamed, a `("reset", None)` event tells the consumer to discard
+    that text before the next key starts. Cached summaries, map-reduce summaries of
+    large diffs and the fallback text arrive as a single token.
+    """
+    api_keys = _merge_api_keys(api_keys_override)
+    metadata = _summary_metadata(diff_text)
+
+    if not api_keys:
+        logger.info("no summarizer API keys configured, using fallback text")
+        summary = _fallback_summary(diff_text)
+        yield "token", summary
+        yield "done", (summary, metadata)
+        return
+
+    cache = get_summary_cache() if use_cache else None
+    prompt_diff, omitted = _prompt_diff(diff_text, compact, metadata, map_reduce=True)
+    if estimate_tokens(prompt_diff) > _chunk_token_budget():
+        summary, metadata = await summarize_changes_async(
+            diff_text,
+            mission_context=mission_context,
+            client_factory=client_factory,
+            api_keys_override=api_keys_override,
+            use_cache=use_cache,
+            compact=compact,
+            model_tier=model_tier,
+        )
+        yield "token", summary
+        yield "done", (summary, metadata)
+        return
+
+    prompt = _build_prompt(prompt_diff, mission_context)
+    cached = _cached_summary(prompt, api_keys, cache, metadata, model_tier)
+    if cached:
+        metadata["truncated"] = omitted
+        yield "token", cached
+        yield "done", (cached, metadata)
+        return
+
+    for provider, key in _healthy_keys(api_keys):
+        extra_metadata: dict[str, Any] = {}
+        if provider == "openai":
+            stream = _stream_openai(prompt, key, extra_metadata, client_factory, model_tier)
+        elif provider == "gemini":
+            stream = _stream_gemini(prompt, key, model_tier)
+        else:
+            continue
+        parts: list[str] = []
+        started = time.perf_counter()
+        try:
+            async for token in stream:
+                parts.append(token)
+                yield "token", token
+        except Exception as exc:
+            logger.warning("%s summary stream failed: %s", provider, exc)
+            extra_metadata["error"] = exc
+        summary = None if "error" in extra_metadata else "".join(parts).strip()
+        _record_key_health(provider, key, summary, extra_metadata, started)
+        if summary:
+            summary, metadata = _accept_summary(
+                summary, provider, extra_metadata, prompt, cache, metadata, model_tier
+            )
+            metadata["truncated"] = omitted
+            yield "done", (summary, metadata)
+            return
+        if parts:
+            yield "reset", None
+
+    summary = _fallback_summary(diff_text)
+    yield "token", summary
+    yield "done", (summary, metadata)
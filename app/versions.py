@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .executor import run_io
+from .pipeline import extract_document
+from .storage import BlobStore, data_dir
+from .utils import DocumentSource, extraction_cache_key, source_sha256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (document, version)
+);
+CREATE TABLE IF NOT EXISTS extracted_texts (
+    cache_key TEXT PRIMARY KEY,
+    text_blob TEXT NOT NULL
+);
+"""
+
+_VERSION_COLUMNS = ("id", "document", "version", "filename", "sha256", "size", "created_at")
+
+
+class VersionStore:
+    """Uploaded document versions grouped into named lineages.
+
+    Document bytes and extracted texts live in a content-addressed `BlobStore`, so
+    re-uploading identical content costs no extra space. Extracted texts are indexed by
+    extraction cache key, so a version is extracted once per PDF mode.
+    """
+
+    def __init__(self, path: str | os.PathLike, blobs: BlobStore):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.blobs = blobs
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def add(
+        self, document: str, filename: str, data: DocumentSource, text_key: str, text: str
+    ) -> tuple[dict[str, Any], bool]:
+        """Store a new version of `document` and return it together with True.
+
+        `data` is the document's bytes or a path to it. When the latest version already
+        has identical content and file type, that version is returned with False instead.
+        """
+        if isinstance(data, bytes):
+            digest, size = self.blobs.put(data), len(data)
+        else:
+            digest, size = self.blobs.put_file(data), os.path.getsize(data)
+        text_blob = self.blobs.put_text(text)
+        with self._lock, self._conn:
+            # Reading the latest version under SQLite's write lock keeps uploads from
+            # several server processes from numbering two versions alike.
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracted_texts (cache_key, text_blob) VALUES (?, ?)",
+                (text_key, text_blob),
+            )
+            latest = self._conn.execute(
+                f"SELECT {', '.join(_VERSION_COLUMNS)} FROM versions WHERE document = ?"
+                " ORDER BY version DESC LIMIT 1",
+                (document,),
+            ).fetchone()
+            if (
+                latest is not None
+                and latest["sha256"] == digest
+                and Path(latest["filename"]).suffix.lower() == Path(filename).suffix.lower()
+            ):
+                return dict(latest), False
+            row = self._conn.execute(
+                "INSERT INTO versions (document, version, filename, sha256, size, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                f" RETURNING {', '.join(_VERSION_COLUMNS)}",
+                (
+                    document,
+                    latest["version"] + 1 if latest is not None else 1,
+                    filename,
+                    digest,
+                    size,
+                    time.time(),
+                ),
+            ).fetchone()
+        return dict(row), True
+
+    def get(self, version_id: int) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_VERSION_COLUMNS)} FROM versions WHERE id = ?",
+                (version_id,),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def versions(self, document: str, limit: int | None = None) -> list[dict[str, Any]]:
+        """Return a lineage's versions, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_VERSION_COLUMNS)} FROM versions WHERE document = ?"
+                " ORDER BY version DESC LIMIT ?",
+                (document, -1 if limit is None else limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def documents(self) -> list[dict[str, Any]]:
+        """Return every lineage with its version count, most recently updated first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document, COUNT(*) AS versions, MAX(version) AS latest_version,"
+                " MAX(created_at) AS updated_at FROM versions"
+                " GROUP BY document ORDER BY updated_at DESC"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def content(self, version: dict[str, Any]) -> bytes:
+        data = self.blobs.get(version["sha256"])
+        if data is None:
+            raise ValueError(f"Content of version {version['id']} is no longer available")
+        return data
+
+    def text(self, text_key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text_blob FROM extracted_texts WHERE cache_key = ?", (text_key,)
+            ).fetchone()
+        return self.blobs.get_text(row["text_blob"]) if row is not None else None
+
+    def set_text(self, text_key: str, text: str) -> None:
+        text_blob = self.blobs.put_text(text)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracted_texts (cache_key, text_blob) VALUES (?, ?)",
+                (text_key, text_blob),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def add_version(
+    store: VersionStore,
+    document: str,
+    filename: str,
+    data: DocumentSource,
+    pdf_mode: str | None = None,
+    digest: str | None = None,
+) -> tuple[dict[str, Any], bool]:
+    """Extract and store an uploaded document; unsupported files raise ValueError.
+
+    Pass `digest` when the document's SHA-256 is already known.
+    """
+    if digest is None:
+        digest = await run_io(source_sha256, data)
+    text = await extract_document(filename, data, pdf_mode, digest)
+    text_key = extraction_cache_key(filename, digest, pdf_mode)
+    return await run_io(store.add, document, filename, data, text_key, text)
+
+
+async def version_text(
+    store: VersionStore, version: dict[str, Any], pdf_mode: str | None = None
+) -> str:
+    """Return a version's extracted text, extracting it only for a PDF mode not seen yet."""
+    text_key = extraction_cache_key(version["filename"], version["sha256"], pdf_mode)
+    text = await run_io(store.text, text_key)
+    if text is None:
+        data = await run_io(store.content, version)
+        text = await extract_document(version["filename"], data, pdf_mode)
+        await run_io(store.set_text, text_key, text)
+    return text
+
+
+_store: VersionStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_version_store() -> VersionStore:
+    """Return the process-wide version store under `DATA_DIR`."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            root = data_dir()
+            _store = VersionStore(root / "versions.sqlite3", BlobStore(root / "version-blobs"))
+        return _store
@@ -0,0 +1,48 @@
+"""Compare PDF extraction modes on synthetic multi-page documents.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_extraction --pages 50 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app import executor
+from app.pipeline import _extract_pdf_sharded
+from app.utils import extract_text
+
+from .synthetic import make_synthetic_pdf
+
+
+def _time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("EXECUTOR_BACKEND", "process")
+    print(f"{'pages':>6} {'mode':>7} {'serial s':>10} {'sharded s':>10} {'speedup':>8}")
+    for pages in args.pages:
+        data = make_synthetic_pdf(pages)
+        for mode in ("layout", "fast"):
+            serial = _time(lambda: extract_text("bench.pdf", data, mode), args.repeat)
+            # Warm the pool once so worker start-up is not billed to the first run.
+            asyncio.run(_extract_pdf_sharded(data, mode))
+            sharded = _time(lambda: asyncio.run(_extract_pdf_sharded(data, mode)), args.repeat)
+            print(f"{pages:>6} {mode:>7} {serial:>10.3f} {sharded:>10.3f} {serial / sharded:>7.1f}x")
+    executor.shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
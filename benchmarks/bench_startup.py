@@ -0,0 +1,59 @@
+"""Measure import time and memory of the API modules with lazy versus eager extractors.
+
+Each measurement runs in a fresh interpreter. "eager" imports python-docx, pdfplumber
+and python-pptx up front, as `app.utils` did before extractors loaded them on first use.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+_PROBE = """
+import json, resource, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "max_rss_kb": rss}}))
+"""
+
+_EAGER = "import docx, pdfplumber, pptx"
+
+SCENARIOS = {
+    "app.utils lazy": "import app.utils",
+    "app.utils eager": f"{_EAGER}; import app.utils",
+    "app.main lazy": "import app.main",
+    "app.main eager": f"{_EAGER}; import app.main",
+}
+
+
+def _measure(imports: str, repeat: int) -> tuple[float, int]:
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(imports=imports)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(json.loads(result.stdout))
+    return min(run["seconds"] for run in runs), min(run["max_rss_kb"] for run in runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':>16} {'import s':>9} {'max RSS MB':>11}")
+    for name, imports in SCENARIOS.items():
+        seconds, rss_kb = _measure(imports, args.repeat)
+        print(f"{name:>16} {seconds:>9.3f} {rss_kb / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import pytest
+
+from app import history, jobs, versions
+from app.keyhealth import get_key_health
+
+
+@pytest.fixture(autouse=True)
+def _reset_key_health():
+    get_key_health().reset()
+    yield
+    get_key_health().reset()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_data_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(history, "_store", None)
+    monkeypatch.setattr(jobs, "_queue", None)
+    monkeypatch.setattr(versions, "_store", None)
+    yield
+    if history._store is not None:
+        history._store.close()
+    if jobs._queue is not None:
+        jobs._queue.close()
+    if versions._store is not None:
+        versions._store.close()
@@ -19,3 +19,22 @@ def test_compare_endpoint_txt():
     assert data["method"] == "fallback"
     assert data["tokens_used"] is None
     assert data["truncated"] is False
+
+
+def test_large_comparisons_diff_in_one_streaming_pass(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    old = "\n".join(f"clause {i}" for i in range(50)).encode()
+    new = old.replace(b"clause 40", b"clause 40 amended")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(old), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(new), "text/plain"),
+    }
+    expected = client.post("/compare", files=files, data={"use_cache": "false"}).json()
+    monkeypatch.setenv("STREAMING_DIFF_MIN_BYTES", "1")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(old), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(new), "text/plain"),
+    }
+    streamed = client.post("/compare", files=files, data={"use_cache": "false"}).json()
+    assert streamed["diff"] == expected["diff"]
+    assert streamed["diff"].splitlines()[2] == "@@ -38,7 +38,7 @@"
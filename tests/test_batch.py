@@ -0,0 +1,151 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import batch, pipeline
+from app.batch import parse_pairs, read_archive
+from app.cache import sha256_hex
+from app.main import app
+
+client = TestClient(app)
+
+
+def _events(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    monkeypatch.setattr(pipeline, "get_extraction_cache", lambda: _NoCache())
+    calls = []
+    original = pipeline.extract_text
+
+    def counting_extract(filename, data, pdf_mode=None, extractor=None):
+        calls.append(filename)
+        return original(filename, data, pdf_mode, extractor)
+
+    monkeypatch.setattr(pipeline, "extract_text", counting_extract)
+    return calls
+
+
+class _NoCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+def test_parse_pairs_from_baseline_or_json():
+    names = ["base.txt", "eu.txt", "us.txt"]
+    assert parse_pairs(None, "base.txt", names) == [
+        ("base.txt", "eu.txt"),
+        ("base.txt", "us.txt"),
+    ]
+    assert parse_pairs('[["eu.txt", "us.txt"]]', None, names) == [("eu.txt", "us.txt")]
+    for pairs, baseline in [(None, None), ('[["eu.txt"]]', None), ("[[", None)]:
+        with pytest.raises(ValueError):
+            parse_pairs(pairs, baseline, names)
+    with pytest.raises(ValueError, match="missing.txt"):
+        parse_pairs('[["base.txt", "missing.txt"]]', None, names)
+
+
+def test_read_archive_skips_directories_and_metadata(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_TMP_DIR", str(tmp_path))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("labels/", "")
+        archive.writestr("labels/base.txt", "Store at 20C")
+        archive.writestr("__MACOSX/labels/._base.txt", "junk")
+        archive.writestr("labels/.DS_Store", "junk")
+    documents = read_archive(buffer.getvalue())
+    assert list(documents) == ["labels/base.txt"]
+    document = documents["labels/base.txt"]
+    assert document.path.parent == tmp_path and document.path.read_bytes() == b"Store at 20C"
+    assert document.sha256 == sha256_hex(b"Store at 20C")
+    document.remove()
+    with pytest.raises(ValueError):
+        read_archive(b"not a zip")
+
+
+def test_batch_extracts_shared_baseline_once(extractions, monkeypatch):
+    hashed = []
+    original = batch.source_sha256
+
+    def counting_hash(data):
+        hashed.append(data)
+        return original(data)
+
+    monkeypatch.setattr(batch, "source_sha256", counting_hash)
+    monkeypatch.setattr(pipeline, "source_sha256", counting_hash)
+    files = [
+        ("files", ("base.txt", io.BytesIO(b"Store at 20C"), "text/plain")),
+        ("files", ("eu.txt", io.BytesIO(b"Store at 25C"), "text/plain")),
+        ("files", ("us.txt", io.BytesIO(b"Store at 25C"), "text/plain")),
+        ("files", ("jp.txt", io.BytesIO(b"Store below 30C"), "text/plain")),
+    ]
+    with client.stream("POST", "/compare/batch", files=files, data={"baseline": "base.txt"}) as r:
+        assert r.status_code == 200
+        events = _events(r)
+    results = [event for event in events if event["event"] == "result"]
+    assert sorted(event["index"] for event in results) == [0, 1, 2]
+    assert {event["file_new"] for event in results} == {"eu.txt", "us.txt", "jp.txt"}
+    assert all(event["history_id"] is not None for event in results)
+    assert events[-1] == {"event": "done", "pairs": 3, "failed": 0}
+    # eu.txt and us.txt have identical content, so only three extractions run.
+    assert sorted(extractions) == ["base.txt", "eu.txt", "jp.txt"]
+    # The digests computed while spooling the uploads are reused.
+    assert hashed == []
+
+
+def test_batch_times_each_pair_on_its_own(extractions, monkeypatch):
+    monkeypatch.setenv("BATCH_CONCURRENCY", "1")
+    original = batch.compare_texts
+
+    async def slow_compare(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(batch, "compare_texts", slow_compare)
+    files = [
+        ("files", (f"{name}.txt", io.BytesIO(f"Store at {i}C".encode()), "text/plain"))
+        for i, name in enumerate(["base", "eu", "us", "jp"])
+    ]
+    with client.stream("POST", "/compare/batch", files=files, data={"baseline": "base.txt"}) as r:
+        results = [event for event in _events(r) if event["event"] == "result"]
+    elapsed = [client.get(f"/history/{r['history_id']}").json()["elapsed_ms"] for r in results]
+    # The pairs run one at a time; none is charged for the pairs queued before it.
+    assert len(elapsed) == 3 and all(100 <= ms < 250 for ms in elapsed)
+
+
+def test_batch_from_archive_reports_failed_pairs(extractions):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("old.txt", "Store at 20C")
+        archive.writestr("new.txt", "Store at 25C")
+        archive.writestr("broken.txt", b"\xff\xfe\xfa")
+    pairs = json.dumps([["old.txt", "new.txt"], ["old.txt", "broken.txt"]])
+    with client.stream(
+        "POST",
+        "/compare/batch",
+        files={"archive": ("labels.zip", buffer.getvalue(), "application/zip")},
+        data={"pairs": pairs},
+    ) as r:
+        events = _events(r)
+    by_index = {event["index"]: event for event in events if "index" in event}
+    assert by_index[0]["event"] == "result" and "+Store at 25C" in by_index[0]["diff"]
+    assert by_index[1]["event"] == "error" and by_index[1]["status"] == 400
+    assert events[-1] == {"event": "done", "pairs": 2, "failed": 1}
+
+
+def test_batch_rejects_invalid_requests_upfront():
+    files = [("files", ("a.txt", io.BytesIO(b"a"), "text/plain"))]
+    assert client.post("/compare/batch", files=files).status_code == 400
+    response = client.post("/compare/batch", files=files, data={"pairs": '[["a.txt", "b.txt"]]'})
+    assert response.status_code == 400
+    assert "b.txt" in response.json()["detail"]
@@ -0,0 +1,50 @@
+import asyncio
+
+from app import pipeline, utils
+from app.cache import DiskCache, LRUCache, TieredCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    DiskCache(tmp_path).set("key", "persisted text")
+    cache = TieredCache(LRUCache(4), DiskCache(tmp_path))
+    assert cache.get("key") == "persisted text"
+    assert cache.memory.get("key") == "persisted text"
+
+
+def test_extract_document_skips_repeat_extraction(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    calls = []
+    original = pipeline.extract_text
+
+    def counting_extract(filename, data, pdf_mode=None, extractor=None):
+        calls.append(filename)
+        return original(filename, data, pdf_mode, extractor)
+
+    monkeypatch.setattr(utils, "_extraction_cache", TieredCache(LRUCache(4)))
+    monkeypatch.setattr(pipeline, "extract_text", counting_extract)
+    for name, data in [("a.txt", b"same bytes"), ("b.txt", b"same bytes"), ("c.txt", b"other")]:
+        assert asyncio.run(pipeline.extract_document(name, data)) == data.decode()
+    assert calls == ["a.txt", "c.txt"]
+
+
+def test_lru_cache_expires_entries_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=10)
+    cache.set("summary", "text")
+    now[0] += 9
+    assert cache.get("summary") == "text"
+    now[0] += 2
+    assert cache.get("summary") is None
+    assert len(cache) == 0
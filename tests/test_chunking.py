@@ -0,0 +1,41 @@
+from app.chunking import chunk_diff, estimate_tokens, split_hunks, strip_hunk_positions
+from app.utils import diff_texts
+
+
+def _large_diff(edit_at: int | None = None) -> str:
+    old = [f"Section {i}: dosage guidance paragraph number {i} for the label." for i in range(400)]
+    new = list(old)
+    for i in range(0, 400, 10):
+        new[i] = old[i] + " Revised."
+    if edit_at is not None:
+        new[edit_at] = "An unrelated new sentence."
+    return diff_texts("\n".join(old), "\n".join(new))
+
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Take 5 mg, twice daily.") == 7
+    # One extra token for every 4 characters past a word's first 4.
+    words = ("dose", "doses", "titration", "hepatotoxicity")
+    assert [estimate_tokens(word) for word in words] == [1, 1, 2, 3]
+
+
+def test_split_hunks_drops_file_headers():
+    hunks = split_hunks(_large_diff())
+    assert all(hunk.startswith("@@") for hunk in hunks)
+    assert len(hunks) == 40
+
+
+def test_chunks_respect_budget_and_keep_all_hunks():
+    diff = _large_diff()
+    chunks = chunk_diff(diff, budget=300)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 300 + 40 for chunk in chunks)
+    assert "\n".join(chunks) == "\n".join(split_hunks(diff))
+
+
+def test_small_edit_only_changes_nearby_chunks():
+    before = [strip_hunk_positions(c) for c in chunk_diff(_large_diff(), budget=300)]
+    after = [strip_hunk_positions(c) for c in chunk_diff(_large_diff(edit_at=5), budget=300)]
+    reused = set(before) & set(after)
+    assert len(reused) >= len(before) - 3
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app import utils
+from app.clients import (
+    ClientRegistry,
+    get_async_client_registry,
+    get_client_registry,
+    is_broken_client_error,
+)
+
+
+def test_registry_reuses_client_per_provider_and_key():
+    built = []
+    registry = ClientRegistry()
+
+    def factory(key):
+        built.append(key)
+        return object()
+
+    first = registry.get("openai", "k1", factory)
+    assert registry.get("openai", "k1", factory) is first
+    assert registry.get("openai", "k2", factory) is not first
+    assert registry.get("gemini", "k1", factory) is not first
+    assert built == ["k1", "k2", "k1"]
+
+
+def test_registry_builds_one_client_under_concurrency():
+    built = []
+    registry = ClientRegistry()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def factory(key):
+        built.append(key)
+        return object()
+
+    def worker():
+        barrier.wait()
+        results.append(registry.get("openai", "shared", factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_registry_does_not_cache_missing_clients_and_discard_closes():
+    closed = []
+    registry = ClientRegistry()
+    assert registry.get("openai", "k", lambda key: None) is None
+    assert len(registry) == 0
+
+    class Closable:
+        def close(self):
+            closed.append(True)
+
+    registry.get("openai", "k", lambda key: Closable())
+    registry.discard("openai", "k")
+    assert closed == [True] and len(registry) == 0
+
+
+def test_auth_and_connection_errors_discard_cached_clients():
+    class AuthenticationError(Exception):
+        status_code = 401
+
+    assert is_broken_client_error(AuthenticationError())
+    assert is_broken_client_error(ConnectionResetError())
+    assert is_broken_client_error(SimpleNamespace(code=403))
+    assert not is_broken_client_error(SimpleNamespace(status_code=429))
+    assert not is_broken_client_error(None)
+
+    closed = []
+
+    class Client:
+        def __init__(self, key):
+            self.key = key
+
+        def close(self):
+            closed.append(self.key)
+
+        async def aclose(self):
+            closed.append(f"async {self.key}")
+
+    async def scenario():
+        async_registry = get_async_client_registry()
+        async_registry.get(
+            "openai", "revoked", lambda key: SimpleNamespace(close=Client(key).aclose)
+        )
+        get_client_registry().get("openai", "revoked", Client)
+        get_client_registry().get("openai", "busy", Client)
+        utils._record_key_health("openai", "busy", None, {"error": TimeoutError()}, 0)
+        utils._record_key_health("openai", "revoked", None, {"error": AuthenticationError()}, 0)
+        await asyncio.sleep(0)
+        return len(async_registry)
+
+    assert asyncio.run(scenario()) == 0
+    assert sorted(closed) == ["async revoked", "revoked"]
+    # Timeouts keep the client; only the revoked key's clients were dropped.
+    busy = get_client_registry().get("openai", "busy", lambda key: None)
+    assert busy is not None and busy.key == "busy"
+    assert get_client_registry().get("openai", "revoked", lambda key: None) is None
+    get_client_registry().discard("openai", "busy")
@@ -0,0 +1,43 @@
+from app.compaction import compact_diff
+from app.utils import diff_texts
+
+
+def test_compaction_drops_headers_context_and_cosmetic_edits():
+    old = "Intro\nTake 10 mg daily.\nStore   at room temperature.\nOutro"
+    new = "Intro\nTake 5 mg daily.\nstore at room temperature.\nOutro"
+    compacted, stats = compact_diff(diff_texts(old, new))
+    assert compacted.splitlines() == [
+        "@@",
+        "-Take 10 mg daily.",
+        "+Take 5 mg daily.",
+        "(1 whitespace or capitalization-only edits omitted)",
+    ]
+    assert stats["folded_edits"] == 1
+    assert stats["tokens_saved"] > 0
+
+
+def test_compaction_dedupes_identical_hunks():
+    footer = ["", "Job code PP-001", ""]
+    old = "\n".join(f"Page {i}\n" + "\n".join(footer + ["x"] * 8) for i in range(3))
+    new = old.replace("PP-001", "PP-002")
+    compacted, stats = compact_diff(diff_texts(old, new))
+    assert compacted.startswith("@@ repeated 3x @@\n-Job code PP-001\n+Job code PP-002")
+    assert stats["duplicate_hunks"] == 2
+
+
+def test_compaction_trims_to_token_budget():
+    old = "\n".join(f"line {i}" for i in range(200))
+    new = "\n".join(f"line {i} changed" if i % 10 == 0 else f"line {i}" for i in range(200))
+    compacted, stats = compact_diff(diff_texts(old, new), token_budget=40)
+    assert stats["omitted_hunks"] > 0
+    assert stats["tokens_after"] <= 40 + 15
+    assert compacted.endswith("omitted to fit the prompt budget)")
+
+
+def test_trimming_a_single_oversized_hunk_counts_as_truncation():
+    old = "\n".join(f"line {i}" for i in range(200))
+    new = "\n".join(f"line {i} changed" for i in range(200))
+    compacted, stats = compact_diff(diff_texts(old, new), token_budget=40)
+    assert stats["omitted_hunks"] == 0
+    assert stats["trimmed_lines"] > 300
+    assert compacted.endswith("further changed lines omitted to fit the prompt budget)")
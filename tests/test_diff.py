@@ -1,4 +1,12 @@
-from app.utils import diff_texts
+import difflib
+import random
+import time
+
+import pytest
+
+from app import diffing
+from app.diffing import block_diff, get_opcodes, unified_diff
+from app.utils import diff_line_streams, diff_texts, iter_lines
 
 def test_diff_texts():
     old = "line1\nline2"
@@ -6,3 +14,107 @@ def test_diff_texts():
     diff = diff_texts(old, new)
     assert "-line2" in diff
     assert "+line3" in diff
+
+
+@pytest.mark.parametrize("algorithm", ["patience", "myers", "difflib"])
+def test_opcodes_rebuild_new_sequence(algorithm):
+    rng = random.Random(7)
+    for _ in range(300):
+        a = [rng.choice("abcde ") for _ in range(rng.randint(0, 20))]
+        b = [rng.choice("abcde ") for _ in range(rng.randint(0, 20))]
+        rebuilt = []
+        for tag, i1, i2, j1, j2 in get_opcodes(a, b, algorithm):
+            if tag == "equal":
+                assert a[i1:i2] == b[j1:j2]
+            rebuilt.extend(b[j1:j2])
+        assert rebuilt == b
+
+
+@pytest.mark.parametrize("algorithm", ["patience", "myers"])
+def test_full_rewrite_and_costly_regions_stay_fast(algorithm, monkeypatch):
+    old = [f"old clause {i}" for i in range(20000)]
+    new = [f"new clause {i}" for i in range(20000)]
+    started = time.perf_counter()
+    assert get_opcodes(old, new, algorithm) == [("replace", 0, 20000, 0, 20000)]
+    assert time.perf_counter() - started < 2
+
+    # Force the cost cutoff on small inputs: the diff is no longer minimal but still valid.
+    monkeypatch.setattr(diffing, "_MIN_MAX_COST", 2)
+    rng = random.Random(11)
+    for _ in range(50):
+        a = [rng.choice("abc") for _ in range(rng.randint(50, 200))]
+        b = [rng.choice("abc") for _ in range(rng.randint(50, 200))]
+        rebuilt = []
+        for tag, i1, i2, j1, j2 in get_opcodes(a, b, algorithm):
+            if tag == "equal":
+                assert a[i1:i2] == b[j1:j2]
+            rebuilt.extend(b[j1:j2])
+        assert rebuilt == b
+
+
+@pytest.mark.parametrize("algorithm", ["patience", "myers"])
+def test_unified_diff_matches_difflib_format(algorithm):
+    old = [f"section {i}" for i in range(20)]
+    new = list(old)
+    new[3] = "section 3 revised"
+    new.insert(15, "new warning")
+    expected = list(difflib.unified_diff(old, new, fromfile="old", tofile="new", lineterm=""))
+    assert list(unified_diff(old, new, algorithm=algorithm)) == expected
+
+
+def test_identical_texts_produce_empty_diff():
+    assert diff_texts("same\ntext", "same\ntext", algorithm="myers") == ""
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        diff_texts("a", "b", algorithm="bogus")
+
+
+def test_word_mode_marks_only_the_changed_words():
+    paragraph = "The recommended starting dose is 10 mg once daily with food. " * 8
+    old = "Title\n" + paragraph + "\nFooter"
+    new = "Title\n" + paragraph.replace("10 mg", "5 mg", 1) + "\nFooter"
+    diff = diff_texts(old, new, mode="word")
+    assert "[-10-]{+5+}" in diff
+    assert "Title" not in diff and "Footer" not in diff
+    assert len(diff) < len(diff_texts(old, new)) / 3
+
+
+def test_sentence_mode_reports_unpaired_blocks_as_lines():
+    old = "Indications.\nRemoved warning."
+    new = "Indications. Also for adults.\n"
+    diff = diff_texts(old, new, mode="sentence").splitlines()
+    assert diff[3] == "~Indications.{+ Also for adults.+}"
+    assert "-Removed warning." in diff
+
+
+def test_sentence_mode_keeps_decimal_doses_whole():
+    old = "Dosing. Take 2.5 mg daily. Store at 20C."
+    new = "Dosing. Take 3.5 mg daily. Store at 20C."
+    diff = diff_texts(old, new, mode="sentence")
+    assert "[-Take 2.5 mg daily.-]{+Take 3.5 mg daily.+}" in diff
+
+
+@pytest.mark.parametrize("algorithm", ["patience", "myers", "difflib"])
+@pytest.mark.parametrize("mode", ["line", "word"])
+def test_streamed_diff_matches_whole_sequence_diff(algorithm, mode):
+    rng = random.Random(11)
+    for _ in range(200):
+        prefix = [f"shared {i}" for i in range(rng.randint(0, 12))]
+        a = prefix + [rng.choice(["x y", "x z", "y", "z w"]) for _ in range(rng.randint(0, 8))]
+        b = prefix + [rng.choice(["x y", "x z", "y", "z w"]) for _ in range(rng.randint(0, 8))]
+        if mode == "line":
+            expected = list(unified_diff(a, b, algorithm=algorithm))
+        else:
+            expected = list(block_diff(a, b, granularity=mode, algorithm=algorithm))
+        assert list(diff_line_streams(iter(a), iter(b), algorithm, mode)) == expected
+
+
+def test_iter_lines_matches_splitlines_across_chunk_boundaries():
+    rng = random.Random(5)
+    for _ in range(300):
+        text = "".join(rng.choice(["a", "b", "\n", "\r", "\r\n", "\x0c", " "]) for _ in range(30))
+        cuts = sorted(rng.sample(range(len(text) + 1), 4))
+        chunks = [text[i:j] for i, j in zip([0, *cuts], [*cuts, len(text)])]
+        assert list(iter_lines(chunks)) == text.splitlines()
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import executor
+
+
+@pytest.fixture(autouse=True)
+def _fresh_executors():
+    executor.shutdown_executors()
+    yield
+    executor.shutdown_executors()
+
+
+def _current_thread_name() -> str:
+    return threading.current_thread().name
+
+
+def test_run_cpu_inline_runs_on_caller(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    assert asyncio.run(executor.run_cpu(_current_thread_name)) == threading.current_thread().name
+
+
+def test_run_cpu_thread_backend_uses_pool(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "thread")
+    assert asyncio.run(executor.run_cpu(_current_thread_name)).startswith("cpu")
+    assert asyncio.run(executor.run_io(_current_thread_name)).startswith("io")
+
+
+def test_run_cpu_process_backend_propagates_errors(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "process")
+    monkeypatch.setenv("CPU_WORKERS", "1")
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run_cpu(int, "not a number"))
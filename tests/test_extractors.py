@@ -0,0 +1,103 @@
+import asyncio
+import io
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import docx
+import pytest
+from pptx import Presentation
+
+from app import extractors
+from app.executor import shutdown_executors
+from app.extractors import Extractor, find_extractor
+from app.pipeline import extract_document
+from app.utils import extract_text
+from benchmarks.synthetic import make_synthetic_pdf
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(extractors, "_registry", {})
+    monkeypatch.setattr(extractors, "_plugins_loaded", False)
+    plugins = []
+    monkeypatch.setattr(extractors, "entry_points", lambda group: plugins)
+    return plugins
+
+
+def _docx_bytes(text):
+    document = docx.Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _pptx_bytes(text):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = text
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def test_extractors_are_chosen_by_content_before_extension():
+    pdf = make_synthetic_pdf(1, lines_per_page=1)
+    assert find_extractor("label.bin", pdf).name == "pdf"
+    assert find_extractor("label.pdf", _docx_bytes("Store at 20C")).name == "docx"
+    assert find_extractor("deck", _pptx_bytes("Dosing")).name == "pptx"
+    assert extract_text("mislabelled.pdf", _docx_bytes("Store at 20C")) == "Store at 20C"
+    assert extract_text("notes.txt", b"plain") == "plain"
+    assert find_extractor("label.txt", pdf).name == "pdf"
+    assert extract_text("label.txt", pdf) == extract_text("label.pdf", pdf)
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        find_extractor("notes.bin", b"plain")
+
+
+def test_plugins_register_through_entry_points(registry, caplog):
+    csv = Extractor("csv", (".csv",), lambda data, mode: [data.decode().replace(",", " ")])
+
+    def broken():
+        raise ImportError("missing dependency")
+
+    registry.extend(
+        [
+            SimpleNamespace(name="csv", load=lambda: csv),
+            SimpleNamespace(name="broken", load=lambda: broken),
+        ]
+    )
+    assert extract_text("table.csv", b"a,b") == "a b"
+    assert "skipping extractor plugin broken" in caplog.text
+    assert {e.name for e in extractors.registered_extractors()} >= {"txt", "pdf", "csv"}
+
+
+def test_heavy_extraction_libraries_load_on_first_use():
+    code = (
+        "import sys, app.main\n"
+        "heavy = ('pdfplumber', 'docx', 'pptx')\n"
+        "print(any(name in sys.modules for name in heavy))\n"
+        "from app.utils import extract_text\n"
+        "extract_text('a.txt', b'x')\n"
+        "print(any(name in sys.modules for name in heavy))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == ["False", "False"]
+
+
+def _extract_rtfx(data, mode):
+    yield data.decode().upper() if isinstance(data, bytes) else ""
+
+
+def test_registered_extractors_reach_process_workers(registry, monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "process")
+    monkeypatch.setenv("CPU_WORKERS", "1")
+    extractors.register_extractor(Extractor("rtfx", (".rtfx",), _extract_rtfx))
+    try:
+        text = asyncio.run(extract_document("notes.rtfx", b"process backend rtfx"))
+        docx_text = asyncio.run(extract_document("notes.docx", _docx_bytes("Worker docx")))
+    finally:
+        shutdown_executors()
+    assert (text, docx_text) == ("PROCESS BACKEND RTFX", "Worker docx")
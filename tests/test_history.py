@@ -0,0 +1,105 @@
+import io
+
+from fastapi.testclient import TestClient
+
+from app.cache import sha256_hex
+from app.history import HistoryStore
+from app.main import app
+from app.storage import BlobStore
+
+client = TestClient(app)
+
+
+def _store(tmp_path, max_rows=100):
+    return HistoryStore(tmp_path / "h.sqlite3", BlobStore(tmp_path / "blobs"), max_rows=max_rows)
+
+
+def test_blob_store_deduplicates_and_compresses(tmp_path):
+    blobs = BlobStore(tmp_path)
+    text = "-old line\n+new line\n" * 200
+    digest = blobs.put_text(text)
+    assert blobs.put_text(text) == digest
+    assert blobs.get_text(digest) == text
+    assert digest in blobs
+    files = [path for path in tmp_path.rglob("*") if path.is_file()]
+    assert len(files) == 1 and files[0].stat().st_size < len(text) // 10
+
+
+def test_history_pages_and_filters_without_loading_text(tmp_path):
+    store = _store(tmp_path)
+    for index in range(5):
+        store.record(
+            f"label_v{index}.pdf",
+            f"label_v{index + 1}.pdf",
+            diff="-a\n+b",
+            summary=f"summary {index}",
+            method="openai" if index % 2 else "fallback",
+            risk_level="high" if index == 3 else "low",
+        )
+    items, total = store.page(limit=2)
+    assert total == 5
+    assert [item["file_old"] for item in items] == ["label_v4.pdf", "label_v3.pdf"]
+    assert "diff" not in items[0]
+    items, total = store.page(limit=2, offset=4)
+    assert [item["file_old"] for item in items] == ["label_v0.pdf"]
+    assert store.page(risk_level="high")[1] == 1
+    assert store.page(method="openai")[1] == 2
+    assert store.page(search="v2")[1] == 2
+    assert store.page(search="%")[1] == 0
+
+    entry = store.get(items[0]["id"])
+    assert entry["summary"] == "summary 0"
+    assert (entry["added_lines"], entry["removed_lines"]) == (1, 1)
+
+
+def test_history_prunes_old_rows_and_their_blobs(tmp_path):
+    store = _store(tmp_path, max_rows=2)
+    first = store.record("a", "b", diff="-only in first", summary="shared", method="fallback")
+    store.record("c", "d", diff="-second", summary="shared", method="fallback")
+    store.record("e", "f", diff="-third", summary="shared", method="fallback")
+    assert store.get(first) is None
+    assert store.page()[1] == 2
+    blobs = store.blobs
+    assert blobs.put_text("shared") in blobs
+    assert blobs.get_text(blobs.put_text("-third")) == "-third"
+    remaining = {path.name for path in (tmp_path / "blobs").rglob("*") if path.is_file()}
+    assert len(remaining) == 3
+
+
+def test_history_stores_sharing_data_keep_reused_blobs(tmp_path):
+    # Two stores on the same files stand in for two uvicorn worker processes.
+    first, second = _store(tmp_path, max_rows=1), _store(tmp_path, max_rows=1)
+    first.record("a", "b", diff="-old", summary="shared", method="fallback")
+    entry = second.record("c", "d", diff="-new", summary="shared", method="fallback")
+    assert first.get(entry)["summary"] == "shared"
+    first.record("e", "f", diff="-newest", summary="other", method="fallback")
+    assert sha256_hex(b"shared") not in second.blobs
+    assert second.get(entry) is None and second.page()[1] == 1
+    plan = first._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT 1 FROM comparisons WHERE diff_blob = ? OR summary_blob = ?",
+        ("x", "x"),
+    ).fetchall()
+    assert {"comparisons_diff_blob", "comparisons_summary_blob"} <= {
+        name for row in plan for name in row[3].split() if name.startswith("comparisons_")
+    }
+
+
+def test_compare_records_history_and_serves_it(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    for name in ("first", "second"):
+        files = {
+            "file_old": (f"{name}_old.txt", io.BytesIO(b"Store at 20C"), "text/plain"),
+            "file_new": (f"{name}_new.txt", io.BytesIO(b"Store at 25C"), "text/plain"),
+        }
+        data = client.post("/compare", files=files).json()
+        assert data["history_id"] is not None
+
+    page = client.get("/history", params={"limit": 1}).json()
+    assert page["total"] == 2
+    assert page["items"][0]["file_old"] == "second_old.txt"
+    assert page["items"][0]["risk_level"] == "medium"
+    assert client.get("/history", params={"q": "first"}).json()["total"] == 1
+
+    detail = client.get(f"/history/{data['history_id']}").json()
+    assert "+Store at 25C" in detail["diff"]
+    assert client.get("/history/9999").status_code == 404
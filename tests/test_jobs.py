@@ -0,0 +1,184 @@
+import io
+import time
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app import jobs
+from app.jobs import JobQueue
+from app.main import app
+from app.cache import sha256_hex
+from app.storage import BlobStore
+
+
+def _queue(tmp_path, **kwargs):
+    return JobQueue(tmp_path / "jobs.sqlite3", BlobStore(tmp_path / "blobs"), **kwargs)
+
+
+def _submit(queue, name="label", priority=0):
+    return queue.submit(f"{name}_old.txt", b"old", f"{name}_new.txt", b"new", {}, priority)
+
+
+def test_queue_claims_by_priority_then_age(tmp_path):
+    queue = _queue(tmp_path)
+    first = _submit(queue, "first")
+    urgent = _submit(queue, "urgent", priority=5)
+    second = _submit(queue, "second")
+    assert [queue.claim(60)["id"] for _ in range(3)] == [urgent, first, second]
+    assert queue.claim(60) is None
+    assert queue.counts()["running"] == 3
+
+
+def test_failed_job_retries_with_backoff_until_exhausted(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2, retry_backoff=0.05)
+    job_id = _submit(queue)
+    job = queue.claim(60)
+    assert job["attempts"] == 1
+    assert queue.fail(job_id, job["lease_token"], "boom") == "queued"
+    assert queue.claim(60) is None
+    time.sleep(0.06)
+    job = queue.claim(60)
+    assert job["attempts"] == 2
+    assert queue.fail(job_id, job["lease_token"], "boom again") == "failed"
+    status = queue.get(job_id)
+    assert (status["status"], status["error"]) == ("failed", "boom again")
+
+
+def test_expired_lease_is_reclaimed_and_cancel_is_flagged(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = _submit(queue)
+    stalled = queue.claim(-1)
+    assert stalled["id"] == job_id
+    reclaimed = queue.claim(60)
+    assert (reclaimed["id"], reclaimed["attempts"]) == (job_id, 2)
+    token = reclaimed["lease_token"]
+    assert token != stalled["lease_token"]
+    assert queue.heartbeat(job_id, token, 60) is False
+    assert queue.cancel(job_id) == "running"
+    assert queue.heartbeat(job_id, token, 60) is True
+
+    queued = _submit(queue, "other")
+    assert queue.cancel(queued) == "cancelled"
+    assert queue.claim(60) is None
+    assert queue.cancel("missing") is None
+
+
+def test_stalled_worker_cannot_finish_a_reclaimed_job(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2)
+    job_id = _submit(queue)
+    stalled = queue.claim(-1)["lease_token"]
+    current = queue.claim(-1)["lease_token"]
+    assert queue.heartbeat(job_id, stalled, 60) is True
+    assert queue.complete(job_id, stalled, {"diff": "stale"}) is False
+    assert queue.fail(job_id, stalled, "boom") is None
+    queue.release(job_id, stalled)
+    assert queue.get(job_id)["status"] == "running"
+
+    # The lease of the last attempt lapsed too, so the job fails instead of running again.
+    assert queue.claim(60) is None
+    status = queue.get(job_id)
+    assert (status["status"], status["attempts"]) == ("failed", 2)
+    assert queue.complete(job_id, current, {"diff": "late"}) is False
+    assert queue.result(job_id) is None
+
+
+def test_job_inputs_are_copied_to_temporary_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_TMP_DIR", str(tmp_path))
+    queue = _queue(tmp_path, max_attempts=1)
+    data = bytes(range(256)) * 20000
+    _submit(queue)
+    job = queue.claim(60)
+    job["new_blob"] = queue.blobs.put(data)
+    path_old, path_new = queue.inputs(job)
+    assert (path_old.read_bytes(), path_new.read_bytes()) == (b"old", data)
+    assert path_new.parent == tmp_path and path_new.suffix == ".txt"
+    job["old_blob"] = "missing"
+    with pytest.raises(ValueError):
+        queue.inputs(job)
+    assert sorted(tmp_path.glob("job-*")) == sorted([path_old, path_new])
+
+
+def test_finished_jobs_and_unreferenced_blobs_are_pruned(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: now[0])
+    queue = _queue(tmp_path, retention=60)
+    source = tmp_path / "label.txt"
+    source.write_bytes(b"shared")
+    expired = queue.submit("a.txt", source, "b.txt", b"only expired", {})
+    kept = queue.submit("a.txt", b"shared", "c.txt", b"kept", {})
+    queue.complete(expired, queue.claim(60)["lease_token"], {"diff": "x"})
+    (result_blob,) = queue._conn.execute(
+        "SELECT result_blob FROM jobs WHERE id = ?", (expired,)
+    ).fetchone()
+
+    now[0] += 61
+    queue.fail(kept, queue.claim(60)["lease_token"], "boom", retryable=False)
+    assert queue.get(expired) is None
+    assert queue.get(kept)["status"] == "failed"
+    remaining = {sha256_hex(b"shared"), sha256_hex(b"kept")}
+    assert all(digest in queue.blobs for digest in remaining)
+    assert sha256_hex(b"only expired") not in queue.blobs
+    assert result_blob not in queue.blobs
+
+
+def test_job_api_runs_comparison_in_background(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    monkeypatch.setenv("JOB_POLL_SECONDS", "0.05")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"Store at 20C"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"Store at 25C"), "text/plain"),
+    }
+    with TestClient(app) as client:
+        submitted = client.post("/jobs", files=files, data={"priority": "3"})
+        assert submitted.status_code == 202
+        job = submitted.json()
+        assert job["priority"] == 3
+        for _ in range(100):
+            job = client.get(f"/jobs/{job['id']}").json()
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.05)
+        assert job["status"] == "succeeded"
+        assert job["stage"] == "summarizing"
+        result = client.get(f"/jobs/{job['id']}/result").json()
+        assert "+Store at 25C" in result["diff"]
+        assert result["history_id"] is not None
+        assert client.get("/jobs").json()["counts"]["succeeded"] == 1
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.post("/jobs/missing/cancel").status_code == 404
+
+
+def test_unfinished_job_has_no_result(monkeypatch):
+    monkeypatch.setenv("JOBS_ENABLED", "0")
+    with TestClient(app) as client:
+        job = client.post(
+            "/jobs",
+            files={
+                "file_old": ("old.txt", io.BytesIO(b"a"), "text/plain"),
+                "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+            },
+        ).json()
+        assert job["status"] == "queued"
+        assert client.get(f"/jobs/{job['id']}/result").status_code == 409
+        assert client.post(f"/jobs/{job['id']}/cancel").json()["status"] == "cancelled"
+        assert jobs.get_job_queue().claim(60) is None
+        bad = client.post(
+            "/jobs",
+            files={
+                "file_old": ("old.txt", io.BytesIO(b"a"), "text/plain"),
+                "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+            },
+            data={"diff_mode": "sideways"},
+        )
+        assert bad.status_code == 400
+
+        monkeypatch.setenv("UPLOAD_MAX_BYTES", "4")
+        large = client.post(
+            "/jobs",
+            files={
+                "file_old": ("old.txt", io.BytesIO(b"large"), "text/plain"),
+                "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+            },
+        )
+        assert large.status_code == 413
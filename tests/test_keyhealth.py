@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from app import keyhealth, utils
+from app.keyhealth import KeyHealthRegistry, is_rate_limit_error
+
+
+def test_failing_key_opens_circuit_with_exponential_backoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(keyhealth.time, "monotonic", lambda: now[0])
+    registry = KeyHealthRegistry(failure_threshold=1, base_backoff=10, max_backoff=25)
+    keys = [("openai", "bad"), ("openai", "good")]
+
+    registry.record_failure("openai", "bad")
+    assert registry.order(keys) == [("openai", "good")]
+    now[0] += 11
+    assert registry.order(keys) == keys
+
+    registry.record_failure("openai", "bad", rate_limited=True)
+    now[0] += 11
+    assert registry.is_open("openai", "bad")
+    now[0] += 10
+    assert not registry.is_open("openai", "bad")
+    assert registry.stats("openai", "bad").rate_limited == 1
+
+    registry.record_failure("openai", "bad")
+    assert registry.stats("openai", "bad").open_until == now[0] + 25
+
+
+def test_key_due_first_is_tried_when_every_circuit_is_open(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(keyhealth.time, "monotonic", lambda: now[0])
+    registry = KeyHealthRegistry(failure_threshold=1, base_backoff=10)
+    keys = [("openai", "a"), ("gemini", "b")]
+    registry.record_failure("openai", "a")
+    registry.record_failure("openai", "a")
+    registry.record_failure("gemini", "b")
+    assert registry.order(keys) == [("gemini", "b")]
+    assert registry.order([("openai", "a")]) == [("openai", "a")]
+
+
+def test_single_key_recovers_without_waiting_out_the_backoff(monkeypatch):
+    monkeypatch.setenv("SUMMARIZER_API_KEYS", "openai:flaky")
+    failures = [RuntimeError("transient")]
+
+    class Completions:
+        def create(self, **kwargs):
+            if failures:
+                raise failures.pop()
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    _, metadata = utils.summarize_changes("diff", client_factory=factory, use_cache=False)
+    assert metadata["method"] == "fallback"
+    summary, _ = utils.summarize_changes("diff", client_factory=factory, use_cache=False)
+    assert summary == "ok"
+
+
+def test_healthy_keys_are_ordered_by_latency():
+    registry = KeyHealthRegistry()
+    keys = [("openai", "slow"), ("gemini", "fast"), ("openai", "new")]
+    registry.record_success("openai", "slow", 2.0)
+    registry.record_success("gemini", "fast", 0.5)
+    assert registry.order(keys) == [("openai", "new"), ("gemini", "fast"), ("openai", "slow")]
+
+
+def test_rate_limit_errors_are_recognised():
+    class RateLimitError(Exception):
+        pass
+
+    assert is_rate_limit_error(RateLimitError())
+    assert is_rate_limit_error(SimpleNamespace(status_code=429))
+    assert not is_rate_limit_error(RuntimeError("boom"))
+    assert not is_rate_limit_error(None)
+
+
+def test_bad_key_is_skipped_on_the_next_request(monkeypatch):
+    monkeypatch.setenv("SUMMARIZER_API_KEYS", "openai:bad,openai:good")
+    attempts = []
+
+    class Completions:
+        def __init__(self, key):
+            self.key = key
+
+        def create(self, **kwargs):
+            attempts.append(self.key)
+            if self.key == "bad":
+                raise RuntimeError("key rejected")
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions(key)))
+    for _ in range(3):
+        summary, _ = utils.summarize_changes("diff", client_factory=factory, use_cache=False)
+        assert summary == "ok"
+    assert attempts == ["bad", "good", "good", "good"]
+
+
+def test_env_keys_are_parsed_once_per_environment(monkeypatch):
+    calls = []
+    original = utils._parse_env_keys
+    monkeypatch.setattr(utils, "_parse_env_keys", lambda: calls.append(1) or original())
+    monkeypatch.setattr(utils, "_parsed_env_keys", None)
+    monkeypatch.setenv("SUMMARIZER_API_KEYS", "openai:a")
+    utils._gather_api_keys()
+    utils._gather_api_keys()
+    monkeypatch.setenv("SUMMARIZER_API_KEYS", "openai:b")
+    assert ("openai", "b") in utils._gather_api_keys()
+    assert len(calls) == 2
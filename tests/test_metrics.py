@@ -0,0 +1,87 @@
+import io
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import LINE_BUCKETS, Counter, Histogram, bucket_label, observe_summary
+
+client = TestClient(app)
+
+
+def _samples():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histograms_render_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    histogram.labels("diff").observe(0.05)
+    histogram.labels("diff").observe(0.5)
+    histogram.labels("diff").observe(3.0)
+    counter = Counter("test_total", "Test counter.")
+    counter.inc(2)
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds Test latency.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="diff",le="0.1"} 1',
+        'test_seconds_bucket{stage="diff",le="1.0"} 2',
+        'test_seconds_bucket{stage="diff",le="+Inf"} 3',
+        'test_seconds_sum{stage="diff"} 3.55',
+        'test_seconds_count{stage="diff"} 3',
+    ]
+    assert counter.render().splitlines()[-1] == "test_total 2"
+    assert bucket_label(1000, LINE_BUCKETS) == "1k"
+    assert bucket_label(10**7, LINE_BUCKETS) == "+Inf"
+
+
+def test_metrics_endpoint_counts_comparison_stages(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    before = _samples()
+    for _ in range(2):
+        files = {
+            "file_old": ("old.txt", io.BytesIO(b"Store at 20C metrics"), "text/plain"),
+            "file_new": ("new.txt", io.BytesIO(b"Store at 25C metrics"), "text/plain"),
+        }
+        assert client.post("/compare", files=files).status_code == 200
+    observe_summary({"method": "openai", "provider": "openai", "tokens_used": 42}, 0.2)
+    after = _samples()
+
+    def delta(name):
+        return after[name] - before.get(name, 0)
+
+    assert delta("pharm_drive_upload_read_seconds_count") == 4
+    assert delta('pharm_drive_extract_seconds_count{file_type="txt",size_bucket="100KiB"}') == 2
+    assert delta('pharm_drive_cache_hits_total{cache="extraction"}') == 2
+    assert delta('pharm_drive_diff_seconds_count{lines="1k"}') == 2
+    assert delta('pharm_drive_summarize_seconds_count{provider="none",outcome="fallback"}') == 2
+    assert delta("pharm_drive_summary_fallbacks_total") == 2
+    assert delta('pharm_drive_summary_tokens_total{provider="openai"}') == 42
+    assert after["pharm_drive_requests_in_flight"] == 1
+
+
+def test_streaming_diffs_are_timed_as_one_pass(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    monkeypatch.setenv("STREAMING_DIFF_MIN_BYTES", "1")
+    before = _samples()
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"Store at 20C streamed"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"Store at 25C streamed"), "text/plain"),
+    }
+    assert client.post("/compare", files=files).status_code == 200
+    after = _samples()
+    name = 'pharm_drive_extract_seconds_count{file_type="streaming",size_bucket="100KiB"}'
+    assert after[name] - before[name] == 1
+    name = 'pharm_drive_extract_seconds_count{file_type="txt",size_bucket="100KiB"}'
+    assert after[name] == before[name]
+
+
+def test_metrics_endpoint_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "0")
+    assert client.get("/metrics").status_code == 404
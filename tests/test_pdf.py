@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app import executor
+from app.pipeline import _extract_pdf_sharded
+from app.utils import (
+    diff_documents,
+    diff_texts,
+    extract_pdf_pages,
+    extract_text,
+    iter_document_lines,
+    pdf_page_count,
+)
+from benchmarks.synthetic import make_synthetic_pdf
+
+
+def test_fast_and_layout_modes_agree_on_simple_pdf():
+    data = make_synthetic_pdf(3, lines_per_page=5)
+    layout = extract_pdf_pages(data, mode="layout")
+    fast = extract_pdf_pages(data, mode="fast")
+    assert len(layout) == len(fast) == 3
+    assert [page.split() for page in layout] == [page.split() for page in fast]
+    assert fast[2].startswith("Page 3 line 1")
+
+
+def test_unknown_pdf_mode_is_rejected():
+    with pytest.raises(ValueError):
+        extract_text("label.pdf", make_synthetic_pdf(1), pdf_mode="ocr")
+
+
+def test_sharded_extraction_keeps_page_order(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "thread")
+    monkeypatch.setenv("PDF_SHARD_PAGES", "2")
+    executor.shutdown_executors()
+    data = make_synthetic_pdf(7, lines_per_page=2)
+    try:
+        sharded = asyncio.run(_extract_pdf_sharded(data, "fast"))
+    finally:
+        executor.shutdown_executors()
+    assert pdf_page_count(data) == 7
+    assert sharded == extract_text("label.pdf", data, pdf_mode="fast")
+
+
+@pytest.mark.parametrize("mode", ["fast", "layout"])
+def test_streaming_extraction_matches_full_text(tmp_path, mode):
+    old = make_synthetic_pdf(4, lines_per_page=3)
+    new = make_synthetic_pdf(6, lines_per_page=3)
+    path = tmp_path / "old.pdf"
+    path.write_bytes(old)
+    old_text = extract_text("old.pdf", old, pdf_mode=mode)
+    assert list(iter_document_lines("old.pdf", path, mode)) == old_text.splitlines()
+    expected = diff_texts(old_text, extract_text("new.pdf", new, pdf_mode=mode))
+    assert diff_documents("old.pdf", path, "new.pdf", new, pdf_mode=mode) == expected
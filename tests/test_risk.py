@@ -0,0 +1,55 @@
+import io
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.risk import AhoCorasick, RiskScanner
+from app.utils import diff_texts
+
+client = TestClient(app)
+
+
+def test_aho_corasick_finds_overlapping_words():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted((start, end) for start, end, _ in automaton.finditer("ushers"))
+    assert found == [(1, 4), (2, 4), (2, 6)]
+
+
+def test_scanner_matches_synonyms_prefixes_and_patterns():
+    matches = RiskScanner().scan_text("Contraindicated in pregnancy; reduce the dose to 5 mg/kg.")
+    tags = {(match.category, match.text) for match in matches}
+    assert ("contraindication", "contraindicated") in tags
+    assert ("pregnancy", "pregnancy") in tags
+    assert ("dosage", "dose") in tags
+    assert ("dosage", "5 mg/kg") in tags
+
+
+def test_scanner_requires_word_boundaries():
+    assert [match.text for match in RiskScanner().scan_text("Redosed, then overdosed")] == [
+        "overdosed"
+    ]
+    scanner = RiskScanner([{"category": "x", "terms": ["rash"]}])
+    assert scanner.scan_text("crash rashes") == []
+    assert [match.text for match in scanner.scan_text("new rash.")] == ["rash"]
+
+
+def test_scan_diff_tags_only_changed_hunks():
+    old = "\n".join(["Dosage: 10 mg daily"] + ["filler"] * 10 + ["Store below 25C"])
+    new = "\n".join(["Dosage: 20 mg daily"] + ["filler"] * 10 + ["Store below 30C"])
+    report = RiskScanner().scan_diff(diff_texts(old, new))
+    assert report["level"] == "high"
+    assert [hunk["level"] for hunk in report["hunks"]] == ["high", "medium"]
+    assert report["hunks"][1]["tags"] == ["storage"]
+    assert report["counts"]["dosage"] == 4
+
+
+def test_compare_returns_risk(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"Serious adverse events were rare"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"Serious adverse events were common"), "text/plain"),
+    }
+    data = client.post("/compare", files=files).json()
+    assert data["risk"]["level"] == "high"
+    assert data["risk"]["counts"] == {"adverse events": 4}
+    assert data["risk"]["hunks"][0]["header"].startswith("@@")
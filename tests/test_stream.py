@@ -0,0 +1,164 @@
+import asyncio
+import io
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app import main, utils
+from app.cache import LRUCache
+from app.main import app
+from app.utils import summarize_changes_stream
+
+client = TestClient(app)
+
+
+def _events(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_compare_stream_emits_stages_diff_and_done(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    monkeypatch.delenv("SUMMARIZER_API_KEYS", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    old = "\n".join(f"line {i}" for i in range(30))
+    new = old.replace("line 2\n", "line two\n").replace("line 25", "line twenty-five")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(old.encode()), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(new.encode()), "text/plain"),
+    }
+    with client.stream("POST", "/compare/stream", files=files) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = _events(response)
+
+    names = [event["event"] for event in events]
+    assert names[:2] == ["stage", "stage"]
+    assert names.index("diff") < names.index("risk") < names.index("summary_token")
+    assert names[-1] == "done"
+    hunks = [event["text"] for event in events if event["event"] == "diff"]
+    assert len(hunks) == 2
+    assert "\n".join(hunks) == utils.diff_texts(old, new)
+    done = events[-1]
+    assert done["method"] == "fallback"
+    assert done["summary"] == "".join(e["text"] for e in events if e["event"] == "summary_token")
+    assert "diff" not in done
+
+
+def test_compare_stream_diffs_large_documents_in_one_streaming_pass(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    monkeypatch.setenv("STREAMING_DIFF_MIN_BYTES", "1")
+
+    async def no_full_extraction(*args, **kwargs):
+        raise AssertionError("large documents must not be extracted in full")
+
+    monkeypatch.setattr(main, "extract_document", no_full_extraction)
+    old = "\n".join(f"line {i}" for i in range(30))
+    new = old.replace("line 2\n", "line two\n").replace("line 25", "line twenty-five")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(old.encode()), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(new.encode()), "text/plain"),
+    }
+    with client.stream("POST", "/compare/stream", files=files) as response:
+        events = _events(response)
+    hunks = [event["text"] for event in events if event["event"] == "diff"]
+    assert len(hunks) == 2
+    assert "\n".join(hunks) == utils.diff_texts(old, new)
+    assert events[-1]["event"] == "done"
+
+
+def test_compare_stream_rejects_bad_options_up_front():
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"a"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+    }
+    response = client.post("/compare/stream", files=files, data={"diff_mode": "paragraph"})
+    assert response.status_code == 400
+
+
+def test_compare_stream_reports_extraction_errors_as_events(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    files = {
+        "file_old": ("old.xyz", io.BytesIO(b"a"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+    }
+    with client.stream("POST", "/compare/stream", files=files) as response:
+        events = _events(response)
+    assert events[-1]["event"] == "error"
+    assert events[-1]["status"] == 400
+
+
+def _streaming_factory(tokens_by_key):
+    class Stream:
+        def __init__(self, tokens):
+            self.tokens = tokens
+
+        async def __aiter__(self):
+            for token in self.tokens:
+                if isinstance(token, Exception):
+                    raise token
+                delta = SimpleNamespace(content=token)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=42))
+
+    class Completions:
+        def __init__(self, key):
+            self.key = key
+
+        async def create(self, **kwargs):
+            assert kwargs["stream"] is True
+            return Stream(tokens_by_key[self.key])
+
+    return lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions(key)))
+
+
+def test_summary_stream_yields_provider_tokens_and_resets_on_failure(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    factory = _streaming_factory(
+        {"flaky": ["Dose ", RuntimeError("connection reset")], "good": ["Dose ", "doubled."]}
+    )
+
+    async def collect():
+        return [
+            event
+            async for event in summarize_changes_stream(
+                "-10 mg\n+20 mg", client_factory=factory, api_keys_override=["openai:flaky", "openai:good"]
+            )
+        ]
+
+    events = asyncio.run(collect())
+    assert events[:4] == [("token", "Dose "), ("reset", None), ("token", "Dose "), ("token", "doubled.")]
+    kind, (summary, metadata) = events[-1]
+    assert kind == "done"
+    assert summary == "Dose doubled."
+    assert metadata["provider"] == "openai"
+    assert metadata["tokens_used"] == 42
+
+    # The streamed summary is cached like a regular one.
+    events = asyncio.run(collect())
+    assert events[-1][1][1]["method"] == "cached"
+
+
+def test_compare_stream_reports_unexpected_failures_as_events(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    files = {
+        "file_old": ("old.pdf", io.BytesIO(b"%PDF-1.4 corrupt"), "application/pdf"),
+        "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+    }
+    with client.stream("POST", "/compare/stream", files=files) as response:
+        events = _events(response)
+    assert response.status_code == 200
+    assert (events[-1]["event"], events[-1]["status"]) == ("error", 500)
+
+    async def broken_analysis(diff):
+        raise RuntimeError("scanner unavailable")
+
+    monkeypatch.setattr(main, "analyze_diff", broken_analysis)
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"a"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"b"), "text/plain"),
+    }
+    with client.stream("POST", "/compare/stream", files=files) as response:
+        events = _events(response)
+    assert [event["event"] for event in events][-3:] == ["diff", "stage", "error"]
+    assert events[-1]["detail"] == "RuntimeError: scanner unavailable"
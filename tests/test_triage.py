@@ -0,0 +1,91 @@
+import io
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.triage import Triage
+from app.utils import diff_texts
+
+client = TestClient(app)
+
+
+def test_dates_and_job_codes_only_are_skipped():
+    old = "Dosage: 10 mg daily\nRevised: March 2023\nPP-ABC-US-0123 Page 1 of 4"
+    new = "Dosage: 10 mg daily\nRevised: April 2024\nPP-ABC-US-0456 Page 1 of 5"
+    decision = Triage().classify(diff_texts(old, new))
+    assert decision.route == "skip"
+    assert decision.changed_lines == 0
+
+
+def test_high_risk_vocabulary_routes_to_full_model():
+    decision = Triage().classify(diff_texts("Dosage: 10 mg daily", "Dosage: 20 mg daily"))
+    assert decision.route == "full"
+    assert "dosage" in decision.risk_terms
+
+
+def test_small_low_risk_change_routes_to_fast_model():
+    decision = Triage().classify(diff_texts("Call our team today", "Contact our team today"))
+    assert decision.route == "fast"
+    assert decision.changed_lines == 2
+
+
+def test_word_mode_markup_is_triaged():
+    diff = diff_texts("Updated 01/02/2023 by staff", "Updated 03/04/2024 by staff", mode="word")
+    assert Triage().classify(diff).route == "skip"
+
+
+def test_compare_skips_summarizer_for_trivial_diffs(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"Label text\nUpdated 2023-01-05"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"Label text\nUpdated 2024-02-11"), "text/plain"),
+    }
+    data = client.post("/compare", files=files).json()
+    assert data["method"] == "triage"
+    assert data["triage"]["route"] == "skip"
+    assert "+Updated 2024-02-11" in data["diff"]
+
+
+def test_doses_and_ratios_are_not_mistaken_for_dates():
+    cases = [
+        ("hepatotoxicity: 1/1000", "hepatotoxicity: 1/5000"),
+        ("Decrease 1000 mg", "Decrease 2000 mg"),
+        ("Octreotide 1000 mcg", "Octreotide 5000 mcg"),
+        ("Titrate 5-10-20", "Titrate 5-10-40"),
+    ]
+    for old, new in cases:
+        decision = Triage().classify(diff_texts(old, new))
+        assert decision.route != "skip", (old, new)
+        assert decision.changed_lines == 2
+
+
+def test_risk_terms_on_normalized_lines_prevent_skipping():
+    old = "Contraindicated in pregnancy, updated March 2023"
+    new = "Contraindicated in pregnancy, updated April 2024"
+    decision = Triage().classify(diff_texts(old, new))
+    assert decision.route == "full"
+    assert decision.risk_terms
+
+
+def test_revision_markers_keep_following_doses():
+    cases = [
+        ("Revised 10 tablets per pack", "Revised 20 tablets per pack"),
+        ("Version 2 tablets daily", "Version 3 tablets daily"),
+    ]
+    for old, new in cases:
+        decision = Triage().classify(diff_texts(old, new))
+        assert decision.route != "skip", (old, new)
+        assert decision.changed_lines == 2
+    for old, new in [("Rev. 3", "Rev. 4"), ("Label v2.1 final", "Label v2.3 final")]:
+        assert Triage().classify(diff_texts(old, new)).route == "skip", (old, new)
+
+
+def test_lines_moved_between_hunks_are_not_cancelled():
+    filler = [f"Filler line {i}" for i in range(10)]
+    old = "\n".join(["Section A", "Take with food", *filler, "Section B"])
+    new = "\n".join(["Section A", *filler, "Section B", "Take with food"])
+    diff = diff_texts(old, new)
+    assert diff.count("@@ ") == 2
+    decision = Triage().classify(diff)
+    assert decision.route != "skip"
+    assert decision.changed_lines == 2
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app import uploads
+from app.main import app
+from app.uploads import InflightBytes, UploadTooLargeError, spool_upload
+from app.utils import extract_text
+from benchmarks.synthetic import make_synthetic_pdf
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "uploads"
+    directory.mkdir()
+    monkeypatch.setenv("UPLOAD_TMP_DIR", str(directory))
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 1000)
+    return directory
+
+
+def test_spool_upload_hashes_in_chunks(upload_dir):
+    data = make_synthetic_pdf(3)
+    spooled = asyncio.run(spool_upload(UploadFile(io.BytesIO(data), filename="label.pdf")))
+    assert spooled.path.parent == upload_dir and spooled.path.suffix == ".pdf"
+    assert (spooled.size, spooled.sha256) == (len(data), hashlib.sha256(data).hexdigest())
+    assert extract_text("label.pdf", spooled.path) == extract_text("label.pdf", data)
+    spooled.remove()
+    assert not any(upload_dir.iterdir())
+
+
+def test_spool_upload_enforces_limit_and_cleans_up(upload_dir):
+    upload = UploadFile(io.BytesIO(b"x" * 5000), filename="big.txt")
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(upload, max_bytes=4000))
+    assert not any(upload_dir.iterdir())
+
+
+def test_inflight_bytes_waits_for_release():
+    async def scenario():
+        limiter = InflightBytes(100)
+        order = []
+
+        async def request(name, size, hold):
+            async with limiter.reserve(size):
+                order.append(f"{name} start")
+                await asyncio.sleep(hold)
+                order.append(f"{name} end")
+
+        await asyncio.gather(request("a", 80, 0.02), request("b", 80, 0), request("c", 500, 0))
+        return order, limiter.used
+
+    order, used = asyncio.run(scenario())
+    assert order[:2] == ["a start", "a end"]
+    assert sorted(order[2:]) == ["b end", "b start", "c end", "c start"]
+    assert used == 0
+
+
+def test_compare_rejects_oversized_upload_and_removes_temp_files(upload_dir, monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"Store at 20C"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"Store at 25C"), "text/plain"),
+    }
+    assert "+Store at 25C" in client.post("/compare", files=files).json()["diff"]
+    assert not any(upload_dir.iterdir())
+
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "10")
+    files = {
+        "file_old": ("old.txt", io.BytesIO(b"Store at 20C"), "text/plain"),
+        "file_new": ("new.txt", io.BytesIO(b"Store at 25C"), "text/plain"),
+    }
+    response = client.post("/compare/stream", files=files)
+    assert response.status_code == 413
+    assert not any(upload_dir.iterdir())
+
+
+def test_batch_and_version_uploads_are_spooled_and_limited(upload_dir, monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    files = [
+        ("files", ("old.txt", io.BytesIO(b"Store at 20C"), "text/plain")),
+        ("files", ("new.txt", io.BytesIO(b"Store at 25C"), "text/plain")),
+    ]
+    response = client.post("/compare/batch", files=files, data={"baseline": "old.txt"})
+    assert '"pairs": 1, "failed": 0' in response.text
+    assert not any(upload_dir.iterdir())
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("old.txt", "Store at 20C")
+        archive.writestr("new.txt", "Store at 25C")
+    archive = {"archive": ("labels.zip", buffer.getvalue(), "application/zip")}
+    response = client.post("/compare/batch", files=archive, data={"baseline": "old.txt"})
+    assert '"pairs": 1, "failed": 0' in response.text
+    assert not any(upload_dir.iterdir())
+    version = ("label.txt", io.BytesIO(b"Store at 20C spooled"), "text/plain")
+    response = client.post("/documents/spooled/versions", files={"file": version})
+    assert response.status_code == 201 and response.json()["size"] == 20
+    assert not any(upload_dir.iterdir())
+
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "10")
+    files = [
+        ("files", ("old.txt", io.BytesIO(b"short"), "text/plain")),
+        ("files", ("new.txt", io.BytesIO(b"Store at 25C"), "text/plain")),
+    ]
+    response = client.post("/compare/batch", files=files, data={"baseline": "old.txt"})
+    assert response.status_code == 413
+    version = ("label.txt", io.BytesIO(b"Store at 25C"), "text/plain")
+    assert client.post("/documents/spooled/versions", files={"file": version}).status_code == 413
+    assert not any(upload_dir.iterdir())
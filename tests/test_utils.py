@@ -1,6 +1,9 @@
+import asyncio
 from types import SimpleNamespace
 
-from app.utils import summarize_changes
+from app import utils
+from app.cache import LRUCache
+from app.utils import summarize_changes, summarize_changes_async
 
 
 def test_summarize_changes_no_api_keys(monkeypatch):
@@ -44,3 +47,233 @@ def test_summarize_changes_tries_all_keys(monkeypatch):
     assert attempts == ["bad", "good"]
     assert summary == "summary-good"
     assert metadata["method"] == "openai"
+
+
+def _counting_client_factory(calls):
+    class FakeClient:
+        def __init__(self, api_key: str):
+            calls.append(api_key)
+            self.chat = SimpleNamespace(
+                completions=SimpleNamespace(
+                    create=lambda **kwargs: SimpleNamespace(
+                        choices=[SimpleNamespace(message=SimpleNamespace(content="fresh summary"))],
+                        usage=SimpleNamespace(total_tokens=42),
+                    )
+                )
+            )
+
+    return FakeClient
+
+
+def test_summarize_changes_serves_repeat_prompts_from_cache(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    calls = []
+    factory = _counting_client_factory(calls)
+
+    first, first_meta = summarize_changes("same diff", client_factory=factory, api_keys_override="openai:k")
+    second, second_meta = summarize_changes("same diff", client_factory=factory, api_keys_override="openai:k")
+
+    assert first == second == "fresh summary"
+    assert first_meta["method"] == "openai" and first_meta["tokens_used"] == 42
+    assert second_meta["method"] == "cached" and second_meta["tokens_used"] == 0
+    assert calls == ["k"]
+
+
+def test_summarize_changes_cache_opt_out(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    calls = []
+    factory = _counting_client_factory(calls)
+    for _ in range(2):
+        _, metadata = summarize_changes(
+            "same diff", client_factory=factory, api_keys_override="openai:k", use_cache=False
+        )
+        assert metadata["method"] == "openai"
+    assert calls == ["k", "k"]
+
+
+def test_summarize_changes_async_awaits_async_clients(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+
+    class AsyncCompletions:
+        async def create(self, **kwargs):
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=" async summary "))],
+                usage=SimpleNamespace(total_tokens=7),
+            )
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=AsyncCompletions()))
+    summary, metadata = asyncio.run(
+        summarize_changes_async("diff", client_factory=factory, api_keys_override="openai:k")
+    )
+    assert summary == "async summary"
+    assert metadata["method"] == "openai" and metadata["tokens_used"] == 7
+
+
+def test_summarize_changes_async_times_out_and_falls_through(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    monkeypatch.setenv("OPENAI_TIMEOUT", "0.05")
+    attempts = []
+
+    class SlowThenFastCompletions:
+        def __init__(self, key):
+            self.key = key
+
+        async def create(self, **kwargs):
+            attempts.append(self.key)
+            if self.key == "slow":
+                await asyncio.sleep(5)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="fast"))])
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=SlowThenFastCompletions(key)))
+    summary, metadata = asyncio.run(
+        summarize_changes_async(
+            "diff", client_factory=factory, api_keys_override=["openai:slow", "openai:fast"]
+        )
+    )
+    assert attempts == ["slow", "fast"]
+    assert summary == "fast" and metadata["method"] == "openai"
+
+
+def test_summarize_changes_async_accepts_sync_fakes(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    calls = []
+    summary, metadata = asyncio.run(
+        summarize_changes_async(
+            "diff", client_factory=_counting_client_factory(calls), api_keys_override="openai:k"
+        )
+    )
+    assert summary == "fresh summary" and calls == ["k"]
+
+
+def _keyed_async_factory(delays, started, cancelled):
+    class Completions:
+        def __init__(self, key):
+            self.key = key
+
+        async def create(self, **kwargs):
+            started.append(self.key)
+            try:
+                await asyncio.sleep(delays[self.key])
+            except asyncio.CancelledError:
+                cancelled.append(self.key)
+                raise
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=f"from-{self.key}"))]
+            )
+
+    return lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions(key)))
+
+
+def test_hedged_summary_starts_backup_after_delay_and_cancels_loser(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    started, cancelled = [], []
+    factory = _keyed_async_factory({"slow": 5, "fast": 0.01}, started, cancelled)
+    summary, metadata = asyncio.run(
+        summarize_changes_async(
+            "diff",
+            client_factory=factory,
+            api_keys_override=["openai:slow", "openai:fast"],
+            hedge_delay=0.05,
+        )
+    )
+    assert summary == "from-fast"
+    assert metadata["provider"] == "openai" and metadata["attempts"] == 2
+    assert started == ["slow", "fast"] and cancelled == ["slow"]
+
+
+def test_race_starts_top_providers_at_once(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    started, cancelled = [], []
+    factory = _keyed_async_factory({"a": 0.2, "b": 0.01, "c": 0.01}, started, cancelled)
+    summary, metadata = asyncio.run(
+        summarize_changes_async(
+            "diff", client_factory=factory, api_keys_override=["openai:a", "openai:b", "openai:c"], race=2
+        )
+    )
+    assert summary == "from-b"
+    assert started == ["a", "b"] and cancelled == ["a"]
+
+
+def test_large_diffs_are_summarized_by_map_reduce(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(64, ttl=60))
+    monkeypatch.setenv("SUMMARIZER_CHUNK_TOKENS", "300")
+    prompts = []
+
+    class Completions:
+        async def create(self, **kwargs):
+            prompt = kwargs["messages"][0]["content"]
+            prompts.append(prompt)
+            content = "combined" if "Part 1:" in prompt else f"part-{len(prompts)}"
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                usage=SimpleNamespace(total_tokens=10),
+            )
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    old = "\n".join(f"Section {i}: dosage guidance for the label." for i in range(300))
+    new = old.replace("dosage guidance", "revised dosage guidance")
+
+    def run(new_text):
+        return asyncio.run(
+            summarize_changes_async(
+                utils.diff_texts(old, new_text), client_factory=factory, api_keys_override="openai:k"
+            )
+        )
+
+    summary, metadata = run(new)
+    first_calls = len(prompts)
+    chunks = metadata["chunks"]
+    assert summary == "combined"
+    assert metadata["chunks"] > 1 and first_calls == metadata["chunks"] + 1
+    assert metadata["tokens_used"] == 10 * first_calls
+
+    prompts.clear()
+    run(new.replace("Section 299: revised", "Section 299: newly revised"))
+    # Only the chunk holding the edit and the reduce pass are summarized again.
+    assert len(prompts) == 2
+
+    # The prompt budget applies per chunk: a diff beyond it is chunked, not cut.
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "500")
+    prompts.clear()
+    summary, metadata = run(new.replace("Section 0: revised", "Section 0: changed"))
+    assert (metadata["chunks"], metadata["truncated"]) == (chunks, False)
+
+
+def test_prompt_embeds_compacted_diff_and_reports_savings(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    prompts = []
+
+    class Completions:
+        def create(self, **kwargs):
+            prompts.append(kwargs["messages"][0]["content"])
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    diff = utils.diff_texts("a\nb\nc\nd\nold line\ne\nf", "a\nb\nc\nd\nnew line\ne\nf")
+    _, metadata = summarize_changes(diff, client_factory=factory, api_keys_override="openai:k")
+    assert "--- old" not in prompts[0] and " b" not in prompts[0]
+    assert "-old line\n+new line" in prompts[0]
+    assert metadata["tokens_saved"] > 0
+
+    summarize_changes(diff, client_factory=factory, api_keys_override="openai:k", compact=False)
+    assert "--- old" in prompts[1]
+
+
+def test_fast_tier_uses_fast_model(monkeypatch):
+    monkeypatch.setattr(utils, "_summary_cache", LRUCache(8, ttl=60))
+    monkeypatch.setenv("OPENAI_FAST_MODEL", "tiny-model")
+    models = []
+
+    class Completions:
+        def create(self, **kwargs):
+            models.append(kwargs["model"])
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    factory = lambda key: SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    summarize_changes("-a\n+b", client_factory=factory, api_keys_override="openai:k", model_tier="fast")
+    asyncio.run(
+        summarize_changes_async(
+            "-a\n+b", client_factory=factory, api_keys_override="openai:k", use_cache=False
+        )
+    )
+    assert models == ["tiny-model", "gpt-4o-mini"]
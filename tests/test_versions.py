@@ -0,0 +1,84 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app import pipeline
+from app.main import app
+from app.storage import BlobStore
+from app.versions import VersionStore
+
+client = TestClient(app)
+
+
+def _upload(document, name, content):
+    return client.post(
+        f"/documents/{document}/versions",
+        files={"file": (name, io.BytesIO(content), "text/plain")},
+    )
+
+
+def test_version_store_numbers_versions_and_skips_identical_uploads(tmp_path):
+    store = VersionStore(tmp_path / "v.sqlite3", BlobStore(tmp_path / "blobs"))
+    first, created = store.add("label", "v1.txt", b"Store at 20C", "k1", "Store at 20C")
+    assert (first["version"], created) == (1, True)
+    again, created = store.add("label", "v1-copy.txt", b"Store at 20C", "k1", "Store at 20C")
+    assert (again["id"], created) == (first["id"], False)
+    second, _ = store.add("label", "v2.txt", b"Store at 25C", "k2", "Store at 25C")
+    assert second["version"] == 2
+    assert [v["version"] for v in store.versions("label")] == [2, 1]
+    assert store.documents()[0]["latest_version"] == 2
+    assert store.text("k2") == "Store at 25C"
+    assert store.content(first) == b"Store at 20C"
+
+
+def test_stores_sharing_data_number_concurrent_uploads_uniquely(tmp_path):
+    # Two stores on the same files stand in for two server processes.
+    stores = [VersionStore(tmp_path / "v.sqlite3", BlobStore(tmp_path / "blobs")) for _ in "ab"]
+
+    def upload(index):
+        content = f"Store at {index}C".encode()
+        return stores[index % 2].add("label", f"v{index}.txt", content, f"k{index}", "text")
+
+    with ThreadPoolExecutor(8) as pool:
+        added = list(pool.map(upload, range(40)))
+    assert all(created for _, created in added)
+    assert sorted(version["version"] for version, _ in added) == list(range(1, 41))
+
+
+def test_compare_versions_reuses_stored_text(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    old = _upload("label", "label_v1.txt", b"Store at 20C")
+    assert old.status_code == 201
+    assert _upload("label", "label_v1.txt", b"Store at 20C").status_code == 200
+    new = _upload("label", "label_v2.txt", b"Store at 25C").json()
+    assert new["version"] == 2
+
+    def no_extraction(*args, **kwargs):
+        raise AssertionError("stored versions must not be extracted again")
+
+    monkeypatch.setattr(pipeline, "extract_text", no_extraction)
+    latest = client.post("/compare/versions", data={"document": "label"})
+    assert latest.status_code == 200
+    assert "+Store at 25C" in latest.json()["diff"]
+    by_id = client.post(
+        "/compare/versions", data={"old_version": new["id"], "new_version": old.json()["id"]}
+    ).json()
+    assert "-Store at 25C" in by_id["diff"]
+
+    entry = client.get(f"/history/{latest.json()['history_id']}").json()
+    assert (entry["file_old"], entry["file_new"]) == ("label v1", "label v2")
+    assert [doc["document"] for doc in client.get("/documents").json()] == ["label"]
+    assert len(client.get("/documents/label/versions").json()) == 2
+
+
+def test_version_errors(monkeypatch):
+    monkeypatch.setenv("EXECUTOR_BACKEND", "inline")
+    assert _upload("deck", "deck.xyz", b"?").status_code == 400
+    _upload("single", "single.txt", b"only one")
+    assert client.post("/compare/versions", data={"document": "single"}).status_code == 404
+    assert client.post("/compare/versions").status_code == 400
+    response = client.post("/compare/versions", data={"old_version": 1, "new_version": 999})
+    assert response.status_code == 404
+    assert client.get("/documents/missing/versions").status_code == 404
+    assert client.get("/versions/999").status_code == 404
@@ -1,5 +1,7 @@
+import hashlib
 import json
 import time
+from collections import OrderedDict
 from datetime import datetime
 
 import requests
@@ -10,6 +12,97 @@ DEFAULT_MISSION = (
     "that marketing, medical affairs, legal, and sales teams can act on."
 )
 
+STAGES = {
+    "extracting": ("📄 Extracting", 0.1),
+    "diffing": ("🔍 Computing diff", 0.35),
+    "analyzing": ("⚠️ Scanning risk", 0.5),
+    "summarizing": ("🤖 AI analyzing", 0.65),
+}
+
+HEALTH_CHECK_INTERVAL = 30  # seconds between sidebar connectivity checks
+RESULT_CACHE_SIZE = 32
+SESSION_HISTORY_SIZE = 50
+HISTORY_PAGE_SIZE = 20
+HISTORY_REFRESH_INTERVAL = 30  # seconds a fetched history page is reused
+
+
+def iter_compare_events(session, endpoint, files, data):
+    """Yield NDJSON events from `/compare/stream`, or one `done` event from older APIs."""
+    base = endpoint.rstrip("/")
+    # The read timeout applies between events, not to the whole comparison.
+    with session.post(
+        f"{base}/compare/stream", files=files, data=data, stream=True, timeout=(5, 60)
+    ) as response:
+        if response.status_code == 404:
+            response = session.post(f"{base}/compare", files=files, data=data, timeout=60)
+            if response.ok:
+                yield {"event": "done", **response.json()}
+                return
+        if not response.ok:
+            try:
+                detail = response.json().get("detail", "Unknown error")
+            except ValueError:
+                detail = response.text or "Unknown error"
+            yield {"event": "error", "detail": detail}
+            return
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.1f}s"
+
+
+def check_api_health(force=False):
+    """Return the cached API status, probing the endpoint at most every HEALTH_CHECK_INTERVAL."""
+    endpoint = st.session_state.api_endpoint
+    checked = st.session_state.api_health
+    if (
+        not force
+        and checked
+        and checked["endpoint"] == endpoint
+        and time.monotonic() - checked["at"] < HEALTH_CHECK_INTERVAL
+    ):
+        return checked["status"]
+    try:
+        response = st.session_state.http.get(endpoint, timeout=1 if not force else 2)
+        status = "connected" if response.ok else "partial"
+    except requests.RequestException:
+        status = "disconnected"
+    st.session_state.api_health = {"endpoint": endpoint, "at": time.monotonic(), "status": status}
+    return status
+
+
+def remember_comparison(entry):
+    """Keep a compact, bounded record of this session's runs; full results live on the server."""
+    history = st.session_state.comparison_history
+    history.append(entry)
+    del history[:-SESSION_HISTORY_SIZE]
+
+
+def fetch_history(params):
+    """Fetch one `/history` page, reusing the last answer for identical params for a while."""
+    key = json.dumps(params, sort_keys=True)
+    cached = st.session_state.history_pages.get(key)
+    if cached and time.monotonic() - cached["at"] < HISTORY_REFRESH_INTERVAL:
+        return cached["page"]
+    response = st.session_state.http.get(
+        f"{st.session_state.api_endpoint.rstrip('/')}/history", params=params, timeout=5
+    )
+    response.raise_for_status()
+    page = response.json()
+    st.session_state.history_pages = {key: {"at": time.monotonic(), "page": page}}
+    return page
+
+
+def result_cache_key(data_old, data_new, mission_context):
+    digest = hashlib.sha256()
+    for part in (data_old, data_new, mission_context.encode("utf-8")):
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
 st.set_page_config(
     page_title="Pharm-Drive | AI Content Intelligence",
     page_icon="⚕️",
@@ -366,6 +459,21 @@ if "summarizer_api_key" not in st.session_state:
     st.session_state.summarizer_api_key = ""
 if "comparison_result" not in st.session_state:
     st.session_state.comparison_result = None
+if "http" not in st.session_state:
+    # One pooled keep-alive session per browser session instead of a connection per call.
+    st.session_state.http = requests.Session()
+    st.session_state.http.mount(
+        "http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    )
+    st.session_state.http.mount(
+        "https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    )
+if "api_health" not in st.session_state:
+    st.session_state.api_health = None
+if "result_cache" not in st.session_state:
+    st.session_state.result_cache = OrderedDict()
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = {}
 
 # Sidebar
 with st.sidebar:
@@ -408,13 +516,12 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("### 🔌 API")
-    try:
-        response = requests.get(st.session_state.api_endpoint, timeout=1)
-        if response.ok:
-            st.success("Connected")
-        else:
-            st.warning("Partial")
-    except requests.RequestException:
+    api_status = check_api_health()
+    if api_status == "connected":
+        st.success("Connected")
+    elif api_status == "partial":
+        st.warning("Partial")
+    else:
         st.error("Disconnected")
     
     st.markdown("---")
@@ -511,7 +618,6 @@ with tab1:
         if not file1 or not file2:
             st.warning("⚠️ Please upload both documents")
         else:
-            url = f"{st.session_state.api_endpoint.rstrip('/')}/compare"
             payload = {
                 "mission_context": mission_instruction
                 + " "
@@ -523,52 +629,102 @@ with tab1:
                 "file_new": (file2.name, file2.getvalue(), file2.type),
             }
             
-            progress = st.progress(0)
-            status = st.empty()
+            cache_key = result_cache_key(
+                files["file_old"][1], files["file_new"][1], payload["mission_context"]
+            )
+            cached_result = st.session_state.result_cache.get(cache_key)
             
-            for text, pct in [
-                ("📄 Extracting...", 0.25),
-                ("🔍 Computing diff...", 0.5),
-                ("🤖 AI analyzing...", 0.75),
-                ("📊 Finalizing...", 1.0),
-            ]:
-                status.text(text)
-                progress.progress(pct)
-                time.sleep(0.3)
+            if cached_result is not None:
+                # Identical files and mission: reuse the earlier analysis without calling the API.
+                st.session_state.result_cache.move_to_end(cache_key)
+                st.session_state.comparison_result = cached_result
+                remember_comparison({
+                    "timestamp": datetime.now(),
+                    "file1": file1.name,
+                    "file2": file2.name,
+                    "focus": focus_area,
+                    "priority": priority_level,
+                    "elapsed": None,
+                })
+                st.success("✅ Same documents and instructions as an earlier run – showing the saved result")
+            else:
+                progress = st.progress(0)
+                status = st.empty()
+                live_summary = st.empty()
             
-            try:
-                response = requests.post(url, files=files, data=payload, timeout=60)
-                progress.empty()
-                status.empty()
+                started = time.perf_counter()
+                stage, stage_started = None, started
+                stage_times = {}
+                hunks, summary_parts = [], []
+                result, error = None, None
+            
+                try:
+                    for event in iter_compare_events(
+                        st.session_state.http, st.session_state.api_endpoint, files, payload
+                    ):
+                        now = time.perf_counter()
+                        kind = event["event"]
+                        if kind == "stage":
+                            if stage:
+                                stage_times[stage] = now - stage_started
+                            stage, stage_started = event["stage"], now
+                            label, pct = STAGES.get(stage, (stage.title(), 0.5))
+                            status.text(f"{label}... ({format_seconds(now - started)})")
+                            progress.progress(pct)
+                        elif kind == "diff":
+                            hunks.append(event["text"])
+                            status.text(f"🔍 {len(hunks)} changed sections ({format_seconds(now - started)})")
+                        elif kind == "summary_token":
+                            summary_parts.append(event["text"])
+                            live_summary.info("".join(summary_parts))
+                        elif kind == "summary_reset":
+                            summary_parts.clear()
+                        elif kind == "error":
+                            error = event.get("detail", "Unknown error")
+                        elif kind == "done":
+                            result = {key: value for key, value in event.items() if key != "event"}
+                            result.setdefault("diff", "\n".join(hunks))
+                
+                    elapsed = time.perf_counter() - started
+                    if stage:
+                        stage_times[stage] = time.perf_counter() - stage_started
+                    progress.empty()
+                    status.empty()
+                    live_summary.empty()
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    st.session_state.comparison_result = result
-                    st.session_state.comparison_history.append({
-                        "timestamp": datetime.now(),
-                        "file1": file1.name,
-                        "file2": file2.name,
-                        "focus": focus_area,
-                        "priority": priority_level,
-                        "result": result,
-                    })
-                    st.success("✅ Complete! Check Results tab")
-                    st.balloons()
-                else:
-                    st.error(f"❌ Failed: {response.json().get('detail', 'Unknown error')}")
+                    if result is not None:
+                        result["elapsed_seconds"] = elapsed
+                        result["stage_seconds"] = stage_times
+                        st.session_state.result_cache[cache_key] = result
+                        while len(st.session_state.result_cache) > RESULT_CACHE_SIZE:
+                            st.session_state.result_cache.popitem(last=False)
+                        st.session_state.comparison_result = result
+                        remember_comparison({
+                            "timestamp": datetime.now(),
+                            "file1": file1.name,
+                            "file2": file2.name,
+                            "focus": focus_area,
+                            "priority": priority_level,
+                            "elapsed": elapsed,
+                        })
+                        st.session_state.history_pages = {}
+                        st.success(f"✅ Complete in {format_seconds(elapsed)}! Check Results tab")
+                        st.balloons()
+                    else:
+                        st.error(f"❌ Failed: {error or 'Unknown error'}")
             
-            except requests.exceptions.ConnectionError:
-                progress.empty()
-                status.empty()
-                st.error("❌ Cannot connect to API")
-            except requests.exceptions.Timeout:
-                progress.empty()
-                status.empty()
-                st.error("❌ Request timed out")
-            except Exception as exc:
-                progress.empty()
-                status.empty()
-                st.error(f"❌ Error: {exc}")
+                except requests.exceptions.ConnectionError:
+                    progress.empty()
+                    status.empty()
+                    st.error("❌ Cannot connect to API")
+                except requests.exceptions.Timeout:
+                    progress.empty()
+                    status.empty()
+                    st.error("❌ Request timed out")
+                except Exception as exc:
+                    progress.empty()
+                    status.empty()
+                    st.error(f"❌ Error: {exc}")
 
 # TAB 2: Results
 with tab2:
@@ -592,18 +748,31 @@ with tab2:
         col1.metric("Method", result.get("method", "N/A").upper())
         col2.metric("Tokens", result.get("tokens_used", "N/A"))
         col3.metric("Processing", "Full" if not result.get("truncated") else "Partial")
-        col4.metric("Time", "< 10s")
+        elapsed = result.get("elapsed_seconds")
+        col4.metric("Time", format_seconds(elapsed) if elapsed is not None else "N/A")
+        if result.get("stage_seconds"):
+            st.caption(
+                " · ".join(
+                    f"{STAGES.get(name, (name.title(),))[0]} {format_seconds(seconds)}"
+                    for name, seconds in result["stage_seconds"].items()
+                )
+            )
         
         st.markdown("---")
         
         st.markdown("### ⚠️ Compliance Impact")
         summary_text = result.get("summary", "No summary")
         
-        risk_level = "LOW"
-        if any(w in summary_text.lower() for w in ["dosage", "contraindication", "warning", "serious", "adverse"]):
-            risk_level = "HIGH"
-        elif any(w in summary_text.lower() for w in ["update", "change", "revised", "modified"]):
-            risk_level = "MEDIUM"
+        risk = result.get("risk") or {}
+        if risk:
+            risk_level = risk.get("level", "low").upper()
+        else:
+            # Older API versions do not scan the diff; fall back to the summary text.
+            risk_level = "LOW"
+            if any(w in summary_text.lower() for w in ["dosage", "contraindication", "warning", "serious", "adverse"]):
+                risk_level = "HIGH"
+            elif any(w in summary_text.lower() for w in ["update", "change", "revised", "modified"]):
+                risk_level = "MEDIUM"
         
         if risk_level == "HIGH":
             st.error("🔴 HIGH RISK")
@@ -612,6 +781,19 @@ with tab2:
         else:
             st.success("🟢 LOW RISK")
         
+        if risk.get("counts"):
+            st.caption(
+                " · ".join(
+                    f"{tag}: {count}"
+                    for tag, count in sorted(risk["counts"].items(), key=lambda item: -item[1])
+                )
+            )
+            with st.expander(f"Flagged sections ({len(risk.get('hunks', []))})"):
+                for hunk in risk.get("hunks", []):
+                    st.markdown(
+                        f"- `{hunk['header'] or 'diff'}` **{hunk['level'].upper()}** – {', '.join(hunk['tags'])}"
+                    )
+        
         st.markdown("### 🤖 AI Summary")
         st.info(summary_text)
         
@@ -672,25 +854,69 @@ with tab3:
     st.markdown("### 📈 Analytics")
     history = st.session_state.comparison_history
     
-    if history:
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Total", len(history))
-        c2.metric("Session", len(history))
-        c3.metric("Avg Time", "< 10s")
-        c4.metric("Success", "100%")
-        
-        st.markdown("---")
-        st.markdown("### 📋 History")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Session", len(history))
+    timings = [e["elapsed"] for e in history if e.get("elapsed") is not None]
+    c2.metric("Avg Time", format_seconds(sum(timings) / len(timings)) if timings else "N/A")
+    c3.metric("Local Cache Hits", sum(1 for e in history if e.get("elapsed") is None))
+    
+    st.markdown("---")
+    st.markdown("### 📋 History")
+    
+    # Only query the server when the reviewer asks for it; pages are fetched one at a time.
+    if st.toggle("Load saved comparisons", key="history_enabled"):
+        f1, f2, f3 = st.columns([2, 1, 1])
+        search = f1.text_input("File name contains", key="history_search")
+        risk_filter = f2.selectbox("Risk", ["All", "high", "medium", "low"], key="history_risk")
+        page_number = f3.number_input("Page", min_value=1, value=1, step=1, key="history_page")
+        params = {"limit": HISTORY_PAGE_SIZE, "offset": (page_number - 1) * HISTORY_PAGE_SIZE}
+        if search:
+            params["q"] = search
+        if risk_filter != "All":
+            params["risk_level"] = risk_filter
         
-        data = [{
-            "Time": e["timestamp"].strftime("%H:%M:%S"),
-            "Original": e["file1"],
-            "Updated": e["file2"],
-            "Focus": e["focus"],
-        } for e in reversed(history)]
+        try:
+            page = fetch_history(params)
+        except requests.RequestException as exc:
+            st.error(f"❌ Could not load history: {exc}")
+            page = None
         
-        st.dataframe(data, use_container_width=True)
-    else:
+        if page:
+            pages = max(1, -(-page["total"] // HISTORY_PAGE_SIZE))
+            c4.metric("Total", page["total"])
+            st.caption(f"Page {page_number} of {pages}")
+            st.dataframe(
+                [{
+                    "ID": item["id"],
+                    "Time": datetime.fromtimestamp(item["created_at"]).strftime("%Y-%m-%d %H:%M"),
+                    "Original": item["file_old"],
+                    "Updated": item["file_new"],
+                    "Risk": (item.get("risk_level") or "").upper(),
+                    "Method": item["method"],
+                    "Changes": f"+{item['added_lines']} / -{item['removed_lines']}",
+                    "Duration": format_seconds(item["elapsed_ms"] / 1000) if item.get("elapsed_ms") else "",
+                } for item in page["items"]],
+                use_container_width=True,
+            )
+            
+            ids = [item["id"] for item in page["items"]]
+            if ids:
+                chosen = st.selectbox("Open comparison", ids, key="history_open")
+                if st.button("📂 Load into Results"):
+                    response = st.session_state.http.get(
+                        f"{st.session_state.api_endpoint.rstrip('/')}/history/{chosen}", timeout=10
+                    )
+                    if response.ok:
+                        entry = response.json()
+                        st.session_state.comparison_result = {
+                            **entry,
+                            "elapsed_seconds": (entry.get("elapsed_ms") or 0) / 1000,
+                            "risk": {"level": entry.get("risk_level") or "low"},
+                        }
+                        st.success("✅ Loaded – check the Results tab")
+                    else:
+                        st.error("❌ Comparison not found")
+    elif not history:
         st.info("No data yet")
 
 # TAB 4: Settings
@@ -713,10 +939,12 @@ with tab4:
         st.caption("Prefix with `openai:` or `gemini:` for provider selection.")
         
         if st.button("🔍 Test"):
-            try:
-                r = requests.get(st.session_state.api_endpoint, timeout=2)
-                st.success("✅ Connected" if r.ok else "⚠️ Partial")
-            except:
+            api_status = check_api_health(force=True)
+            if api_status == "connected":
+                st.success("✅ Connected")
+            elif api_status == "partial":
+                st.warning("⚠️ Partial")
+            else:
                 st.error("❌ Failed")
         
         st.markdown("#### 📧 Notifications")